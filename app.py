@@ -12,8 +12,14 @@ from langchain_teddynote.messages import random_uuid
 from langsmith import Client
 
 # 기존 모듈 import
-from streamlit_wrapper import create_graph, init_app, db_cache, stream_graph
-from document_manager import setup_document_manager, load_db_metadata, get_db_display_name, VECTOR_DB_FOLDER
+from streamlit_wrapper import create_graph, init_app, db_cache, stream_graph, get_readiness
+from document_manager import setup_document_manager, load_db_metadata, get_db_display_name, VECTOR_DB_FOLDER, db_metadata
+from retrieval_cache import retrieval_cache
+from embedding_cache import embedding_cache_stats
+from semantic_cache import semantic_cache
+from db_locks import db_locks
+from vectorstore_handles import vectorstore_handles
+from parse_cache import parse_cache
 
 # 파일 상단에 필요한 임포트 추가
 import queue
@@ -32,9 +38,6 @@ Session(app)
 # 프로젝트 이름 설정
 LANGSMITH_PROJECT = " Document-QA-RAG"
 
-# LangSmith 추적 설정
-logging.langsmith(LANGSMITH_PROJECT)
-
 # 전역 변수: 현재 사용 중인 그래프 저장
 current_graph = None
 current_db_index = None
@@ -43,24 +46,25 @@ current_db_index = None
 def initialize_app():
     global INITIALIZED, db_cache
     if not INITIALIZED:
-        print("앱 초기화 - 벡터 DB 및 그래프 사전 로드 시작")
+        print("앱 초기화 - 벡터 DB 및 그래프 백그라운드 사전 로드 시작")
+        # 사전 로드는 백그라운드에서 병렬로 진행되며, 진행 상황은 /ready에서 확인
         init_app()
-        print("앱 초기화 - 벡터 DB 및 그래프 사전 로드 완료")
-        print(f"로드된 DB 캐시 키 목록: {list(db_cache.keys())}")
-
-        # 사전 로드된 DB 수 확인 및 로그
-        db_with_graphs = sum(1 for db in db_cache.values() if db.get('graph') is not None)
-        print(f"그래프가 생성된 DB 수: {db_with_graphs}/{len(db_cache)}")
         
         INITIALIZED = True  # 초기화 완료 표시
     else:
         print("앱이 이미 초기화되어 있습니다. 초기화 과정을 건너뜁니다.")
 
-# 앱 시작 시 초기화 실행
-initialize_app()
+# 앱 시작 시 설정 (LangSmith 추적, DB 사전 로드, 문서 관리자와 중단된 수집 작업 재개)
+# 파싱 워커 프로세스(forkserver, spawn)는 시작할 때 app.py를 __mp_main__으로 다시 import하므로
+# 그때는 이 시작 동작을 모두 건너뜀 (워커마다 작업 재개, 사전 로드가 반복되지 않도록)
+if __name__ != '__mp_main__':
+    # LangSmith 추적 설정
+    logging.langsmith(LANGSMITH_PROJECT)
+
+    initialize_app()
 
-# 문서 관리자 설정
-app = setup_document_manager(app)
+    # 문서 관리자 설정
+    app = setup_document_manager(app)
 
 @app.route('/')
 def index():
@@ -114,25 +118,25 @@ def ask():
             'status': 'no_db_selected'
         }), 400
     
+    # 이번 질문 이전의 대화 히스토리 (비어 있으면 첫 질문으로 보고 의미 기반 답변 캐시를 사용)
+    chat_history = get_message_history()
+    
     # 메시지 저장
     add_message('user', user_input)
     
     try:
-        # 현재 세션의 DB_index로 그래프 가져오기 (이미 로드되어 있음)
+        # 현재 세션의 DB_index로 그래프 가져오기
+        # (상주 중이면 즉시 반환, 메모리에서 해제된 DB는 다시 로드됨)
         db_index = session.get('db_index')
-        
-        # 현재 그래프가 없거나 DB가 변경된 경우에만 새로 가져옴
-        if current_graph is None or current_db_index != db_index:
-            print(f"현재 그래프가 없거나 DB가 변경됨 - 그래프 로드: {db_index}")
-            current_graph = create_graph(db_index)
-            current_db_index = db_index
-        else:
-            print(f"기존 그래프 재사용 - DB: {current_db_index}")
+        current_graph = create_graph(db_index)
+        current_db_index = db_index
+        if current_graph is None:
+            raise RuntimeError(f"DB '{db_index}'의 그래프를 로드하지 못했습니다.")
         
         # 그래프 실행
         print(f"그래프 실행 시작")
         start_time = time.time()
-        result = run_graph(current_graph, user_input, thread_id)
+        result = run_graph(current_graph, user_input, thread_id, chat_history)
         elapsed_time = time.time() - start_time
         print(f"그래프 실행 완료 - 소요 시간: {elapsed_time:.2f}초")
         
@@ -236,13 +240,14 @@ def change_db():
         print(f"DB 변경 시작 - 인덱스: {db_index}")
         start_time = time.time()
         
-        # 캐시에서 바로 그래프 가져오기
-        if db_index in db_cache and db_cache[db_index].get('graph') is not None:
+        # 캐시에서 그래프 가져오기 (상주하지 않는 DB는 이 시점에 로드)
+        if db_index in db_cache:
             print(f"사전 생성된 그래프 즉시 사용 - DB: {db_index}")
-            current_graph = db_cache[db_index]['graph']
         else:
-            print(f"캐시에 그래프 없음 - 새로 생성: {db_index}")
-            current_graph = create_graph(db_index)
+            print(f"DB가 메모리에 없음 - 로드 후 사용: {db_index}")
+        current_graph = create_graph(db_index)
+        if current_graph is None:
+            raise RuntimeError(f"DB '{db_index}'를 로드하지 못했습니다.")
         
         # 현재 DB 인덱스 업데이트
         current_db_index = db_index
@@ -275,6 +280,34 @@ def change_db():
             'message': f'DB 변경 중 오류: {str(e)}'
         }), 500
 
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """캐시 적중/미스/제거 통계를 반환합니다."""
+    return jsonify({
+        'status': 'success',
+        'retrieval_cache': retrieval_cache.stats(),
+        'embedding_cache': embedding_cache_stats(),
+        'semantic_cache': semantic_cache.stats()
+    })
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """사전 로드 준비 상태를 반환합니다. 로드 중이면 503 (이미 로드된 DB는 사용 가능)."""
+    readiness = get_readiness()
+    return jsonify({'status': 'success', **readiness}), 200 if readiness['ready'] else 503
+
+@app.route('/db_stats', methods=['GET'])
+def db_stats():
+    """벡터 DB 메모리 상주 현황, 공유 벡터스토어 핸들, DB별 쓰기 잠금 대기, 메타데이터/파싱 캐시 통계를 반환합니다."""
+    return jsonify({
+        'status': 'success',
+        'residency': db_cache.stats(),
+        'locks': db_locks.stats(),
+        'handles': vectorstore_handles.stats(),
+        'metadata': db_metadata.stats(),
+        'parse_cache': parse_cache.stats()
+    })
+
 @app.route('/clear', methods=['POST'])
 def clear_conversation():
     session['messages'] = []
@@ -310,14 +343,15 @@ def get_message_history():
 
 # app.py 파일의 run_graph 함수를 다음과 같이 수정하세요
 
-def run_graph(graph, query, thread_id):
+def run_graph(graph, query, thread_id, chat_history=None):
     from states import GraphState
     from langchain_core.runnables import RunnableConfig
     
     config = RunnableConfig(recursion_limit=30, configurable={"thread_id": thread_id})
     
-    # 대화 히스토리 가져오기
-    chat_history = get_message_history()
+    # 대화 히스토리 가져오기 (현재 질문은 포함하지 않음)
+    if chat_history is None:
+        chat_history = get_message_history()
     
     # 질문 입력 (대화 히스토리 포함)
     inputs = GraphState(
@@ -0,0 +1,317 @@
+"""
+한국어 형태소 분석 기반 BM25 역색인
+
+FAISS docstore의 청크로부터 역색인을 만들고, index.faiss/index.pkl 옆에
+numpy 배열(.npy)로 저장합니다. 로드 시에는 메모리 매핑으로 열기 때문에
+큰 DB도 시작 시간이 거의 들지 않습니다.
+
+문서 번호는 FAISS의 index_to_docstore_id 키(검색 결과 라벨)와 동일하게 사용합니다.
+"""
+import os
+import re
+import json
+import threading
+from collections import Counter
+
+import numpy as np
+
+from db_snapshots import snapshot_dir
+
+BM25_PREFIX = 'bm25_'
+BM25_META_FILE = f'{BM25_PREFIX}meta.json'
+BM25_VOCAB_FILE = f'{BM25_PREFIX}vocab.json'
+BM25_ARRAYS = ('term_offsets', 'post_docs', 'post_tfs', 'doc_len', 'live')
+
+# BM25 파라미터 (rank_bm25 BM25Okapi 기본값과 동일)
+K1 = 1.5
+B = 0.75
+
+# 색인에 사용할 품사 (명사, 외국어, 숫자, 용언 어간, 어근, 부사)
+KIWI_INDEX_TAGS = {'NNG', 'NNP', 'NNB', 'NR', 'NP', 'SL', 'SH', 'SN', 'VV', 'VA', 'XR', 'MAG'}
+
+_kiwi = None
+_kiwi_lock = threading.Lock()
+_FALLBACK_TOKEN_RE = re.compile(r'[가-힣]+|[a-z0-9]+')
+
+
+def _get_kiwi():
+    """Kiwi 형태소 분석기를 지연 로드합니다. 설치되어 있지 않으면 None을 반환합니다."""
+    global _kiwi
+    if _kiwi is None:
+        with _kiwi_lock:
+            if _kiwi is None:
+                try:
+                    from kiwipiepy import Kiwi
+                    _kiwi = Kiwi()
+                except ImportError:
+                    print("kiwipiepy가 설치되어 있지 않아 음절 bigram 토크나이저를 사용합니다.")
+                    _kiwi = False
+    return _kiwi or None
+
+
+def _fallback_tokenize(text):
+    """형태소 분석기가 없을 때 사용하는 토크나이저 (한글은 음절 bigram)"""
+    tokens = []
+    for word in _FALLBACK_TOKEN_RE.findall(text.lower()):
+        if word[0] >= '가' and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _tokens_from_kiwi(result):
+    return [token.form.lower() for token in result if token.tag in KIWI_INDEX_TAGS]
+
+
+def tokenizer_name():
+    """현재 사용하는 토크나이저 ('kiwi' 또는 'bigram', 색인 메타데이터에 기록)"""
+    return 'kiwi' if _get_kiwi() is not None else 'bigram'
+
+
+def tokenize(text):
+    """한 문장을 BM25 색인용 토큰 리스트로 변환합니다."""
+    kiwi = _get_kiwi()
+    if kiwi is None:
+        return _fallback_tokenize(text)
+    with _kiwi_lock:
+        return _tokens_from_kiwi(kiwi.tokenize(text))
+
+
+def tokenize_many(texts):
+    """여러 청크를 한 번에 토큰화합니다 (Kiwi 배치 분석 사용)."""
+    texts = list(texts)
+    kiwi = _get_kiwi()
+    if kiwi is None:
+        return [_fallback_tokenize(text) for text in texts]
+    with _kiwi_lock:
+        return [_tokens_from_kiwi(result) for result in kiwi.tokenize(texts)]
+
+
+class BM25Index:
+    """
+    CSR 형식의 BM25 역색인
+
+    Attributes:
+        vocab: 토큰 -> 토큰 번호
+        term_offsets: 토큰별 posting 구간 (길이 V+1)
+        post_docs: posting의 문서 번호 (토큰 번호, 문서 번호 순 정렬)
+        post_tfs: posting의 출현 빈도
+        doc_len: 문서 번호별 토큰 수
+        live: 문서 번호별 유효 여부
+    """
+
+    def __init__(self, vocab, term_offsets, post_docs, post_tfs, doc_len, live, k1=K1, b=B):
+        self.vocab = vocab
+        self.term_offsets = term_offsets
+        self.post_docs = post_docs
+        self.post_tfs = post_tfs
+        self.doc_len = doc_len
+        self.live = live
+        self.k1 = k1
+        self.b = b
+
+        self.num_docs = int(np.count_nonzero(live))
+        self.avgdl = float(doc_len[live.astype(bool)].mean()) if self.num_docs else 0.0
+        df = np.diff(term_offsets).astype(np.float32)
+        self.idf = np.log((self.num_docs - df + 0.5) / (df + 0.5) + 1.0).astype(np.float32)
+
+    @classmethod
+    def empty(cls):
+        return cls({}, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                   np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32),
+                   np.zeros(0, dtype=np.uint8))
+
+    @classmethod
+    def from_texts(cls, ids, texts):
+        """문서 번호와 텍스트 목록으로 새 색인을 생성합니다."""
+        return cls.empty().add_documents(ids, texts)
+
+    def _coo(self):
+        """CSR posting을 (토큰 번호, 문서 번호, 빈도) 배열로 풀어냅니다."""
+        terms = np.repeat(np.arange(len(self.term_offsets) - 1, dtype=np.int64),
+                          np.diff(self.term_offsets))
+        return terms, np.asarray(self.post_docs, dtype=np.int64), np.asarray(self.post_tfs, dtype=np.float32)
+
+    def _rebuild(self, vocab, terms, docs, tfs, doc_len, live):
+        order = np.lexsort((docs, terms))
+        terms, docs, tfs = terms[order], docs[order], tfs[order]
+        counts = np.bincount(terms, minlength=len(vocab))
+        term_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(counts, out=term_offsets[1:])
+        return BM25Index(vocab, term_offsets, docs, tfs, doc_len, live, self.k1, self.b)
+
+    def add_documents(self, ids, texts):
+        """새 문서를 추가한 색인을 반환합니다. 기존 posting은 다시 토큰화하지 않습니다."""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0:
+            return self
+        token_lists = tokenize_many(texts)
+
+        vocab = dict(self.vocab)
+        new_terms, new_docs, new_tfs = [], [], []
+        lengths = np.zeros(len(ids), dtype=np.float32)
+        for i, (doc_id, tokens) in enumerate(zip(ids, token_lists)):
+            lengths[i] = len(tokens)
+            for token, tf in Counter(tokens).items():
+                term_id = vocab.setdefault(token, len(vocab))
+                new_terms.append(term_id)
+                new_docs.append(doc_id)
+                new_tfs.append(tf)
+
+        size = max(len(self.doc_len), int(ids.max()) + 1)
+        doc_len = np.zeros(size, dtype=np.float32)
+        doc_len[:len(self.doc_len)] = self.doc_len
+        live = np.zeros(size, dtype=np.uint8)
+        live[:len(self.live)] = self.live
+
+        # 같은 번호가 다시 추가되면 기존 posting을 먼저 제거
+        terms, docs, tfs = self._coo()
+        keep = ~np.isin(docs, ids)
+        doc_len[ids] = lengths
+        live[ids] = 1
+
+        return self._rebuild(
+            vocab,
+            np.concatenate([terms[keep], np.asarray(new_terms, dtype=np.int64)]),
+            np.concatenate([docs[keep], np.asarray(new_docs, dtype=np.int64)]),
+            np.concatenate([tfs[keep], np.asarray(new_tfs, dtype=np.float32)]),
+            doc_len, live,
+        )
+
+    def remove_ids(self, ids):
+        """지정한 문서 번호를 제거한 색인을 반환합니다."""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        ids = ids[ids < len(self.live)]
+        if len(ids) == 0:
+            return self
+        terms, docs, tfs = self._coo()
+        keep = ~np.isin(docs, ids)
+        doc_len = np.array(self.doc_len, dtype=np.float32)
+        live = np.array(self.live, dtype=np.uint8)
+        doc_len[ids] = 0
+        live[ids] = 0
+        return self._rebuild(dict(self.vocab), terms[keep], docs[keep], tfs[keep], doc_len, live)
+
+    def get_scores(self, query):
+        """질문에 대한 전체 문서 BM25 점수 배열을 반환합니다."""
+        scores = np.zeros(len(self.doc_len), dtype=np.float32)
+        if not self.num_docs:
+            return scores
+        for token in set(tokenize(query)):
+            term_id = self.vocab.get(token)
+            if term_id is None:
+                continue
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.post_docs[start:end]
+            tfs = self.post_tfs[start:end]
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / self.avgdl)
+            scores[docs] += self.idf[term_id] * tfs * (self.k1 + 1.0) / (tfs + norm)
+        return scores
+
+    def search(self, query, k=3):
+        """상위 k개 문서 번호와 점수를 반환합니다 (점수 0인 문서 제외)."""
+        scores = self.get_scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        order = np.argsort(-scores[candidates], kind='stable')
+        candidates = candidates[order]
+        return candidates.astype(np.int64), scores[candidates]
+
+    def save(self, folder):
+        """색인을 폴더에 저장합니다. 로드 중인 매핑을 깨지 않도록 임시 파일 후 교체합니다."""
+        os.makedirs(folder, exist_ok=True)
+        arrays = {
+            'term_offsets': np.asarray(self.term_offsets, dtype=np.int64),
+            'post_docs': np.asarray(self.post_docs, dtype=np.int64),
+            'post_tfs': np.asarray(self.post_tfs, dtype=np.float32),
+            'doc_len': np.asarray(self.doc_len, dtype=np.float32),
+            'live': np.asarray(self.live, dtype=np.uint8),
+        }
+        for name, array in arrays.items():
+            path = os.path.join(folder, f'{BM25_PREFIX}{name}.npy')
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, array)
+            os.replace(path + '.tmp', path)
+
+        terms = [None] * len(self.vocab)
+        for token, term_id in self.vocab.items():
+            terms[term_id] = token
+        _write_json(os.path.join(folder, BM25_VOCAB_FILE), terms)
+        _write_json(os.path.join(folder, BM25_META_FILE), {
+            'k1': self.k1,
+            'b': self.b,
+            'num_docs': self.num_docs,
+            'vocab_size': len(self.vocab),
+            'tokenizer': tokenizer_name(),
+        })
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def load_bm25_index(folder):
+    """
+    저장된 색인(DB 폴더면 현재 스냅샷)을 메모리 매핑으로 로드합니다. 없으면 None을 반환합니다.
+    다른 토크나이저로 만든 색인은 질문 토큰과 맞지 않으므로(예: kiwipiepy 설치 여부가 바뀐 경우)
+    로드하지 않고 None을 반환해 다시 생성하게 합니다.
+    """
+    folder = snapshot_dir(folder, verify=True)
+    meta_path = os.path.join(folder, BM25_META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('tokenizer') != tokenizer_name():
+            print(f"BM25 색인의 토크나이저({meta.get('tokenizer')})가 현재 토크나이저({tokenizer_name()})와 "
+                  f"달라 다시 생성합니다: {folder}")
+            return None
+        with open(os.path.join(folder, BM25_VOCAB_FILE), 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(folder, f'{BM25_PREFIX}{name}.npy'), mmap_mode='r')
+            for name in BM25_ARRAYS
+        }
+        vocab = {token: term_id for term_id, token in enumerate(terms)}
+        return BM25Index(vocab, k1=meta.get('k1', K1), b=meta.get('b', B), **arrays)
+    except Exception as e:
+        print(f"BM25 색인 로드 중 오류 ({folder}): {e}")
+        return None
+
+
+def _chunk_texts(vectorstore, ids):
+    docs = vectorstore.docstore
+    texts = []
+    for faiss_id in ids:
+        doc = docs.search(vectorstore.index_to_docstore_id[faiss_id])
+        texts.append(doc.page_content if hasattr(doc, 'page_content') else '')
+    return texts
+
+
+def build_bm25_index(vectorstore):
+    """FAISS 벡터스토어의 docstore 청크 전체로 색인을 생성합니다."""
+    ids = sorted(vectorstore.index_to_docstore_id.keys())
+    return BM25Index.from_texts(ids, _chunk_texts(vectorstore, ids))
+
+
+def update_bm25_index(folder, vectorstore, added_ids=(), removed_ids=()):
+    """
+    벡터스토어 변경 내용을 저장된 색인에 반영합니다.
+    저장된 색인이 없거나 다른 토크나이저로 만든 색인이면 docstore 전체로 새로 생성합니다.
+    """
+    index = load_bm25_index(folder)
+    if index is None:
+        index = build_bm25_index(vectorstore)
+    else:
+        if removed_ids:
+            index = index.remove_ids(removed_ids)
+        added_ids = sorted(added_ids)
+        if added_ids:
+            index = index.add_documents(added_ids, _chunk_texts(vectorstore, added_ids))
+    index.save(folder)
+    return index
@@ -0,0 +1,188 @@
+"""
+수집 시 유사 중복 청크 제거
+
+연도/지역만 다른 모집 공고처럼 같은 문단이 여러 문서에 반복되면 거의 같은 벡터가 인덱스를 채우고
+검색 상위 결과가 중복 문맥으로 채워집니다. 분할된 청크마다 문자 n-gram의 MinHash 서명을 계산하고
+추정 자카드 유사도가 CHUNK_DEDUP_THRESHOLD 이상인 청크가 이미 있으면 새 청크를 저장하지 않고
+남긴 청크의 메타데이터(duplicate_sources)에 중복 청크의 출처를 합칩니다.
+
+후보는 서명을 MINHASH_BANDS개 구간으로 나눈 LSH 사전으로 찾고, 후보만 서명 전체로 비교합니다.
+(짧은 청크에서는 SimHash의 비트 거리가 한두 글자 차이에도 크게 흔들려 MinHash를 사용합니다.)
+
+서명은 DB 스냅샷의 chunk_signatures.npz에 저장해 문서 추가/동기화 시 기존 청크와도 비교합니다.
+삭제된 청크의 서명은 로드할 때 제외하고, 서명이 없는 청크(중복 제거 없이 추가된 청크)는 본문에서 계산합니다.
+걸러진 청크가 합쳐진 청크 ID는 파일별로 매니페스트(merged_chunk_ids)에 기록합니다. 남긴 청크가 원본 파일의
+변경/삭제로 지워지면 그 청크에 합쳐진 파일은 내용 일부를 잃으므로, 동기화가 해당 파일을 다시 처리합니다.
+"""
+import os
+import zlib
+
+import numpy as np
+
+CHUNK_SIGNATURES_FILE = 'chunk_signatures.npz'
+# 기본 사용 여부 (DB 생성 요청의 dedup 값이 없을 때)
+CHUNK_DEDUP_DEFAULT = os.getenv('CHUNK_DEDUP', '0') == '1'
+# 중복으로 보는 최소 추정 자카드 유사도
+CHUNK_DEDUP_THRESHOLD = float(os.getenv('CHUNK_DEDUP_THRESHOLD', '0.85'))
+# 서명에 사용하는 문자 n-gram 길이, 해시 함수 수, LSH 구간 수
+SHINGLE_CHARS = 5
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+# 해시 함수 계수 (저장된 서명과 비교하려면 프로세스와 관계없이 같아야 함)
+_rng = np.random.default_rng(5381)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def minhash(text):
+    """공백을 정규화한 본문의 문자 n-gram MinHash 서명 (uint32 배열)"""
+    text = ' '.join(text.split()).lower()
+    shingles = {text[i:i + SHINGLE_CHARS] for i in range(max(1, len(text) - SHINGLE_CHARS + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # 곱셈-시프트 해시 (uint64 곱은 2^64로 나눈 나머지)
+    permuted = (hashes[None, :] * _MULTIPLIERS[:, None] + _OFFSETS[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(a, b):
+    """두 서명의 추정 자카드 유사도"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class ChunkDeduplicator:
+    """청크 ID -> MinHash 서명과 LSH 구간별 후보 사전"""
+
+    def __init__(self, threshold=CHUNK_DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        self._buckets = [{} for _ in range(MINHASH_BANDS)]
+        self.signatures = {}
+        # 이번 수집에서 확인한 청크 수와 합친 중복 청크 수
+        self.checked = 0
+        self.duplicates = 0
+        # 남긴 청크 ID -> 합쳐진 중복 청크의 출처 목록
+        self.merged = {}
+
+    def _keys(self, signature):
+        for band in range(MINHASH_BANDS):
+            yield band, signature[band * self._rows:(band + 1) * self._rows].tobytes()
+
+    def add(self, chunk_id, signature):
+        self.signatures[chunk_id] = signature
+        for band, key in self._keys(signature):
+            self._buckets[band].setdefault(key, []).append(chunk_id)
+
+    def remove(self, chunk_id):
+        signature = self.signatures.pop(chunk_id, None)
+        if signature is None:
+            return
+        for band, key in self._keys(signature):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None and chunk_id in bucket:
+                bucket.remove(chunk_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def find(self, signature):
+        """유사도가 threshold 이상인 기존 청크 ID (없으면 None)"""
+        checked = set()
+        for band, key in self._keys(signature):
+            for chunk_id in self._buckets[band].get(key, ()):
+                if chunk_id in checked:
+                    continue
+                checked.add(chunk_id)
+                if similarity(self.signatures[chunk_id], signature) >= self.threshold:
+                    return chunk_id
+        return None
+
+    def filter(self, chunks, merged_into=None):
+        """
+        ID가 지정된 청크 목록에서 유사 중복을 걸러 남길 청크만 반환합니다.
+        걸러진 청크의 출처는 merged에 남긴 청크 기준으로 기록하고,
+        merged_into(리스트)가 주어지면 걸러진 청크가 합쳐진 청크 ID를 추가합니다.
+        """
+        kept = []
+        for chunk in chunks:
+            signature = minhash(chunk.page_content)
+            self.checked += 1
+            duplicate_of = self.find(signature)
+            if duplicate_of is None:
+                self.add(chunk.id, signature)
+                kept.append(chunk)
+                continue
+            self.duplicates += 1
+            if merged_into is not None and duplicate_of not in merged_into:
+                merged_into.append(duplicate_of)
+            source = chunk.metadata.get('source')
+            sources = self.merged.setdefault(duplicate_of, [])
+            if source and source not in sources:
+                sources.append(source)
+        return kept
+
+    def apply_merges(self, vectorstore):
+        """
+        합쳐진 중복 청크의 출처를 남긴 청크의 duplicate_sources 메타데이터에 추가합니다.
+
+        Returns:
+            메타데이터를 바꾼 청크 수
+        """
+        updated = 0
+        for chunk_id, sources in self.merged.items():
+            doc = vectorstore.docstore._dict.get(chunk_id)
+            if doc is None:
+                continue
+            existing = list(doc.metadata.get('duplicate_sources', []))
+            added = [s for s in sources if s != doc.metadata.get('source') and s not in existing]
+            if added:
+                updated += vectorstore.update_metadata([chunk_id], duplicate_sources=existing + added)
+        self.merged = {}
+        return updated
+
+    def report(self):
+        """이번 수집의 중복 제거 통계"""
+        return {
+            'checked_chunks': self.checked,
+            'duplicate_chunks': self.duplicates,
+            'dedup_ratio': round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+        }
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, CHUNK_SIGNATURES_FILE)
+        ids = list(self.signatures)
+        signatures = (np.stack([self.signatures[chunk_id] for chunk_id in ids]) if ids
+                      else np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint32))
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, ids=np.array(ids, dtype=str), signatures=signatures,
+                     shingle_chars=SHINGLE_CHARS)
+        os.replace(path + '.tmp', path)
+
+
+def _load_signatures(path):
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as data:
+        if int(data['shingle_chars']) != SHINGLE_CHARS or data['signatures'].shape[1:] != (MINHASH_PERMUTATIONS,):
+            return {}
+        return dict(zip(data['ids'].tolist(), data['signatures']))
+
+
+def load_deduplicator(folder, vectorstore, threshold=CHUNK_DEDUP_THRESHOLD):
+    """
+    스냅샷의 서명으로 기존 청크의 중복 검사기를 만듭니다.
+    삭제된 청크의 서명은 제외하고, 서명이 없는 청크는 본문에서 계산합니다.
+    """
+    dedup = ChunkDeduplicator(threshold)
+    saved = _load_signatures(os.path.join(folder, CHUNK_SIGNATURES_FILE)) if folder else {}
+    docstore = vectorstore.docstore
+    computed = 0
+    for chunk_id in vectorstore.metadata_index.chunks:
+        signature = saved.get(chunk_id)
+        if signature is None:
+            text = docstore.text(chunk_id) if hasattr(docstore, 'text') else docstore._dict[chunk_id].page_content
+            signature = minhash(text)
+            computed += 1
+        dedup.add(chunk_id, signature)
+    if computed:
+        print(f"[중복 제거] 서명이 없는 기존 청크 {computed}개의 서명 계산")
+    return dedup
@@ -0,0 +1,379 @@
+"""
+열 단위(columnar) docstore
+
+index.pkl은 청크마다 LangChain Document 객체를 pickle로 저장하므로 DB를 많이 올리면
+객체 오버헤드와 역직렬화 시간이 커집니다. 이 형식은 스냅샷 디렉터리에 아래 파일로 저장하고
+모두 메모리 매핑으로 열며, Document는 검색 결과처럼 실제로 필요한 청크만 그때 만듭니다.
+
+    docs_meta.json       형식 버전, 청크 수, 메타데이터 열 이름과 열별 고유값 목록
+    docs_text.bin        모든 청크 본문을 이어 붙인 UTF-8 버퍼
+    docs_offsets.npy     행 i 본문의 바이트 범위 [offsets[i], offsets[i+1]) (int64)
+    docs_labels.npy      행별 FAISS 라벨 (오름차순, 행 순서 = 라벨 순서)
+    docs_ids.npy         행별 청크 ID (고정 폭 UTF-8)
+    docs_id_sorted.npy   정렬된 청크 ID (docs_id_rows.npy의 행 번호와 함께 ID → 행 조회)
+    docs_col_{i}.npy     메타데이터 열 i의 행별 고유값 번호 (int32, -1 = 값 없음)
+
+로드한 docstore와 라벨 매핑은 읽기 전용 표 위에 추가/교체/삭제를 기록하는 층을 두어
+기존 코드가 쓰는 docstore._dict / index_to_docstore_id 사전 인터페이스를 그대로 제공합니다.
+"""
+import os
+import copy
+import json
+import pickle
+from collections.abc import MutableMapping
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+COLUMNAR_PREFIX = 'docs_'
+COLUMNAR_META_FILE = f'{COLUMNAR_PREFIX}meta.json'
+COLUMNAR_TEXT_FILE = f'{COLUMNAR_PREFIX}text.bin'
+COLUMNAR_VERSION = 1
+PICKLE_DOCSTORE_FILE = 'index.pkl'
+_MISSING = -1
+
+
+def _npy_path(folder, name):
+    return os.path.join(folder, f'{COLUMNAR_PREFIX}{name}.npy')
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # 빈 배열은 메모리 매핑할 수 없으므로 일반 로드
+        return np.load(path)
+
+
+class ColumnarTable:
+    """메모리 매핑된 읽기 전용 청크 표"""
+
+    def __init__(self, folder):
+        with open(os.path.join(folder, COLUMNAR_META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != COLUMNAR_VERSION:
+            raise ValueError(f"지원하지 않는 docstore 형식 버전입니다: {meta.get('version')}")
+        self.size = meta['count']
+        self.columns = [(name, values) for name, values in meta['columns']]
+        self.offsets = _load_array(_npy_path(folder, 'offsets'))
+        self.labels = _load_array(_npy_path(folder, 'labels'))
+        self.ids = _load_array(_npy_path(folder, 'ids'))
+        self._sorted_ids = _load_array(_npy_path(folder, 'id_sorted'))
+        self._id_rows = _load_array(_npy_path(folder, 'id_rows'))
+        self.codes = [_load_array(_npy_path(folder, f'col_{i}')) for i in range(len(self.columns))]
+        text_path = os.path.join(folder, COLUMNAR_TEXT_FILE)
+        if os.path.getsize(text_path):
+            self.text_buffer = np.memmap(text_path, dtype=np.uint8, mode='r')
+        else:
+            self.text_buffer = np.zeros(0, dtype=np.uint8)
+
+    def row_of_id(self, doc_id):
+        """청크 ID의 행 번호 (없으면 -1)"""
+        if not isinstance(doc_id, str) or not self.size:
+            return -1
+        key = doc_id.encode('utf-8')
+        pos = int(np.searchsorted(self._sorted_ids, key))
+        if pos < self.size and self._sorted_ids[pos] == key:
+            return int(self._id_rows[pos])
+        return -1
+
+    def row_of_label(self, label):
+        """FAISS 라벨의 행 번호 (없으면 -1)"""
+        if not self.size:
+            return -1
+        pos = int(np.searchsorted(self.labels, label))
+        if pos < self.size and self.labels[pos] == label:
+            return pos
+        return -1
+
+    def doc_id(self, row):
+        return self.ids[row].decode('utf-8')
+
+    def text(self, row):
+        return bytes(self.text_buffer[self.offsets[row]:self.offsets[row + 1]]).decode('utf-8')
+
+    def metadata(self, row):
+        metadata = {}
+        for (name, values), codes in zip(self.columns, self.codes):
+            code = codes[row]
+            if code != _MISSING:
+                value = values[code]
+                # 열의 고유값은 여러 청크가 공유하므로 변경 가능한 값은 복사
+                metadata[name] = copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+        return metadata
+
+    def document(self, row):
+        return Document(id=self.doc_id(row), page_content=self.text(row), metadata=self.metadata(row))
+
+
+class _OverlayMap(MutableMapping):
+    """
+    읽기 전용 표 위의 변경 층
+    추가/교체한 항목은 overlay에, 표에 있던 키의 삭제는 removed에 기록합니다.
+    """
+
+    def __init__(self, table, overlay=None, removed=None):
+        self._table = table
+        self._overlay = overlay if overlay is not None else {}
+        self._removed = removed if removed is not None else set()
+        self._extra = sum(1 for key in self._overlay if not self._in_table(key))
+
+    # 하위 클래스에서 구현
+    def _in_table(self, key):
+        raise NotImplementedError
+
+    def _table_get(self, key):
+        raise NotImplementedError
+
+    def _table_items(self):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._removed or not self._in_table(key):
+            raise KeyError(key)
+        return self._table_get(key)
+
+    def __contains__(self, key):
+        if key in self._overlay:
+            return True
+        return key not in self._removed and self._in_table(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._overlay:
+            if self._in_table(key):
+                self._removed.discard(key)
+            else:
+                self._extra += 1
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key in self._overlay:
+            del self._overlay[key]
+            if self._in_table(key):
+                self._removed.add(key)
+            else:
+                self._extra -= 1
+        elif key not in self._removed and self._in_table(key):
+            self._removed.add(key)
+        else:
+            raise KeyError(key)
+
+    def items(self):
+        for key, value in self._table_items():
+            if key not in self._removed and key not in self._overlay:
+                yield key, value
+        yield from list(self._overlay.items())
+
+    def values(self):
+        return (value for _, value in self.items())
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+    def __len__(self):
+        return self._table.size - len(self._removed) + self._extra
+
+    def copy(self):
+        """표는 공유하고 변경 층만 복사합니다."""
+        return type(self)(self._table, dict(self._overlay), set(self._removed))
+
+
+class ColumnarDocuments(_OverlayMap):
+    """청크 ID -> Document (표에 있는 청크는 읽을 때 Document 생성)"""
+
+    def _in_table(self, key):
+        return self._table.row_of_id(key) >= 0
+
+    def _table_get(self, key):
+        return self._table.document(self._table.row_of_id(key))
+
+    def _table_items(self):
+        for row in range(self._table.size):
+            yield self._table.doc_id(row), self._table.document(row)
+
+    def __iter__(self):
+        # 키만 필요한 경우 Document를 만들지 않음
+        for row in range(self._table.size):
+            key = self._table.doc_id(row)
+            if key not in self._removed and key not in self._overlay:
+                yield key
+        yield from list(self._overlay)
+
+    def text(self, key):
+        """청크 본문 (Document를 만들지 않음)"""
+        if key in self._overlay:
+            return self._overlay[key].page_content
+        row = self._table.row_of_id(key)
+        if row < 0 or key in self._removed:
+            raise KeyError(key)
+        return self._table.text(row)
+
+
+class LabelMap(_OverlayMap):
+    """FAISS 라벨 -> 청크 ID (index_to_docstore_id 대체)"""
+
+    def _in_table(self, key):
+        try:
+            return self._table.row_of_label(int(key)) >= 0
+        except (TypeError, ValueError):
+            return False
+
+    def _table_get(self, key):
+        return self._table.doc_id(self._table.row_of_label(int(key)))
+
+    def _table_items(self):
+        for row in range(self._table.size):
+            yield int(self._table.labels[row]), self._table.doc_id(row)
+
+    def max_label(self, default=-1):
+        """가장 큰 라벨 (전체를 순회하지 않음)"""
+        labels = [key for key in self._overlay]
+        for row in range(self._table.size - 1, -1, -1):
+            label = int(self._table.labels[row])
+            if label not in self._removed:
+                labels.append(label)
+                break
+        return max(labels, default=default)
+
+
+class ColumnarDocstore(InMemoryDocstore):
+    """ColumnarTable을 바탕으로 한 docstore (_dict는 필요할 때 Document를 만드는 사전)"""
+
+    def __init__(self, table=None, documents=None):
+        super().__init__(documents if documents is not None else ColumnarDocuments(table))
+
+    def add(self, texts):
+        overlapping = [doc_id for doc_id in texts if doc_id in self._dict]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {set(overlapping)}")
+        # InMemoryDocstore.add와 달리 사전 전체를 복사하지 않고 제자리에 추가
+        self._dict.update(texts)
+
+    def text(self, doc_id):
+        return self._dict.text(doc_id)
+
+    def copy(self):
+        return ColumnarDocstore(documents=self._dict.copy())
+
+
+def has_columnar(folder):
+    return os.path.exists(os.path.join(folder, COLUMNAR_META_FILE))
+
+
+def load_columnar(folder):
+    """열 단위 docstore가 있으면 (docstore, 라벨 매핑)을, 없으면 None을 반환합니다."""
+    if not has_columnar(folder):
+        return None
+    table = ColumnarTable(folder)
+    return ColumnarDocstore(table), LabelMap(table)
+
+
+def _save_array(folder, name, array):
+    path = _npy_path(folder, name)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    return path
+
+
+def write_columnar(folder, docstore, index_to_docstore_id):
+    """
+    docstore와 라벨 매핑을 열 단위 파일로 저장합니다.
+    다른 핸들이 메모리 매핑 중인 파일을 덮어쓰지 않도록 모든 파일을 임시 파일에 쓴 뒤 교체합니다.
+    """
+    os.makedirs(folder, exist_ok=True)
+    labels = sorted(index_to_docstore_id)
+    count = len(labels)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    ids = []
+    columns = []
+    column_positions = {}
+    codes = []
+
+    text_path = os.path.join(folder, COLUMNAR_TEXT_FILE)
+    with open(text_path + '.tmp', 'wb') as f:
+        position = 0
+        for row, label in enumerate(labels):
+            doc_id = index_to_docstore_id[label]
+            doc = docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f'라벨 {label}의 청크({doc_id})가 docstore에 없습니다.')
+            data = doc.page_content.encode('utf-8')
+            f.write(data)
+            position += len(data)
+            offsets[row + 1] = position
+            ids.append(doc_id.encode('utf-8'))
+            for name, value in doc.metadata.items():
+                column = column_positions.get(name)
+                if column is None:
+                    column = column_positions[name] = len(columns)
+                    columns.append((name, [], {}))
+                    codes.append(np.full(count, _MISSING, dtype=np.int32))
+                _, values, lookup = columns[column]
+                # 같은 값은 한 번만 저장 (JSON 표현 기준)
+                key = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+                code = lookup.get(key)
+                if code is None:
+                    code = lookup[key] = len(values)
+                    values.append(json.loads(key))
+                codes[column][row] = code
+
+    id_array = np.array(ids, dtype=f'S{max([len(doc_id) for doc_id in ids] + [1])}')
+    order = np.argsort(id_array, kind='stable')
+    paths = [text_path]
+    paths.append(_save_array(folder, 'offsets', offsets))
+    paths.append(_save_array(folder, 'labels', np.asarray(labels, dtype=np.int64)))
+    paths.append(_save_array(folder, 'ids', id_array))
+    paths.append(_save_array(folder, 'id_sorted', id_array[order]))
+    paths.append(_save_array(folder, 'id_rows', order.astype(np.int64)))
+    for i, column_codes in enumerate(codes):
+        paths.append(_save_array(folder, f'col_{i}', column_codes))
+
+    meta_path = os.path.join(folder, COLUMNAR_META_FILE)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'version': COLUMNAR_VERSION, 'count': count,
+                   'columns': [[name, values] for name, values, _ in columns]}, f, ensure_ascii=False)
+    # 표 파일을 모두 교체한 뒤 마지막에 메타 파일 교체
+    for path in paths:
+        os.replace(path + '.tmp', path)
+    _remove_stale_columns(folder, len(columns))
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _remove_stale_columns(folder, column_count):
+    # 이전 저장에서 열 수가 더 많았다면 남은 열 파일 삭제
+    for filename in os.listdir(folder):
+        if filename.startswith(f'{COLUMNAR_PREFIX}col_') and filename.endswith('.npy'):
+            try:
+                position = int(filename[len(f'{COLUMNAR_PREFIX}col_'):-len('.npy')])
+            except ValueError:
+                continue
+            if position >= column_count:
+                os.remove(os.path.join(folder, filename))
+
+
+def remove_columnar(folder):
+    """열 단위 docstore 파일을 삭제합니다 (pickle 형식으로 저장할 때)."""
+    for filename in os.listdir(folder):
+        if filename.startswith(COLUMNAR_PREFIX):
+            os.remove(os.path.join(folder, filename))
+
+
+def import_pickle_docstore(folder):
+    """
+    폴더의 index.pkl을 열 단위 docstore로 변환하고 index.pkl을 삭제합니다.
+    이미 변환된 폴더는 그대로 둡니다.
+
+    Returns:
+        변환한 청크 수 (변환하지 않았으면 None)
+    """
+    pickle_path = os.path.join(folder, PICKLE_DOCSTORE_FILE)
+    if not os.path.exists(pickle_path):
+        return None
+    with open(pickle_path, 'rb') as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    write_columnar(folder, docstore, index_to_docstore_id)
+    os.remove(pickle_path)
+    return len(index_to_docstore_id)
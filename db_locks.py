@@ -0,0 +1,179 @@
+"""
+DB별 쓰기 조정
+
+읽기는 잠금 없이 현재 스냅샷(db_snapshots)을 열기 때문에 쓰기 중에도 막히지 않습니다.
+쓰기(로드 → 수정 → 새 스냅샷 저장)는 DB별 배타 잠금으로 직렬화해 동시 수정이 서로를 덮어쓰지 않게 하고,
+문서 삭제/이름 변경 같은 짧은 편집은 대기 중인 편집을 모아 한 번의 로드/저장으로 처리(group commit)합니다.
+DB별 잠금 대기 시간과 현재 쓰기 작업은 stats()로 확인할 수 있습니다.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+# 화면에서 요청한 편집이 진행 중인 수집 작업을 기다리는 최대 시간(초)
+DB_WRITE_LOCK_TIMEOUT = float(os.getenv('DB_WRITE_LOCK_TIMEOUT', '30'))
+
+
+class DBBusyError(Exception):
+    """다른 쓰기 작업이 DB를 사용 중이라 제한 시간 안에 잠금을 얻지 못함"""
+
+    def __init__(self, db_id, holder, waited):
+        super().__init__(f"벡터 DB를 다른 작업({holder or '알 수 없음'})이 수정 중입니다. 잠시 후 다시 시도해주세요.")
+        self.db_id = db_id
+        self.holder = holder
+        self.waited = waited
+
+
+class DBLockManager:
+    """DB ID별 쓰기 잠금과 대기 시간 통계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._stats = {}
+        self._pending = {}
+
+    def _entry(self, db_id):
+        with self._lock:
+            if db_id not in self._locks:
+                self._locks[db_id] = threading.Lock()
+                self._stats[db_id] = {
+                    'writes': 0,
+                    'waiting': 0,
+                    'timeouts': 0,
+                    'merged_edits': 0,
+                    'wait_total': 0.0,
+                    'wait_max': 0.0,
+                    'holder': None,
+                    'held_since': None,
+                }
+            return self._locks[db_id], self._stats[db_id]
+
+    @contextmanager
+    def write(self, db_id, operation='', timeout=None):
+        """
+        DB 쓰기 구간. timeout(초) 안에 잠금을 얻지 못하면 DBBusyError를 발생시킵니다 (None이면 무기한 대기).
+        """
+        lock, stats = self._entry(db_id)
+        started = time.time()
+        with self._lock:
+            stats['waiting'] += 1
+        acquired = lock.acquire(timeout=-1 if timeout is None else timeout)
+        waited = time.time() - started
+        with self._lock:
+            stats['waiting'] -= 1
+            if not acquired:
+                stats['timeouts'] += 1
+                holder = stats['holder']
+            else:
+                stats['writes'] += 1
+                stats['wait_total'] += waited
+                stats['wait_max'] = max(stats['wait_max'], waited)
+                stats['holder'] = operation
+                stats['held_since'] = time.time()
+        if not acquired:
+            raise DBBusyError(db_id, holder, waited)
+        if waited > 1.0:
+            print(f"[DB 잠금] '{db_id}' {operation} 쓰기 잠금 대기 {waited:.2f}초")
+        try:
+            yield waited
+        finally:
+            with self._lock:
+                stats['holder'] = None
+                stats['held_since'] = None
+            lock.release()
+
+    def batched_write(self, db_id, edit, load, commit, operation='', timeout=DB_WRITE_LOCK_TIMEOUT):
+        """
+        짧은 편집을 같은 DB의 대기 중인 다른 편집과 묶어 실행합니다.
+
+        잠금을 얻은 요청이 대기열의 편집을 모두 꺼내 load()로 한 번 로드한 상태에 차례로 적용하고,
+        commit(state)로 한 번만 저장합니다. 편집 하나가 예외를 내면 그 편집만 실패하고,
+        실패한 편집이 상태를 일부 바꿨을 수 있으므로 상태를 다시 로드해 앞서 성공한 편집만 다시 적용합니다.
+        저장이 실패하면 묶인 편집 모두 실패합니다.
+
+        Args:
+            edit: edit(state) -> 결과
+            load: load() -> state
+            commit: commit(state)
+        Returns:
+            edit의 결과
+        """
+        future = Future()
+        with self._lock:
+            self._pending.setdefault(db_id, []).append((edit, future))
+        try:
+            with self.write(db_id, operation, timeout=timeout):
+                with self._lock:
+                    batch = self._pending.pop(db_id, [])
+                if batch:
+                    self._run_batch(db_id, batch, load, commit)
+        except DBBusyError:
+            # 아직 처리되지 않았다면 대기열에서 빼고 실패 처리
+            with self._lock:
+                pending = self._pending.get(db_id, [])
+                if (edit, future) in pending:
+                    pending.remove((edit, future))
+                    raise
+        return future.result()
+
+    @staticmethod
+    def _replay(load, applied):
+        """새로 로드한 상태에 성공한 편집을 다시 적용합니다. (state, [(edit, future, 결과), ...]) 반환"""
+        state = load()
+        return state, [(edit, future, edit(state)) for edit, future, _ in applied]
+
+    def _run_batch(self, db_id, batch, load, commit):
+        try:
+            state = load()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        applied = []
+        for position, (edit, future) in enumerate(batch):
+            try:
+                applied.append((edit, future, edit(state)))
+            except Exception as e:
+                future.set_exception(e)
+                # 실패한 편집의 일부 변경이 저장되지 않도록 성공한 편집만으로 상태를 다시 만듦
+                try:
+                    state, applied = self._replay(load, applied)
+                except Exception as replay_error:
+                    pending = [f for _, f, _ in applied] + [f for _, f in batch[position + 1:]]
+                    for pending_future in pending:
+                        pending_future.set_exception(replay_error)
+                    return
+        results = [(future, result) for _, future, result in applied]
+        if not results:
+            return
+        try:
+            commit(state)
+        except Exception as e:
+            for future, _ in results:
+                future.set_exception(e)
+            return
+        for future, result in results:
+            future.set_result(result)
+        if len(batch) > 1:
+            _, stats = self._entry(db_id)
+            with self._lock:
+                stats['merged_edits'] += len(batch) - 1
+            print(f"[DB 잠금] '{db_id}' 편집 {len(batch)}개를 한 번에 저장")
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for db_id, stats in self._stats.items():
+                entry = dict(stats)
+                entry['wait_avg'] = stats['wait_total'] / stats['writes'] if stats['writes'] else 0.0
+                if stats['held_since'] is not None:
+                    entry['held_for'] = time.time() - stats['held_since']
+                result[db_id] = entry
+            return result
+
+
+# 문서 관리 라우트와 수집 작업이 공유하는 DB 잠금
+db_locks = DBLockManager()
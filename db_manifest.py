@@ -0,0 +1,155 @@
+"""
+DB별 원본 파일 매니페스트
+
+각 벡터 DB 폴더의 manifest.json에 원본 파일별 내용 해시, 청크 ID, 청크 설정을 기록합니다.
+동기화(sync) 시 업로드 폴더의 파일과 매니페스트를 비교해 새 파일/변경된 파일만 다시 처리하고,
+변경/제거된 파일의 청크는 DB에서 삭제합니다.
+중복 제거로 다른 파일의 청크에 합쳐진 청크는 merged_chunk_ids에 기록하고, 합쳐진 청크가 삭제되면
+해당 파일의 해시를 지워 다음 동기화 때 다시 처리되게 합니다.
+"""
+import os
+import json
+import hashlib
+import datetime
+
+from db_snapshots import snapshot_dir
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """파일 내용의 sha256 해시 (큰 파일도 일정한 메모리로 계산)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def new_manifest(chunk_size, chunk_overlap):
+    return {'version': MANIFEST_VERSION, 'chunk_size': chunk_size, 'chunk_overlap': chunk_overlap, 'files': {}}
+
+
+def load_manifest(db_id):
+    """DB(현재 스냅샷)의 매니페스트를 읽습니다. 없으면 None"""
+    path = os.path.join(snapshot_dir(db_id), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(folder, manifest):
+    """매니페스트를 (작성 중인 스냅샷) 폴더의 임시 파일에 쓴 뒤 교체합니다."""
+    path = os.path.join(folder, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def build_manifest_from_docstore(vectorstore, chunk_size, chunk_overlap):
+    """
+    매니페스트가 없는 기존 DB용: docstore 청크의 source 메타데이터로 파일별 청크 ID를 복원합니다.
+    내용 해시를 알 수 없으므로 해당 파일은 첫 동기화 때 한 번 다시 처리됩니다.
+    """
+    manifest = new_manifest(chunk_size, chunk_overlap)
+    for doc_id in vectorstore.index_to_docstore_id.values():
+        doc = vectorstore.docstore.search(doc_id)
+        source = getattr(doc, 'metadata', {}).get('source')
+        if not source:
+            continue
+        entry = manifest['files'].setdefault(os.path.basename(source), {
+            'sha256': None,
+            'chunk_ids': [],
+            'custom_name': doc.metadata.get('custom_name'),
+        })
+        entry['chunk_ids'].append(doc_id)
+    return manifest
+
+
+def record_file(manifest, storage_filename, sha256, chunk_ids, custom_name=None, pdf_loader=None, replace=True,
+                merged_chunk_ids=()):
+    """
+    파일 처리 결과를 기록합니다. replace=False면 기존 청크 ID 목록에 추가합니다.
+    merged_chunk_ids는 이 파일의 중복 청크가 합쳐진 (다른 파일의) 청크 ID입니다.
+    """
+    entry = manifest['files'].get(storage_filename)
+    if entry is None or replace:
+        entry = manifest['files'][storage_filename] = {'chunk_ids': []}
+    entry.update({
+        'sha256': sha256,
+        'chunk_size': manifest['chunk_size'],
+        'chunk_overlap': manifest['chunk_overlap'],
+        'pdf_loader': pdf_loader,
+        'custom_name': custom_name,
+        'updated_at': datetime.datetime.now().isoformat(),
+    })
+    entry['chunk_ids'].extend(chunk_ids)
+    merged = entry.setdefault('merged_chunk_ids', [])
+    merged.extend(doc_id for doc_id in merged_chunk_ids if doc_id not in merged)
+    if not merged:
+        del entry['merged_chunk_ids']
+
+
+def files_merged_into(manifest, doc_ids, exclude=()):
+    """doc_ids 중 하나에 중복 청크가 합쳐진 파일 목록 (exclude의 파일 제외)"""
+    doc_ids = set(doc_ids)
+    return [name for name, entry in manifest['files'].items()
+            if name not in exclude and doc_ids.intersection(entry.get('merged_chunk_ids', ()))]
+
+
+def forget_merged(manifest, doc_ids):
+    """
+    삭제된 청크에 중복 청크가 합쳐진 파일의 해시를 지워 다음 동기화 때 다시 처리되게 합니다.
+    해당 파일 목록을 반환합니다.
+    """
+    doc_ids = set(doc_ids)
+    orphaned = files_merged_into(manifest, doc_ids)
+    for storage_filename in orphaned:
+        entry = manifest['files'][storage_filename]
+        entry['sha256'] = None
+        entry['merged_chunk_ids'] = [doc_id for doc_id in entry['merged_chunk_ids'] if doc_id not in doc_ids]
+    return orphaned
+
+
+def forget_chunks(manifest, doc_ids, storage_filenames=None):
+    """
+    삭제된 청크를 매니페스트에서 제거하고, 청크가 남지 않은 파일 항목은 삭제합니다.
+    storage_filenames(청크 출처의 저장 파일명)를 주면 해당 파일 항목만 확인합니다.
+    삭제된 청크에 중복 청크가 합쳐진 파일은 다음 동기화 때 다시 처리되도록 표시합니다.
+    """
+    doc_ids = set(doc_ids)
+    candidates = [name for name in (storage_filenames or ()) if name in manifest['files']]
+    for storage_filename in candidates or list(manifest['files']):
+        entry = manifest['files'][storage_filename]
+        entry['chunk_ids'] = [doc_id for doc_id in entry['chunk_ids'] if doc_id not in doc_ids]
+        if not entry['chunk_ids'] and not entry.get('merged_chunk_ids'):
+            del manifest['files'][storage_filename]
+    forget_merged(manifest, doc_ids)
+
+
+def diff_manifest(manifest, file_hashes, remove_missing=True):
+    """
+    업로드 파일 해시와 매니페스트를 비교합니다.
+
+    Args:
+        file_hashes: {저장 파일명: sha256} DB에 있어야 할 파일 목록
+        remove_missing: True면 file_hashes에 없는 매니페스트 파일을 제거 대상으로 분류
+    Returns:
+        {'added': [...], 'changed': [...], 'unchanged': [...], 'removed': [...]}
+    """
+    diff = {'added': [], 'changed': [], 'unchanged': [], 'removed': []}
+    for storage_filename, sha256 in file_hashes.items():
+        entry = manifest['files'].get(storage_filename)
+        if entry is None:
+            diff['added'].append(storage_filename)
+        elif (entry.get('sha256') != sha256
+              or entry.get('chunk_size') != manifest['chunk_size']
+              or entry.get('chunk_overlap') != manifest['chunk_overlap']):
+            diff['changed'].append(storage_filename)
+        else:
+            diff['unchanged'].append(storage_filename)
+    if remove_missing:
+        diff['removed'] = [name for name in manifest['files'] if name not in file_hashes]
+    return diff
@@ -0,0 +1,153 @@
+"""
+DB 메타데이터(db_metadata.json) 저장소
+
+파일 내용을 메모리에 한 번 읽어 두고 조회는 메모리 사본으로 처리합니다.
+다른 프로세스가 파일을 바꾼 경우에 대비해 일정 간격(METADATA_STAT_INTERVAL초)마다
+파일의 수정 시각/크기만 확인하고, 바뀌었을 때만 다시 읽습니다.
+
+수정은 update() 블록 안에서 최신 내용을 기준으로 읽고-수정하고-저장하며,
+프로세스 안에서는 잠금으로, 프로세스 사이에서는 잠금 파일(fcntl 사용 가능 시)로 직렬화해
+동시에 들어온 수정이 서로를 덮어쓰지 않게 합니다.
+저장은 임시 파일에 쓴 뒤 교체하므로 저장 도중 중단되어도 이전 파일이 남습니다.
+"""
+import os
+import copy
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 다른 프로세스의 변경을 확인하는 최소 간격(초)
+METADATA_STAT_INTERVAL = float(os.getenv('DB_METADATA_STAT_INTERVAL', '1.0'))
+
+
+def _default_metadata():
+    return {'_categories': ['기타']}
+
+
+class DBMetadataStore:
+    """
+    캐시된 DB 메타데이터
+
+    Args:
+        path: 메타데이터 JSON 파일 경로
+        normalize: 파일에서 읽은 메타데이터를 검증/보정하는 함수 (제자리 수정)
+    """
+
+    def __init__(self, path, normalize=None, stat_interval=METADATA_STAT_INTERVAL):
+        self.path = path
+        self._normalize = normalize
+        self.stat_interval = stat_interval
+        self._lock = threading.RLock()
+        self._data = None
+        self._file_state = None
+        self._checked_at = 0.0
+        self.version = 0
+        self.reloads = 0
+        self.writes = 0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load_file(self):
+        if not os.path.exists(self.path):
+            return _default_metadata()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            if self._normalize is not None:
+                self._normalize(metadata)
+            return metadata
+        except Exception as e:
+            print(f"메타데이터 파일 로드 중 오류: {e}")
+            # 파일 손상 시 마지막으로 읽은 내용 유지 (처음이면 기본값)
+            return self._data if self._data is not None else _default_metadata()
+
+    def _refresh(self, force=False):
+        # self._lock 안에서 호출
+        now = time.monotonic()
+        if not force and self._data is not None and now - self._checked_at < self.stat_interval:
+            return
+        self._checked_at = now
+        state = self._stat()
+        if self._data is not None and state == self._file_state:
+            return
+        self._data = self._load_file()
+        self._file_state = state
+        self.version += 1
+        self.reloads += 1
+
+    def read(self):
+        """
+        현재 메타데이터 (공유 사본이므로 수정하지 말 것, 수정은 update() 사용)
+        """
+        with self._lock:
+            self._refresh()
+            return self._data
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def update(self):
+        """
+        메타데이터 수정 블록. 최신 내용의 복사본을 넘겨주고, 블록이 예외 없이 끝나면
+        바뀐 내용이 있을 때만 저장합니다.
+
+            with db_metadata.update() as metadata:
+                metadata[db_id]['category'] = '기타'
+        """
+        with self._lock, self._file_lock():
+            self._refresh(force=True)
+            metadata = copy.deepcopy(self._data)
+            yield metadata
+            if metadata != self._data:
+                self._write(metadata)
+
+    def update_db(self, db_id, **values):
+        """DB 항목의 필드를 갱신합니다 (항목이 없으면 아무것도 하지 않음). 갱신 여부 반환"""
+        with self.update() as metadata:
+            if db_id not in metadata:
+                return False
+            metadata[db_id].update(values)
+            return True
+
+    def _write(self, metadata):
+        # self._lock 안에서 호출
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"메타데이터 파일 저장 중 오류: {e}")
+            raise
+        self._data = metadata
+        self._file_state = self._stat()
+        self._checked_at = time.monotonic()
+        self.version += 1
+        self.writes += 1
+
+    def stats(self):
+        with self._lock:
+            return {'version': self.version, 'reloads': self.reloads, 'writes': self.writes}
@@ -0,0 +1,265 @@
+"""
+벡터 DB 메모리 상주 관리자
+
+DB는 처음 사용될 때 로드되고(retriever + 그래프), 설정한 메모리 예산을 넘으면
+가장 오래 사용되지 않은 DB의 retriever와 그래프를 메모리에서 내립니다.
+내려간 DB는 다음 요청에서 자동으로 다시 로드됩니다.
+
+DB 내용이 바뀌면(버전 증가) 상주 중인 DB의 retriever와 그래프를 백그라운드에서 새로 만든 뒤
+항목을 통째로 교체합니다. 진행 중인 요청은 이미 받은 이전 항목으로 끝까지 처리되고,
+교체를 기다리느라 요청이 막히지 않습니다.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from faiss_index import INDEX_FILE, DOCSTORE_FILE
+from columnar_docstore import COLUMNAR_PREFIX
+from db_versions import get_db_version
+from db_snapshots import snapshot_dir
+from vectorstore_handles import vectorstore_handles
+
+# 기본 메모리 예산 (환경 변수 DB_MEMORY_BUDGET_MB로 변경 가능, 0이면 무제한)
+DEFAULT_MEMORY_BUDGET_MB = int(os.getenv('DB_MEMORY_BUDGET_MB', '2048'))
+# 역직렬화된 docstore가 pickle 파일 대비 차지하는 대략적인 메모리 배수
+DOCSTORE_MEMORY_FACTOR = 3
+# 열 단위 docstore는 메모리 매핑되므로 파일 크기의 일부만 반영 (인덱스와 같은 비율)
+MMAP_MEMORY_DIVISOR = 4
+
+
+def estimate_db_memory(folder, mmap=True):
+    """DB를 메모리에 올렸을 때의 대략적인 사용량(바이트)을 추정합니다."""
+    try:
+        folder = snapshot_dir(folder)
+    except FileNotFoundError:
+        return 0
+    size = 0
+    docstore_path = os.path.join(folder, DOCSTORE_FILE)
+    if os.path.exists(docstore_path):
+        size += os.path.getsize(docstore_path) * DOCSTORE_MEMORY_FACTOR
+    for filename in os.listdir(folder):
+        if filename.startswith(COLUMNAR_PREFIX):
+            size += os.path.getsize(os.path.join(folder, filename)) // MMAP_MEMORY_DIVISOR
+    index_path = os.path.join(folder, INDEX_FILE)
+    # 메모리 매핑된 인덱스는 페이지 캐시를 사용하므로 일부만 반영
+    if os.path.exists(index_path):
+        size += os.path.getsize(index_path) // (MMAP_MEMORY_DIVISOR if mmap else 1)
+    return size
+
+
+class DBResidencyManager:
+    """
+    DB ID -> {'retriever', 'graph', 'display_name', 'load_time', ...} 상주 캐시
+
+    Args:
+        loader: (db_id, previous)를 받아 상주 항목(dict)을 만드는 함수 (previous는 교체될 이전 항목 또는 None)
+        list_dbs: 디스크에 존재하는 DB ID 목록을 반환하는 함수
+        display_name: db_id의 표시 이름을 반환하는 함수
+        memory_budget_mb: 상주 DB 전체의 메모리 예산 (0이면 무제한)
+    """
+
+    def __init__(self, loader, list_dbs, display_name, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self._loader = loader
+        self._list_dbs = list_dbs
+        self._display_name = display_name
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._resident = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='db-refresh')
+        self._refreshing = set()
+        self._refresh_again = set()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    # dict 호환 인터페이스 (상주 중인 DB 기준)
+    def __contains__(self, db_id):
+        return db_id in self._resident
+
+    def __getitem__(self, db_id):
+        return self._resident[db_id]
+
+    def __len__(self):
+        return len(self._resident)
+
+    def get(self, db_id, default=None):
+        return self._resident.get(db_id, default)
+
+    def keys(self):
+        return list(self._resident.keys())
+
+    def values(self):
+        return list(self._resident.values())
+
+    def items(self):
+        """디스크의 모든 DB를 (db_id, 정보) 형태로 반환합니다. 상주하지 않은 DB는 그래프가 None입니다."""
+        result = []
+        for db_id in self._list_dbs():
+            entry = self._resident.get(db_id)
+            if entry is None:
+                entry = {'display_name': self._display_name(db_id), 'retriever': None, 'graph': None, 'resident': False}
+            result.append((db_id, entry))
+        return result
+
+    def _load_lock(self, db_id):
+        with self._lock:
+            return self._load_locks.setdefault(db_id, threading.Lock())
+
+    def acquire(self, db_id):
+        """DB 항목을 반환합니다. 상주하지 않으면 로드하고, 예산 초과 시 LRU DB를 내립니다."""
+        with self._lock:
+            entry = self._resident.get(db_id)
+            if entry is not None:
+                self._resident.move_to_end(db_id)
+                entry['last_used'] = time.time()
+                self.hits += 1
+        if entry is not None:
+            # 갱신 알림을 놓친 오래된 항목은 일단 그대로 사용하고 백그라운드에서 갱신
+            if entry.get('version', 0) < get_db_version(db_id):
+                self.schedule_refresh(db_id)
+            return entry
+
+        # 같은 DB를 동시에 두 번 로드하지 않도록 DB별 잠금
+        with self._load_lock(db_id):
+            with self._lock:
+                entry = self._resident.get(db_id)
+                if entry is not None:
+                    self._resident.move_to_end(db_id)
+                    return entry
+            version = get_db_version(db_id)
+            entry = self._loader(db_id, None)
+            entry['version'] = version
+            entry.setdefault('display_name', self._display_name(db_id))
+            entry.setdefault('memory_bytes', estimate_db_memory(db_id))
+            entry['resident'] = True
+            entry['last_used'] = time.time()
+            with self._lock:
+                self._resident[db_id] = entry
+                self.loads += 1
+                self._enforce_budget(keep=db_id)
+            return entry
+
+    def put(self, db_id, entry):
+        """이미 로드한 항목을 등록합니다."""
+        entry.setdefault('version', get_db_version(db_id))
+        entry.setdefault('display_name', self._display_name(db_id))
+        entry.setdefault('memory_bytes', estimate_db_memory(db_id))
+        entry['resident'] = True
+        entry['last_used'] = time.time()
+        with self._lock:
+            self._resident[db_id] = entry
+            self._resident.move_to_end(db_id)
+            self._enforce_budget(keep=db_id)
+
+    def schedule_refresh(self, db_id, version=None):
+        """
+        DB가 바뀌었을 때 호출합니다 (db_versions 리스너).
+        상주 중인 DB는 백그라운드에서 새 항목을 만들어 교체하고, 디스크에서 사라진 DB는 내립니다.
+        상주하지 않은 새 DB는 예산 안에 들면 미리 로드합니다.
+        """
+        with self._lock:
+            if db_id in self._refreshing:
+                # 갱신 중에 다시 바뀌면 현재 갱신이 끝난 뒤 한 번 더 실행
+                self._refresh_again.add(db_id)
+                return
+            if db_id not in self._resident and not (os.path.isdir(db_id) and self.would_fit(db_id)):
+                return
+            self._refreshing.add(db_id)
+        self._refresh_executor.submit(self._refresh, db_id)
+
+    def _refresh(self, db_id):
+        while True:
+            try:
+                if not os.path.isdir(db_id):
+                    self.evict(db_id)
+                else:
+                    self._swap_in(db_id)
+            except Exception as e:
+                print(f"벡터 DB '{db_id}' 갱신 중 오류 (이전 항목 유지): {e}")
+            with self._lock:
+                if db_id not in self._refresh_again:
+                    self._refreshing.discard(db_id)
+                    return
+                self._refresh_again.discard(db_id)
+
+    def _swap_in(self, db_id):
+        version = get_db_version(db_id)
+        previous = self._resident.get(db_id)
+        if previous is not None and previous.get('version', 0) >= version:
+            return
+        start_time = time.time()
+        # 새 항목은 잠금 밖에서 만들고, 교체만 잠금 안에서 수행
+        with self._load_lock(db_id):
+            entry = self._loader(db_id, previous)
+        entry['version'] = version
+        entry['display_name'] = self._display_name(db_id)
+        entry['memory_bytes'] = estimate_db_memory(db_id)
+        entry['resident'] = True
+        entry['last_used'] = previous.get('last_used', time.time()) if previous else time.time()
+        with self._lock:
+            current = self._resident.get(db_id)
+            if current is not None and current.get('version', 0) > version:
+                return
+            self._resident[db_id] = entry
+            self.refreshes += 1
+            self._enforce_budget(keep=db_id)
+        print(f"벡터 DB '{entry['display_name']}' 버전 {version}으로 갱신 - 소요 시간: {time.time() - start_time:.2f}초")
+
+    def would_fit(self, db_id):
+        """DB를 추가로 올려도 예산 안에 드는지 확인합니다 (사전 로드용)."""
+        if not self.memory_budget:
+            return True
+        return self.memory_bytes() + estimate_db_memory(db_id) <= self.memory_budget
+
+    def evict(self, db_id):
+        """
+        DB의 retriever와 그래프를 메모리에서 내립니다.
+        공유 핸들 레지스트리의 최근 사용 핸들(강한 참조)도 함께 내려 메모리가 실제로 해제되게 합니다.
+        """
+        with self._lock:
+            entry = self._resident.pop(db_id, None)
+        vectorstore_handles.discard(db_id)
+        if entry is not None:
+            self.evictions += 1
+            print(f"벡터 DB '{entry.get('display_name', db_id)}' 메모리에서 해제")
+        return entry is not None
+
+    def memory_bytes(self):
+        return sum(entry.get('memory_bytes', 0) for entry in self._resident.values())
+
+    def _enforce_budget(self, keep=None):
+        if not self.memory_budget:
+            return
+        while self.memory_bytes() > self.memory_budget and len(self._resident) > 1:
+            victim = next(iter(self._resident))
+            if victim == keep:
+                break
+            self.evict(victim)
+
+    def stats(self):
+        return {
+            'memory_budget_bytes': self.memory_budget,
+            'memory_bytes': self.memory_bytes(),
+            'resident': [
+                {
+                    'db_id': db_id,
+                    'display_name': entry.get('display_name'),
+                    'memory_bytes': entry.get('memory_bytes', 0),
+                    'version': entry.get('version', 0),
+                    'load_time': entry.get('load_time'),
+                    'graph_time': entry.get('graph_time'),
+                    'last_used': entry.get('last_used'),
+                }
+                for db_id, entry in self._resident.items()
+            ],
+            'known_dbs': len(self._list_dbs()),
+            'loads': self.loads,
+            'hits': self.hits,
+            'evictions': self.evictions,
+            'refreshes': self.refreshes,
+            'refreshing': sorted(self._refreshing),
+        }
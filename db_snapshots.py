@@ -0,0 +1,309 @@
+"""
+벡터 DB 스냅샷 (버전별 디렉터리 + CURRENT 포인터)
+
+DB 폴더 구조:
+    {db_id}/CURRENT                 현재 스냅샷 이름 (원자적으로 교체)
+    {db_id}/snapshots/v000001/      index.faiss, index.pkl, bm25_*, manifest.json, CHECKSUMS.json
+    {db_id}/snapshots/.staging-*    작성 중인 스냅샷 (완료 전에는 읽지 않음)
+
+쓰기는 항상 새 스냅샷 디렉터리에서 이루어지고, 파일 체크섬을 기록한 뒤 CURRENT를 바꿔 게시합니다.
+작성 중 오류나 비정상 종료가 있어도 CURRENT는 이전의 완전한 스냅샷을 가리킵니다.
+새 스냅샷은 이전 스냅샷 파일을 하드 링크로 물려받고, 저장 함수들은 파일을 임시 파일 후 교체 방식으로
+쓰므로 이전 스냅샷의 내용은 바뀌지 않습니다. CURRENT가 없는 이전 버전 DB는 폴더 자체를 스냅샷으로 읽습니다.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+
+CURRENT_FILE = 'CURRENT'
+SNAPSHOTS_DIR = 'snapshots'
+CHECKSUM_FILE = 'CHECKSUMS.json'
+STAGING_PREFIX = '.staging-'
+# 현재 스냅샷을 포함해 보관할 스냅샷 수 (롤백 가능 범위)
+SNAPSHOT_RETENTION = int(os.getenv('DB_SNAPSHOT_RETENTION', '3'))
+# 스냅샷 이전 버전 DB 폴더에 있던 데이터 파일 (첫 스냅샷으로 옮긴 뒤 정리)
+LEGACY_FILE_RE = re.compile(r'^(index\.faiss|index\.pkl|manifest\.json|bm25_.*)$')
+_SNAPSHOT_RE = re.compile(r'^v(\d{6,})$')
+
+_active_staging = set()
+_lock = threading.Lock()
+# DB 폴더 -> (CURRENT 파일의 (inode, 수정 시각, 크기), 확인을 마친 읽기용 디렉터리)
+_resolved = {}
+
+
+def _snapshot_root(db_id):
+    return os.path.join(db_id, SNAPSHOTS_DIR)
+
+
+def list_snapshots(db_id):
+    """완료된 스냅샷 이름 목록 (오래된 순)"""
+    root = _snapshot_root(db_id)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if _SNAPSHOT_RE.match(name))
+
+
+def current_snapshot(db_id):
+    """CURRENT가 가리키는 스냅샷 이름 (이전 버전 DB는 None)"""
+    try:
+        with open(os.path.join(db_id, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_checksums(folder):
+    try:
+        with open(os.path.join(folder, CHECKSUM_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def verify_snapshot(db_id, name, deep=False):
+    """
+    스냅샷이 완전한지 확인합니다.
+    기본은 파일 존재/크기만 비교하고, deep=True면 sha256까지 다시 계산합니다.
+    """
+    folder = os.path.join(_snapshot_root(db_id), name)
+    checksums = _read_checksums(folder)
+    if checksums is None:
+        return False
+    for filename, info in checksums['files'].items():
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path) or os.path.getsize(path) != info['size']:
+            return False
+        if deep and _file_sha256(path) != info['sha256']:
+            return False
+    return True
+
+
+def _resolve(db_id, name):
+    if verify_snapshot(db_id, name):
+        return os.path.join(_snapshot_root(db_id), name)
+    for candidate in reversed(list_snapshots(db_id)):
+        if candidate != name and verify_snapshot(db_id, candidate):
+            print(f"[스냅샷] '{db_id}'의 현재 스냅샷 {name}이(가) 손상되어 {candidate}을(를) 사용합니다.")
+            return os.path.join(_snapshot_root(db_id), candidate)
+    raise FileNotFoundError(f"벡터 DB '{db_id}'에 읽을 수 있는 스냅샷이 없습니다.")
+
+
+def snapshot_dir(db_id, verify=False):
+    """
+    읽기용 디렉터리를 반환합니다.
+    CURRENT가 가리키는 스냅샷이 불완전하면 가장 최근의 완전한 스냅샷을 사용합니다.
+    스냅샷 디렉터리나 이전 버전 DB 폴더를 넘기면 그대로 반환합니다.
+
+    파일 크기 확인은 CURRENT가 바뀌었을 때(새 스냅샷 게시, 롤백)와 verify=True일 때(인덱스 로드,
+    새 스냅샷 작성)만 하고, 그 외에는 CURRENT 파일의 stat 한 번으로 이전 결과를 재사용합니다.
+    """
+    key = os.path.abspath(db_id)
+    try:
+        st = os.stat(os.path.join(db_id, CURRENT_FILE))
+    except FileNotFoundError:
+        return db_id
+    state = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _resolved.get(key)
+    if not verify and cached is not None and cached[0] == state:
+        return cached[1]
+    name = current_snapshot(db_id)
+    if name is None:
+        return db_id
+    folder = _resolve(db_id, name)
+    with _lock:
+        _resolved[key] = (state, folder)
+    return folder
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _write_current(db_id, name):
+    path = os.path.join(db_id, CURRENT_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+    _fsync_dir(db_id)
+    # _lock 안에서 호출 (stat이 같게 나오더라도 이 프로세스가 바꾼 CURRENT는 다시 확인)
+    _resolved.pop(os.path.abspath(db_id), None)
+
+
+def _seal(db_id, staging, base_dir, tag=None):
+    """변경된 파일을 디스크에 동기화하고 체크섬을 기록합니다 (물려받은 파일은 이전 체크섬 재사용)."""
+    base_checksums = (_read_checksums(base_dir) or {}).get('files', {}) if base_dir != db_id else {}
+    files = {}
+    for filename in sorted(os.listdir(staging)):
+        path = os.path.join(staging, filename)
+        if filename == CHECKSUM_FILE or filename.endswith('.tmp') or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        base_path = os.path.join(base_dir, filename)
+        inherited = (filename in base_checksums and os.path.exists(base_path)
+                     and os.path.samefile(path, base_path))
+        if inherited:
+            files[filename] = base_checksums[filename]
+            continue
+        with open(path, 'rb') as f:
+            os.fsync(f.fileno())
+        files[filename] = {'size': stat.st_size, 'sha256': _file_sha256(path)}
+    with open(os.path.join(staging, CHECKSUM_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'created_at': time.time(), 'tag': tag, 'files': files}, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_dir(staging)
+
+
+@contextmanager
+def write_snapshot(db_id, tag=None):
+    """
+    새 스냅샷을 작성하는 컨텍스트. 현재 스냅샷 파일을 물려받은 작성용 디렉터리를 넘겨주며,
+    블록이 정상 종료되면 체크섬 기록 → 스냅샷 게시(CURRENT 교체) → 오래된 스냅샷 정리 순으로 진행합니다.
+    블록에서 예외가 나면 작성용 디렉터리는 삭제되고 현재 스냅샷은 그대로 유지됩니다.
+    tag(예: 작업 ID)는 체크섬 파일에 기록되어 find_snapshot으로 게시 여부를 확인할 수 있습니다.
+    """
+    root = _snapshot_root(db_id)
+    os.makedirs(root, exist_ok=True)
+    base_dir = snapshot_dir(db_id, verify=True)
+    staging = os.path.join(root, f'{STAGING_PREFIX}{uuid.uuid4().hex}')
+    os.makedirs(staging)
+    with _lock:
+        _active_staging.add(staging)
+    try:
+        for filename in os.listdir(base_dir):
+            path = os.path.join(base_dir, filename)
+            if filename in (CHECKSUM_FILE, CURRENT_FILE) or not os.path.isfile(path):
+                continue
+            if base_dir == db_id and not LEGACY_FILE_RE.match(filename):
+                continue
+            _link_or_copy(path, os.path.join(staging, filename))
+
+        yield staging
+
+        _seal(db_id, staging, base_dir, tag)
+        with _lock:
+            existing = list_snapshots(db_id)
+            number = int(_SNAPSHOT_RE.match(existing[-1]).group(1)) + 1 if existing else 1
+            name = f'v{number:06d}'
+            os.rename(staging, os.path.join(root, name))
+            _fsync_dir(root)
+            _write_current(db_id, name)
+        print(f"[스냅샷] '{db_id}' 스냅샷 {name} 게시")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        with _lock:
+            _active_staging.discard(staging)
+    gc_snapshots(db_id)
+
+
+def find_snapshot(db_id, tag):
+    """tag로 게시된 스냅샷 이름 (없으면 None)"""
+    for name in reversed(list_snapshots(db_id)):
+        checksums = _read_checksums(os.path.join(_snapshot_root(db_id), name))
+        if checksums is not None and checksums.get('tag') == tag:
+            return name
+    return None
+
+
+def gc_snapshots(db_id, retention=SNAPSHOT_RETENTION):
+    """
+    보관 개수를 넘는 오래된 스냅샷과 중단된 작성용 디렉터리를 삭제합니다.
+    이미 열려 있는(메모리 매핑된) 파일은 삭제되어도 닫힐 때까지 읽을 수 있습니다.
+    """
+    current = current_snapshot(db_id)
+    if current is None:
+        return []
+    snapshots = list_snapshots(db_id)
+    keep = set(snapshots[-max(1, retention):]) | {current}
+    removed = []
+    root = _snapshot_root(db_id)
+    for name in snapshots:
+        if name not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed.append(name)
+    with _lock:
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.startswith(STAGING_PREFIX) and path not in _active_staging:
+                shutil.rmtree(path, ignore_errors=True)
+    # 이전 버전 DB의 폴더 파일은 스냅샷이 두 개 이상 쌓인 뒤 정리 (그 사이 열려던 요청 보호)
+    if len(snapshots) > 1:
+        for filename in os.listdir(db_id):
+            if LEGACY_FILE_RE.match(filename) and os.path.isfile(os.path.join(db_id, filename)):
+                os.remove(os.path.join(db_id, filename))
+    if removed:
+        print(f"[스냅샷] '{db_id}' 오래된 스냅샷 {len(removed)}개 삭제: {', '.join(removed)}")
+    return removed
+
+
+def rollback_snapshot(db_id, name=None):
+    """
+    CURRENT를 지정한 스냅샷(기본: 현재 바로 이전 스냅샷)으로 되돌립니다.
+    대상 스냅샷은 체크섬까지 확인한 뒤 사용합니다.
+    """
+    current = current_snapshot(db_id)
+    snapshots = list_snapshots(db_id)
+    if name is None:
+        older = [snapshot for snapshot in snapshots if current is None or snapshot < current]
+        if not older:
+            raise ValueError('되돌릴 이전 스냅샷이 없습니다.')
+        name = older[-1]
+    if name not in snapshots:
+        raise ValueError(f'스냅샷을 찾을 수 없습니다: {name}')
+    if not verify_snapshot(db_id, name, deep=True):
+        raise ValueError(f'스냅샷 {name}의 체크섬이 일치하지 않습니다.')
+    with _lock:
+        _write_current(db_id, name)
+    print(f"[스냅샷] '{db_id}' 스냅샷 {current} → {name} 롤백")
+    return name
+
+
+def snapshot_info(db_id, deep=False):
+    """스냅샷 목록과 현재 스냅샷, 각 스냅샷의 크기/생성 시각/무결성 여부"""
+    current = current_snapshot(db_id)
+    snapshots = []
+    for name in list_snapshots(db_id):
+        checksums = _read_checksums(os.path.join(_snapshot_root(db_id), name)) or {}
+        snapshots.append({
+            'name': name,
+            'current': name == current,
+            'created_at': checksums.get('created_at'),
+            'size_bytes': sum(info['size'] for info in checksums.get('files', {}).values()),
+            'valid': verify_snapshot(db_id, name, deep=deep),
+        })
+    return {'db_id': db_id, 'current': current, 'retention': SNAPSHOT_RETENTION, 'snapshots': snapshots}
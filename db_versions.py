@@ -0,0 +1,39 @@
+"""
+DB 콘텐츠 버전 관리
+
+document_manager의 변경 라우트가 DB 내용을 바꿀 때마다 버전을 올리고,
+캐시들은 항목에 기록된 버전과 현재 버전을 비교해 오래된 결과를 버립니다.
+버전이 바뀌면 등록된 리스너(상주 DB의 retriever/그래프 갱신 등)에 알립니다.
+"""
+import threading
+
+_versions = {}
+_listeners = []
+_lock = threading.Lock()
+
+
+def get_db_version(db_id):
+    """DB의 현재 콘텐츠 버전을 반환합니다 (프로세스 시작 시 0)."""
+    return _versions.get(db_id, 0)
+
+
+def add_version_listener(callback):
+    """버전이 바뀔 때마다 callback(db_id, version)을 호출하도록 등록합니다."""
+    with _lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+
+
+def bump_db_version(db_id):
+    """DB 내용이 바뀌었음을 기록하고 새 버전을 반환합니다."""
+    with _lock:
+        _versions[db_id] = _versions.get(db_id, 0) + 1
+        version = _versions[db_id]
+        listeners = list(_listeners)
+    # 리스너 오류가 DB 변경 작업을 실패시키지 않도록 격리
+    for callback in listeners:
+        try:
+            callback(db_id, version)
+        except Exception as e:
+            print(f"DB 버전 리스너 오류 ({db_id}): {e}")
+    return version
@@ -0,0 +1,164 @@
+"""
+문서 관리 화면용 청크 목록 (페이지 조회, 필터, 출처별 집계)
+
+스냅샷 핸들마다 한 번 라벨 순 청크 목록, 내용 접두어 정렬 목록, 출처 목록을 만들어 두고
+이후 요청은 메타데이터 색인과 이 목록만으로 한 페이지씩 응답합니다.
+핸들은 스냅샷 동안 바뀌지 않으므로 목록도 핸들에 붙여 함께 재사용됩니다.
+
+커서는 청크 목록에서는 마지막으로 반환한 라벨, 출처 목록에서는 마지막 출처 경로입니다.
+"""
+import os
+import bisect
+import urllib.parse
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# 목록에 보여줄 내용 미리보기 길이
+PREVIEW_CHARS = 50
+# 접두어 검색용 정렬 키 길이 (더 긴 접두어는 후보를 좁힌 뒤 원문과 비교)
+PREFIX_KEY_CHARS = 32
+
+
+def _prefix_key(text):
+    return text.lstrip().lower()[:PREFIX_KEY_CHARS]
+
+
+def _chunk_text(docstore, chunk_id):
+    # 열 단위 docstore는 Document를 만들지 않고 본문만 읽음
+    if hasattr(docstore, 'text'):
+        return docstore.text(chunk_id)
+    return docstore._dict[chunk_id].page_content
+
+
+def document_row(doc_id, doc):
+    """청크 하나를 목록 응답 형식으로 변환합니다."""
+    # 소스 문서 경로에서 파일명만 추출
+    source = doc.metadata.get('source', '알 수 없음')
+    filename = os.path.basename(source) if source else '알 수 없음'
+    # URL 디코딩하여 원본 파일명 가져오기
+    original_filename = urllib.parse.unquote(filename)
+    content = doc.page_content
+    return {
+        'id': doc_id,
+        'source': source,  # 전체 경로는 내부적으로 사용
+        'filename': filename,  # 화면에 표시할 인코딩된 파일명
+        'original_filename': original_filename,  # 디코딩된 원본 파일명
+        'custom_name': doc.metadata.get('custom_name', original_filename),  # 사용자 지정 문서명
+        'content': content[:PREVIEW_CHARS] + '...' if len(content) > PREVIEW_CHARS else content,  # 미리보기
+        # source는 이미 별도로 처리했으므로 제외
+        'metadata': {key: value for key, value in doc.metadata.items() if key != 'source' and value},
+    }
+
+
+def page_size(limit):
+    try:
+        limit = int(limit or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+class DocumentListing:
+    """한 스냅샷 핸들의 미리 계산된 청크/출처 목록"""
+
+    def __init__(self, vectorstore):
+        index = vectorstore.metadata_index
+        docs = vectorstore.docstore._dict
+        rows = sorted((record[0], chunk_id) for chunk_id, record in index.chunks.items() if chunk_id in docs)
+        self.labels = [label for label, _ in rows]
+        keyed = sorted((_prefix_key(_chunk_text(vectorstore.docstore, chunk_id)), label) for label, chunk_id in rows)
+        self._prefix_keys = [key for key, _ in keyed]
+        self._prefix_labels = [label for _, label in keyed]
+        self.sources = sorted(index.values('source').items())
+        self._source_names = [source for source, _ in self.sources]
+
+    def _prefix_labels_for(self, vectorstore, prefix):
+        key = _prefix_key(prefix)
+        lo = bisect.bisect_left(self._prefix_keys, key)
+        hi = bisect.bisect_left(self._prefix_keys, key + '\uffff', lo)
+        labels = self._prefix_labels[lo:hi]
+        if len(prefix.lstrip()) > PREFIX_KEY_CHARS:
+            wanted = prefix.lstrip().lower()
+            labels = [label for label in labels
+                      if _chunk_text(vectorstore.docstore, vectorstore.index_to_docstore_id[label])
+                      .lstrip().lower().startswith(wanted)]
+        return labels
+
+    def matching_labels(self, vectorstore, source=None, custom_name=None, prefix=None):
+        """필터에 맞는 청크 라벨 (라벨 순). 필터가 없으면 None (전체)"""
+        index = vectorstore.metadata_index
+        candidates = []
+        if source is not None:
+            candidates.append([index.label(chunk_id) for chunk_id in index.find('source', source)])
+        if custom_name is not None:
+            candidates.append([index.label(chunk_id) for chunk_id in index.find('custom_name', custom_name)])
+        if prefix:
+            candidates.append(self._prefix_labels_for(vectorstore, prefix))
+        if not candidates:
+            return None
+        # 가장 작은 후보에서 시작해 나머지 후보와 교집합
+        candidates.sort(key=len)
+        labels = candidates[0]
+        for other in candidates[1:]:
+            other = set(other)
+            labels = [label for label in labels if label in other]
+        return sorted(labels)
+
+    def chunks(self, vectorstore, cursor=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        """
+        청크 한 페이지
+
+        Returns:
+            (행 목록, 필터에 맞는 전체 청크 수, 다음 커서 또는 None)
+        """
+        labels = self.matching_labels(vectorstore, **filters)
+        if labels is None:
+            labels = self.labels
+        start = bisect.bisect_right(labels, int(cursor)) if cursor not in (None, '') else 0
+        page = labels[start:start + limit]
+        docs = vectorstore.docstore._dict
+        rows = [document_row(chunk_id, docs[chunk_id])
+                for chunk_id in (vectorstore.index_to_docstore_id[label] for label in page)]
+        next_cursor = str(page[-1]) if page and start + limit < len(labels) else None
+        return rows, len(labels), next_cursor
+
+    def groups(self, vectorstore, cursor=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        """
+        출처(원본 파일)별 한 행씩, 청크 수와 함께 반환합니다.
+
+        Returns:
+            (행 목록, 필터에 맞는 전체 출처 수, 다음 커서 또는 None)
+        """
+        index = vectorstore.metadata_index
+        labels = self.matching_labels(vectorstore, **filters)
+        if labels is None:
+            sources, names = self.sources, self._source_names
+        else:
+            counts = {}
+            for label in labels:
+                source = index.get(vectorstore.index_to_docstore_id[label], 'source')
+                if source is not None:
+                    counts[source] = counts.get(source, 0) + 1
+            sources = sorted(counts.items())
+            names = [source for source, _ in sources]
+        start = bisect.bisect_right(names, cursor) if cursor not in (None, '') else 0
+        page = sources[start:start + limit]
+        docs = vectorstore.docstore._dict
+        rows = []
+        for source, count in page:
+            # 문서명과 메타데이터는 출처의 첫 청크 기준
+            first = index.first('source', source)
+            row = document_row(first, docs[first])
+            del row['id'], row['content']
+            row['chunk_count'] = count
+            rows.append(row)
+        next_cursor = page[-1][0] if page and start + limit < len(sources) else None
+        return rows, len(sources), next_cursor
+
+
+def get_listing(vectorstore):
+    """핸들에 붙은 목록을 반환합니다 (없으면 이 스냅샷에서 처음 한 번 생성)."""
+    listing = getattr(vectorstore, 'document_listing', None)
+    if listing is None:
+        listing = vectorstore.document_listing = DocumentListing(vectorstore)
+    return listing
@@ -1,9 +1,9 @@
 import os
 import shutil
 import urllib.parse
-import json
 import datetime
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+import uuid
+from flask import Flask, Response, render_template, request, jsonify, flash, redirect, url_for
 from werkzeug.utils import secure_filename
 from langchain_community.document_loaders import (
     PDFPlumberLoader, TextLoader, CSVLoader, 
@@ -12,9 +12,24 @@ from langchain_community.document_loaders import (
     UnstructuredImageLoader, UnstructuredWordDocumentLoader
 )
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores.faiss import FAISS
 from LlamaParseLoader import LlamaParseLoader
+from bm25_index import build_bm25_index, update_bm25_index
+from embedding_cache import get_embeddings
+from db_versions import bump_db_version
+from faiss_index import (compact_vectorstore, copy_documents, needs_compaction, normalize_index_config,
+                         save_vectorstore, stream_vectorstore, tombstone_count)
+from ingestion import iter_chunk_windows, iter_parse_files
+from ingestion_jobs import job_manager
+from db_locks import DB_WRITE_LOCK_TIMEOUT, DBBusyError, db_locks
+from vectorstore_handles import vectorstore_handles
+from document_listing import get_listing, page_size
+from db_snapshots import (current_snapshot, find_snapshot, rollback_snapshot, snapshot_dir, snapshot_info,
+                          write_snapshot)
+from columnar_docstore import PICKLE_DOCSTORE_FILE, import_pickle_docstore
+from db_metadata_store import DBMetadataStore
+from chunk_dedup import CHUNK_DEDUP_DEFAULT, ChunkDeduplicator, load_deduplicator
+from db_manifest import (build_manifest_from_docstore, diff_manifest, file_sha256, files_merged_into, forget_chunks,
+                         forget_merged, load_manifest, new_manifest, record_file, save_manifest)
 
 # Define allowed file extensions and upload folder
 ALLOWED_EXTENSIONS = {
@@ -29,6 +44,12 @@ DB_METADATA_FILE = 'db_metadata.json'
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# LlamaParse 파싱 지침 (바꾸면 파싱 캐시 키도 바뀜)
+LLAMAPARSE_INSTRUCTIONS = """This document is an official document from the Military Manpower Administration of the Republic of Korea, related to military recruitment regulations, guidelines, and laws.
+            It is crucial that tables are accurately parsed and extracted as text, as they contain important information.
+            Please ensure all content is processed in Korean.
+            """
+
 def get_loader_for_file(file_path, pdf_loader_type='pdfplumber'):
     """파일 확장자에 맞는 로더를 반환합니다."""
     ext = os.path.splitext(file_path)[1].lower()
@@ -36,11 +57,7 @@ def get_loader_for_file(file_path, pdf_loader_type='pdfplumber'):
     if ext == '.pdf':
         if pdf_loader_type == 'llamaparse':
             # LlamaParseLoader 사용
-            parsing_instructions = """This document is an official document from the Military Manpower Administration of the Republic of Korea, related to military recruitment regulations, guidelines, and laws.
-            It is crucial that tables are accurately parsed and extracted as text, as they contain important information.
-            Please ensure all content is processed in Korean.
-            """
-            return LlamaParseLoader([file_path], parsing_instructions=parsing_instructions)
+            return LlamaParseLoader([file_path], parsing_instructions=LLAMAPARSE_INSTRUCTIONS)
         else:
             # 기본 PDFPlumberLoader 사용
             return PDFPlumberLoader(file_path)
@@ -65,6 +82,21 @@ def get_loader_for_file(file_path, pdf_loader_type='pdfplumber'):
     else:
         raise ValueError(f"지원되지 않는 파일 형식입니다: {ext}")
 
+def loader_cache_key(file_path, pdf_loader_type='pdfplumber'):
+    """
+    파싱 캐시 키에 쓰는 (로더 종류, 로더 옵션)을 반환합니다.
+    get_loader_for_file이 고르는 로더와 옵션이 바뀌면 함께 수정해야 합니다.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.pdf':
+        if pdf_loader_type == 'llamaparse':
+            return 'LlamaParseLoader', {'parsing_instructions': LLAMAPARSE_INSTRUCTIONS}
+        return 'PDFPlumberLoader', {}
+    if ext == '.txt':
+        return 'TextLoader', {'encoding': 'utf-8'}
+    # 나머지 형식은 확장자별로 로더가 하나씩 정해져 있음
+    return f'loader{ext}', {}
+
 def preserve_filename(filename):
     """
     파일명에 한글이나 공백을 보존하면서 안전하게 저장할 수 있는 형태로 변환합니다.
@@ -79,42 +111,39 @@ def restore_filename(encoded_filename):
     """
     return urllib.parse.unquote(encoded_filename)
 
+def _normalize_db_metadata(metadata):
+    """파일에서 읽은 메타데이터 구조 검증 및 복구 (제자리 수정)"""
+    if '_categories' not in metadata:
+        metadata['_categories'] = []
+
+    # DB 항목마다 필수 필드 확인 및 추가
+    for key, value in list(metadata.items()):
+        if key != '_categories' and isinstance(value, dict):
+            # display_name이 없으면 추가
+            if 'display_name' not in value or not value['display_name']:
+                value['display_name'] = key.replace(VECTOR_DB_FOLDER, '')
+
+            # category가 없으면 추가
+            if 'category' not in value or not value['category']:
+                value['category'] = '기타'
+
+
+# 요청마다 파일을 읽지 않도록 메모리에 유지하는 메타데이터 저장소
+db_metadata = DBMetadataStore(DB_METADATA_FILE, normalize=_normalize_db_metadata)
+
+
 def load_db_metadata():
-    """DB 메타데이터 파일을 로드합니다."""
-    if os.path.exists(DB_METADATA_FILE):
-        try:
-            with open(DB_METADATA_FILE, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-                
-                # 메타데이터 구조 검증 및 복구
-                if '_categories' not in metadata:
-                    metadata['_categories'] = []
-                
-                # DB 항목마다 필수 필드 확인 및 추가
-                for key, value in list(metadata.items()):
-                    if key != '_categories' and isinstance(value, dict):
-                        # display_name이 없으면 추가
-                        if 'display_name' not in value or not value['display_name']:
-                            value['display_name'] = key.replace(VECTOR_DB_FOLDER, '')
-                        
-                        # category가 없으면 추가
-                        if 'category' not in value or not value['category']:
-                            value['category'] = '기타'
-                
-                return metadata
-        except Exception as e:
-            print(f"메타데이터 파일 로드 중 오류: {e}")
-            # 파일 손상 시 새 메타데이터 생성
-            return {'_categories': ['기타']}
-    return {'_categories': ['기타']}  # 파일이 없으면 기본값 반환
-
-def save_db_metadata(metadata):
-    """DB 메타데이터 파일을 저장합니다."""
-    try:
-        with open(DB_METADATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"메타데이터 파일 저장 중 오류: {e}")
+    """DB 메타데이터를 반환합니다 (캐시된 공유 사본이므로 수정하지 말고 update_db_metadata() 사용)."""
+    return db_metadata.read()
+
+def update_db_metadata():
+    """
+    DB 메타데이터 수정 블록 (최신 내용 기준으로 읽고-수정하고-저장, 동시 수정 직렬화)
+
+        with update_db_metadata() as metadata:
+            metadata[db_id]['category'] = new_category
+    """
+    return db_metadata.update()
 
 def get_db_display_name(db_id):
     """DB ID에 해당하는 표시 이름을 반환합니다."""
@@ -144,12 +173,638 @@ def get_all_categories():
     return sorted(list(categories))
 
 
+def _iter_uploaded_chunk_windows(storage_filenames, file_paths, job, text_splitter, apply_metadata, stats,
+                                 pdf_loader='pdfplumber', dedup=None, file_hashes=None):
+    """
+    업로드 파일을 파싱 → 메타데이터 적용 → 분할해 청크 묶음(window)으로 흘려보냅니다.
+    전체 페이지/청크를 모으지 않으므로 파일 수와 관계없이 메모리 사용량이 일정합니다.
+    문서 수, 청크 수, 실패한 파일 목록, 파일별 청크 ID(매니페스트용)는 stats에 기록합니다.
+    dedup(ChunkDeduplicator)이 주어지면 분할 직후 유사 중복 청크를 걸러내고,
+    파일별로 걸러진 청크가 합쳐진 청크 ID를 stats['file_merged']에 기록합니다.
+    file_hashes({저장 파일명: sha256})가 주어지면 파싱 캐시에 있는 파일은 다시 파싱하지 않습니다.
+    """
+    job.update('parsing', files_total=len(file_paths), files_parsed=0, files_failed=0, files_cached=0)
+    stats.update(document_count=0, chunk_count=0, chunks_embedded=0, failed_files=[], file_chunks={}, file_merged={})
+    current = []
+
+    parsed = []
+    cached = []
+
+    def on_parsed(result):
+        parsed.append(result.ok)
+        if result.cached:
+            cached.append(result.file_path)
+        job.update('parsing', files_parsed=len(parsed), files_failed=parsed.count(False), files_cached=len(cached))
+
+    def documents_iter():
+        hashes = [file_hashes[name] for name in storage_filenames] if file_hashes else None
+        results = iter_parse_files(file_paths, pdf_loader, on_result=on_parsed, file_hashes=hashes)
+        for storage_filename, result in zip(storage_filenames, results):
+            if not result.ok:
+                stats['failed_files'].append({'filename': restore_filename(storage_filename), 'error': result.error})
+                continue
+            apply_metadata(storage_filename, result.documents)
+            stats['document_count'] += len(result.documents)
+            current[:] = [storage_filename]
+            yield result.documents
+
+    def on_split(chunks):
+        # 청크 ID를 미리 정해 파일별로 기록 (동기화 시 변경/제거된 파일의 청크 삭제에 사용)
+        for chunk in chunks:
+            chunk.id = str(uuid.uuid4())
+        if dedup is not None:
+            chunks = dedup.filter(chunks, stats['file_merged'].setdefault(current[0], []))
+        stats['file_chunks'][current[0]] = [chunk.id for chunk in chunks]
+        return chunks
+
+    for window in iter_chunk_windows(documents_iter(), text_splitter, on_split=on_split):
+        stats['chunk_count'] += len(window)
+        job.update('embedding', chunks_total=stats['chunk_count'], chunks_embedded=stats['chunks_embedded'])
+        yield window
+    print(f"[문서 분할 완료] 총 {stats['document_count']}개 문서에서 {stats['chunk_count']}개 청크 생성됨")
+
+
+def _finish_dedup(vectorstore, dedup):
+    """합쳐진 중복 청크의 출처를 남긴 청크에 기록하고 중복 제거 통계를 반환합니다 (사용하지 않으면 None)."""
+    if dedup is None:
+        return None
+    dedup.apply_merges(vectorstore)
+    report = dedup.report()
+    print(f"[중복 제거] 청크 {report['checked_chunks']}개 중 {report['duplicate_chunks']}개를 기존 청크에 합침 "
+          f"(비율 {report['dedup_ratio']:.1%})")
+    return report
+
+
+def _tracked_embeddings(job, stats):
+    """묶음 내 임베딩 진행 상황을 누적 청크 수로 작업에 보고하는 임베딩 객체"""
+    embeddings = get_embeddings()
+    embeddings.on_progress = lambda done, total: job.update('embedding', chunks_embedded=stats['chunks_embedded'] + done)
+    return embeddings
+
+
+def _hash_files(storage_filenames, file_paths, job):
+    """업로드 파일의 내용 해시를 계산합니다 ({저장 파일명: sha256})"""
+    job.update('hashing', files_total=len(file_paths))
+    return {name: file_sha256(path) for name, path in zip(storage_filenames, file_paths)}
+
+
+def _save_db_changes(db_id, vectorstore, added_ids=(), removed_ids=(), manifest=None, compact=None, dedup=None,
+                     job=None):
+    """
+    변경된 벡터스토어, BM25 색인, 매니페스트(와 중복 제거 서명)를 새 스냅샷 하나로 저장하고 게시합니다.
+    삭제된 벡터(tombstone) 비율이 임계값을 넘으면(또는 compact=True) 인덱스를 압축해서 저장하고,
+    DB별 tombstone 수를 기록합니다.
+    job이 주어지면 스냅샷에 작업 ID를 태그하고, 게시 직후 스냅샷 이름과 메타데이터 값을 체크포인트에 저장합니다.
+    """
+    index_config = None
+    if compact or (compact is None and needs_compaction(vectorstore)):
+        db_info = load_db_metadata().get(db_id, {})
+        before = vectorstore.index.ntotal
+        vectorstore, index_config = compact_vectorstore(vectorstore, db_info.get('index_type', 'flat'),
+                                                        db_info.get('index_params'))
+        print(f"[압축] 벡터 DB '{db_id}' 벡터 {before}개 → {vectorstore.index.ntotal}개")
+
+    with write_snapshot(db_id, tag=job.job_id if job is not None else None) as folder:
+        save_vectorstore(vectorstore, folder)
+        if index_config is not None:
+            # 압축하면 라벨이 다시 매겨지므로 BM25 색인도 새로 생성
+            build_bm25_index(vectorstore).save(folder)
+        elif added_ids or removed_ids:
+            update_bm25_index(folder, vectorstore, added_ids=added_ids, removed_ids=removed_ids)
+        if manifest is not None:
+            save_manifest(folder, manifest)
+        if dedup is not None:
+            dedup.save(folder)
+
+    db_values = {'tombstones': tombstone_count(vectorstore)}
+    if index_config is not None:
+        db_values.update(index_config, compacted_at=datetime.datetime.now().isoformat())
+    if job is not None:
+        job.save_checkpoint(snapshot=current_snapshot(db_id),
+                            db_values={**job.checkpoint.get('db_values', {}), **db_values})
+    db_metadata.update_db(db_id, **db_values)
+    # 저장한 벡터스토어를 새 스냅샷의 공유 핸들로 등록 (조회/retriever 갱신 시 다시 읽지 않음)
+    vectorstore_handles.adopt(db_id, vectorstore)
+    bump_db_version(db_id)
+    return vectorstore
+
+
+def _edit_db(db_id, edit, operation):
+    """
+    문서 삭제/이름 변경 같은 짧은 편집을 DB 쓰기 잠금 아래에서 실행합니다.
+    같은 DB에 동시에 들어온 편집은 한 번 로드한 벡터스토어에 차례로 적용하고 스냅샷 하나로 저장합니다.
+    edit(state)는 state['vectorstore'], state['manifest']를 수정하고, 삭제한 라벨은 state['removed_ids']에,
+    저장할 변경이 있으면 state['changed'] = True로 표시합니다.
+    """
+    def load():
+        vectorstore = vectorstore_handles.checkout(db_id)
+        return {'vectorstore': vectorstore, 'manifest': load_manifest(db_id), 'removed_ids': [],
+                'removed_chunks': 0, 'changed': False}
+
+    def commit(state):
+        if not state['changed']:
+            return
+        state['vectorstore'] = _save_db_changes(db_id, state['vectorstore'], removed_ids=state['removed_ids'],
+                                                manifest=state['manifest'])
+        with update_db_metadata() as metadata:
+            if db_id in metadata:
+                metadata[db_id]['last_updated'] = datetime.datetime.now().isoformat()
+                # 문서 수 업데이트 (있는 경우)
+                if state['removed_chunks'] and 'document_count' in metadata[db_id]:
+                    metadata[db_id]['document_count'] = max(0, metadata[db_id]['document_count'] - state['removed_chunks'])
+
+    return db_locks.batched_write(db_id, edit, load, commit, operation)
+
+
+def _chunk_files(vectorstore, doc_ids):
+    """청크 출처의 저장 파일명 (매니페스트에서 확인할 파일 항목을 좁히는 데 사용)"""
+    sources = (vectorstore.metadata_index.get(doc_id, 'source') for doc_id in doc_ids)
+    return {os.path.basename(source) for source in sources if source}
+
+
+def _locked_job(operation, runner):
+    """
+    같은 DB의 다른 쓰기가 끝날 때까지 기다렸다가 작업 전체를 DB 쓰기 잠금 아래에서 실행합니다.
+    (압축/docstore 변환처럼 작업 전체가 저장 단계인 경우에 사용)
+    """
+    def run(params, job):
+        job.update('waiting_lock')
+        with db_locks.write(params['db_id'], operation):
+            return runner(params, job)
+    return run
+
+
+def _commit_job(db_id, operation, job, vectorstore, manifest, new_doc_ids, commit):
+    """
+    수집 작업의 저장 단계만 DB 쓰기 잠금 아래에서 실행합니다.
+    파싱/임베딩은 잠금 없이 checkout한 복사본에서 진행하므로 그동안 화면의 편집이나 다른 작업이 DB를 쓸 수 있고,
+    그 사이 새 스냅샷이 게시됐으면 현재 스냅샷을 다시 checkout해 이번 작업이 추가한 청크를 벡터째 옮긴 뒤
+    (재임베딩 없음) 현재 매니페스트 기준으로 commit(vectorstore, manifest)을 실행합니다.
+    """
+    # 여기부터는 디스크에 기록하므로 잠금을 얻은 뒤에는 취소하지 않음
+    job.update('waiting_lock')
+    with db_locks.write(db_id, operation):
+        job.check_cancelled()
+        job.update('saving', cancellable=False, index_written=False)
+        if vectorstore.snapshot_folder != snapshot_dir(db_id):
+            print(f"[DB 잠금] '{db_id}' 작업 중 다른 변경이 게시되어 현재 스냅샷에 다시 적용합니다.")
+            current = vectorstore_handles.checkout(db_id, vectorstore.embedding_function)
+            copy_documents(vectorstore, current, new_doc_ids)
+            vectorstore = current
+            manifest = _load_or_build_manifest(db_id, current, manifest['chunk_size'], manifest['chunk_overlap'])
+        result = commit(vectorstore, manifest)
+    job.update('saving', cancellable=False, index_written=True)
+    return result
+
+
+def _live_labels(vectorstore, doc_ids):
+    """DB에 남아 있는 청크의 라벨 목록 (작업 중 다른 편집으로 지워진 청크는 label()이 None이므로 제외)"""
+    labels = (vectorstore.metadata_index.label(doc_id) for doc_id in doc_ids)
+    return sorted(label for label in labels if label is not None)
+
+
+def _missing_merge_targets(vectorstore, stats):
+    """이번 작업에서 중복 청크를 합친 청크 중 (작업 중 다른 편집으로) DB에 없는 청크 ID"""
+    return [doc_id for doc_ids in stats.get('file_merged', {}).values() for doc_id in doc_ids
+            if vectorstore.metadata_index.label(doc_id) is None]
+
+
+def _finish_published(db_id, checkpoint):
+    """
+    게시한 스냅샷의 DB 메타데이터를 체크포인트 값으로 기록하고 작업 결과를 반환합니다.
+    누적값도 게시 전에 계산한 값을 그대로 쓰므로 재개 시 다시 실행해도 결과가 같습니다.
+    """
+    with update_db_metadata() as metadata:
+        if checkpoint.get('db_entry') is not None:
+            metadata.setdefault(db_id, checkpoint['db_entry'])
+        if db_id in metadata:
+            metadata[db_id].update(checkpoint.get('db_values', {}))
+    return checkpoint['result']
+
+
+def _resume_published(job):
+    """
+    이전 실행이 스냅샷을 게시한 뒤 중단된 작업이면 마무리 단계만 수행하고 결과를 반환합니다.
+    게시 전에 중단됐으면 None (처음부터 다시 실행)
+    """
+    checkpoint = job.checkpoint
+    db_id = checkpoint.get('db_id')
+    if not db_id or 'result' not in checkpoint:
+        return None
+    # 게시 직후 체크포인트를 저장하기 전에 중단된 경우는 스냅샷의 작업 ID 태그로 확인
+    snapshot = checkpoint.get('snapshot') or (find_snapshot(db_id, job.job_id) if os.path.isdir(db_id) else None)
+    if snapshot is None:
+        return None
+    print(f"[작업] 스냅샷 {snapshot} 게시 후 중단된 작업의 마무리 단계만 실행: {db_id}")
+    job.update('saving', cancellable=False, index_written=False)
+    result = _finish_published(db_id, checkpoint)
+    bump_db_version(db_id)
+    job.update('saving', cancellable=False, index_written=True)
+    return result
+
+
+def _load_or_build_manifest(db_id, vectorstore, chunk_size, chunk_overlap):
+    """DB 매니페스트를 읽고, 없으면(이전 버전 DB) docstore에서 복원합니다."""
+    manifest = load_manifest(db_id)
+    if manifest is None:
+        manifest = build_manifest_from_docstore(vectorstore, chunk_size, chunk_overlap)
+    return manifest
+
+
+def _no_documents_error(failed_files):
+    return ValueError('로드된 문서가 없습니다.' + ''.join(f" ({f['filename']}: {f['error']})" for f in failed_files))
+
+
+def run_create_vector_db(params, job):
+    """벡터 DB 생성 작업 (파싱 → 분할 → 임베딩 → 인덱스 저장)"""
+    storage_filenames = params['storage_filenames']
+    db_name = params['db_name']
+    document_name = params['document_name']
+    category = params['category']
+    chunk_size = params['chunk_size']
+    chunk_overlap = params['chunk_overlap']
+    dedup = ChunkDeduplicator() if params.get('dedup', CHUNK_DEDUP_DEFAULT) else None
+
+    resumed = _resume_published(job)
+    if resumed is not None:
+        return resumed
+    # 게시 전에 중단된 이전 실행의 DB 폴더(스냅샷 없음) 정리
+    stale_db_id = job.checkpoint.get('db_id')
+    if stale_db_id and os.path.isdir(stale_db_id) and current_snapshot(stale_db_id) is None:
+        shutil.rmtree(stale_db_id, ignore_errors=True)
+
+    def apply_metadata(storage_filename, documents):
+        # 문서 이름이 제공된 경우 메타데이터에 추가
+        if document_name:
+            for doc in documents:
+                doc.metadata['custom_name'] = document_name
+                # 원본 파일명도 보존
+                doc.metadata['original_filename'] = restore_filename(storage_filename)
+
+    file_hashes = _hash_files(storage_filenames, params['file_paths'], job)
+
+    # 파일을 프로세스 풀에서 병렬로 파싱하고(PDF 로더 타입 전달, 실패한 파일만 제외),
+    # 사용자 지정 청크 크기와 오버랩으로 분할한 청크를 묶음 단위로 임베딩해 인덱스에 추가합니다
+    stats = {}
+    print(f"[청크 설정] 크기: {chunk_size}자, 오버랩: {chunk_overlap}자")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    windows = _iter_uploaded_chunk_windows(storage_filenames, params['file_paths'], job, text_splitter,
+                                           apply_metadata, stats, params['pdf_loader'], dedup, file_hashes)
+    embeddings = _tracked_embeddings(job, stats)
+
+    def on_window(count):
+        stats['chunks_embedded'] += count
+
+    # 벡터스토어 생성 (청크 수가 충분하면 선택한 인덱스를 학습)
+    vectorstore, index_config = stream_vectorstore(windows, embeddings, params['index_type'], params['index_params'],
+                                                   on_window=on_window)
+    failed_files = stats['failed_files']
+    if vectorstore is None:
+        raise _no_documents_error(failed_files)
+    print(f"[인덱스] 종류: {index_config['index_type']}, 파라미터: {index_config['index_params']}")
+    dedup_report = _finish_dedup(vectorstore, dedup)
+
+    # 벡터 DB ID 생성 (접두어 + 생성 시각 + 같은 초에 만든 DB와 겹치지 않도록 임의 접미사)
+    now = datetime.datetime.now()
+    system_db_id = f"db_{now.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"  # 예: db_20250417123045_1a2b3c4d
+    db_id = f"{VECTOR_DB_FOLDER}{system_db_id}"
+
+    # 여기부터는 디스크에 기록하므로 취소하지 않음
+    job.check_cancelled()
+    job.update('saving', cancellable=False, index_written=False)
+
+    # 원본 파일별 해시와 청크 ID 기록 (증분 동기화용)
+    manifest = new_manifest(chunk_size, chunk_overlap)
+    for storage_filename, chunk_ids in stats['file_chunks'].items():
+        record_file(manifest, storage_filename, file_hashes[storage_filename], chunk_ids,
+                    custom_name=document_name or None, pdf_loader=params['pdf_loader'],
+                    merged_chunk_ids=stats['file_merged'].get(storage_filename, ()))
+
+    message = f'벡터 DB "{db_name}" 생성 완료!'
+    if failed_files:
+        message += f' ({len(failed_files)}개 파일 로드 실패)'
+    if dedup_report and dedup_report['duplicate_chunks']:
+        message += f" (중복 청크 {dedup_report['duplicate_chunks']}개 제거)"
+    result = {
+        'message': message,
+        'db_name': db_name,
+        'db_id': db_id,
+        'document_count': stats['document_count'],
+        'chunk_count': stats['chunk_count'],
+        'chunk_size': chunk_size,
+        'chunk_overlap': chunk_overlap,
+        'category': category,
+        'document_name': document_name or '원본 파일명',
+        'index_type': index_config['index_type'],
+        'index_params': index_config['index_params'],
+        'dedup': dedup_report,
+        'failed_files': failed_files
+    }
+    # 메타데이터에 저장할 표시 이름과 청크 설정
+    db_entry = {
+        'display_name': db_name,  # 원본 한글 이름을 표시 이름으로 저장
+        'created_at': datetime.datetime.now().isoformat(),
+        'chunk_size': chunk_size,
+        'chunk_overlap': chunk_overlap,
+        'category': category,  # 카테고리 정보 추가
+        'document_name': document_name,  # 문서 이름 저장
+        'index_type': index_config['index_type'],  # 실제 사용된 FAISS 인덱스 종류
+        'index_params': index_config['index_params'],  # 빌드/검색 파라미터
+        'dedup': dedup is not None  # 유사 중복 청크 제거 (문서 추가/동기화에도 적용)
+    }
+    # 게시 후 중단되면 재개 시 이 값으로 마무리 (DB를 다시 만들지 않음)
+    job.save_checkpoint(db_id=db_id, result=result, db_entry=db_entry)
+
+    # 인덱스, BM25 색인, 매니페스트를 첫 스냅샷으로 게시
+    with write_snapshot(db_id, tag=job.job_id) as folder:
+        save_vectorstore(vectorstore, folder)
+        build_bm25_index(vectorstore).save(folder)
+        save_manifest(folder, manifest)
+        if dedup is not None:
+            dedup.save(folder)
+    job.save_checkpoint(snapshot=current_snapshot(db_id))
+    vectorstore_handles.adopt(db_id, vectorstore)
+    print(f"벡터 DB '{db_name}' 저장 완료")
+
+    _finish_published(db_id, job.checkpoint)
+    # 새 DB 게시 (예산 안에 들면 검색 경로에서 미리 로드)
+    bump_db_version(db_id)
+    job.update('saving', cancellable=False, index_written=True)
+    return result
+
+
+def run_add_documents(params, job):
+    """기존 벡터 DB에 문서 추가 작업 (파싱 → 분할 → 임베딩 → 인덱스 저장)"""
+    db_id = params['db_id']
+    storage_filenames = params['storage_filenames']
+    custom_names = params['custom_names']
+
+    if not os.path.isdir(db_id):
+        raise ValueError('벡터 DB를 찾을 수 없습니다.')
+    resumed = _resume_published(job)
+    if resumed is not None:
+        return resumed
+
+    # 메타데이터에서 청크 설정 가져오기
+    db_info = load_db_metadata().get(db_id, {})
+    chunk_size = db_info.get('chunk_size', 300)
+    chunk_overlap = db_info.get('chunk_overlap', 50)
+
+    def apply_metadata(storage_filename, documents):
+        # 사용자 지정 문서명이 있으면 메타데이터에 추가
+        original_filename = restore_filename(storage_filename)
+        custom_name = custom_names.get(storage_filename, original_filename)
+
+        for doc in documents:
+            # 기존 메타데이터 유지하면서 사용자 지정 문서명 추가
+            doc.metadata['custom_name'] = custom_name
+            doc.metadata['original_filename'] = original_filename
+
+    file_hashes = _hash_files(storage_filenames, params['file_paths'], job)
+
+    # 기존 벡터스토어 로드
+    stats = {}
+    embeddings = _tracked_embeddings(job, stats)
+    vectorstore = vectorstore_handles.checkout(db_id, embeddings)
+    manifest = _load_or_build_manifest(db_id, vectorstore, chunk_size, chunk_overlap)
+    # 중복 제거를 사용하는 DB는 기존 청크와도 비교
+    dedup = load_deduplicator(vectorstore.snapshot_folder, vectorstore) if db_info.get('dedup') else None
+
+    # 파싱/분할한 청크를 묶음 단위로 임베딩해 추가합니다 (실패한 파일만 제외)
+    print(f"[청크 설정] 크기: {chunk_size}자, 오버랩: {chunk_overlap}자")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    new_doc_ids = set()
+    for window in _iter_uploaded_chunk_windows(storage_filenames, params['file_paths'], job, text_splitter,
+                                               apply_metadata, stats, params.get('pdf_loader', 'pdfplumber'),
+                                               dedup, file_hashes):
+        new_doc_ids.update(vectorstore.add_documents(window))
+        stats['chunks_embedded'] += len(window)
+    failed_files = stats['failed_files']
+    # 모든 청크가 기존 청크의 중복이면 추가할 청크가 없어도 오류가 아님
+    if not new_doc_ids and not (dedup is not None and dedup.duplicates):
+        raise _no_documents_error(failed_files)
+
+    def commit(vectorstore, manifest):
+        dedup_report = _finish_dedup(vectorstore, dedup)
+        # 매니페스트에 추가된 파일 기록 (같은 파일을 다시 추가하면 청크 ID를 누적)
+        for storage_filename, chunk_ids in stats['file_chunks'].items():
+            record_file(manifest, storage_filename, file_hashes[storage_filename], chunk_ids,
+                        custom_name=custom_names.get(storage_filename), replace=False,
+                        merged_chunk_ids=stats['file_merged'].get(storage_filename, ()))
+        forget_merged(manifest, _missing_merge_targets(vectorstore, stats))
+
+        message = f'벡터 DB에 {len(storage_filenames) - len(failed_files)}개 문서 추가 완료!'
+        if failed_files:
+            message += f' ({len(failed_files)}개 파일 로드 실패)'
+        if dedup_report and dedup_report['duplicate_chunks']:
+            message += f" (중복 청크 {dedup_report['duplicate_chunks']}개 제거)"
+        result = {
+            'message': message,
+            'db_id': db_id,
+            'document_count': stats['document_count'],
+            'chunk_count': stats['chunk_count'],
+            'dedup': dedup_report,
+            'failed_files': failed_files
+        }
+        # 메타데이터 업데이트 값 (마지막 수정 시간, 누적 추가 문서 수는 게시 전에 계산해 재개 시 중복 집계하지 않음)
+        db_values = {
+            'last_updated': datetime.datetime.now().isoformat(),
+            'added_documents': load_db_metadata().get(db_id, {}).get('added_documents', 0) + len(storage_filenames)
+        }
+        job.save_checkpoint(db_id=db_id, result=result, db_values=db_values)
+
+        # 인덱스, BM25 색인(새 청크 반영), 매니페스트를 새 스냅샷으로 저장
+        added_ids = _live_labels(vectorstore, new_doc_ids)
+        _save_db_changes(db_id, vectorstore, added_ids=added_ids, manifest=manifest, dedup=dedup, job=job)
+        return _finish_published(db_id, job.checkpoint)
+
+    return _commit_job(db_id, 'add_documents', job, vectorstore, manifest, new_doc_ids, commit)
+
+
+def run_sync_documents(params, job):
+    """
+    매니페스트 기반 증분 동기화 작업
+    새 파일/내용이 바뀐 파일만 다시 처리하고, 변경/제거된 파일의 기존 청크는 삭제합니다.
+    """
+    db_id = params['db_id']
+    custom_names = params.get('custom_names', {})
+    upload_folder = params['upload_folder']
+
+    if not os.path.isdir(db_id):
+        raise ValueError('벡터 DB를 찾을 수 없습니다.')
+    resumed = _resume_published(job)
+    if resumed is not None:
+        return resumed
+
+    db_info = load_db_metadata().get(db_id, {})
+    chunk_size = db_info.get('chunk_size', 300)
+    chunk_overlap = db_info.get('chunk_overlap', 50)
+
+    stats = {}
+    embeddings = _tracked_embeddings(job, stats)
+    vectorstore = vectorstore_handles.checkout(db_id, embeddings)
+    manifest = _load_or_build_manifest(db_id, vectorstore, chunk_size, chunk_overlap)
+
+    # DB에 있어야 할 파일 목록 (지정하지 않으면 매니페스트의 파일 중 업로드 폴더에 남아 있는 파일)
+    storage_filenames = params.get('storage_filenames') or list(manifest['files'])
+    storage_filenames = [name for name in storage_filenames if os.path.exists(os.path.join(upload_folder, name))]
+    file_hashes = _hash_files(storage_filenames, [os.path.join(upload_folder, name) for name in storage_filenames], job)
+    # 목록에 없는 파일을 제거 대상으로 보는 것은 업로드 폴더 전체를 확인할 때(파일 목록 생략)만 기본값
+    # (일부 파일만 다시 동기화하는 요청이 나머지 파일의 청크를 지우지 않도록)
+    remove_missing = params.get('remove_missing')
+    if remove_missing is None:
+        remove_missing = not params.get('storage_filenames')
+    diff = diff_manifest(manifest, file_hashes, remove_missing=remove_missing)
+    # 변경/제거된 파일의 청크에 중복 청크가 합쳐진 파일은 그 내용이 함께 삭제되므로 다시 처리
+    dropping = diff['changed'] + diff['removed']
+    dropping_ids = [doc_id for name in dropping for doc_id in manifest['files'][name]['chunk_ids']]
+    for name in files_merged_into(manifest, dropping_ids, exclude=dropping):
+        if name in diff['unchanged']:
+            diff['unchanged'].remove(name)
+            diff['changed'].append(name)
+    summary = {key: [restore_filename(name) for name in names] for key, names in diff.items()}
+    print(f"[동기화] 추가 {len(diff['added'])}개, 변경 {len(diff['changed'])}개, "
+          f"유지 {len(diff['unchanged'])}개, 제거 {len(diff['removed'])}개")
+
+    if not (diff['added'] or diff['changed'] or diff['removed']):
+        return {'message': '변경된 파일이 없습니다.', 'db_id': db_id, 'diff': summary,
+                'document_count': 0, 'chunk_count': 0, 'removed_chunk_count': 0, 'failed_files': []}
+
+    def apply_metadata(storage_filename, documents):
+        # 사용자 지정 문서명은 요청 값 → 기존 매니페스트 값 → 원본 파일명 순으로 사용
+        original_filename = restore_filename(storage_filename)
+        previous = manifest['files'].get(storage_filename, {})
+        custom_name = custom_names.get(storage_filename) or previous.get('custom_name') or original_filename
+        for doc in documents:
+            doc.metadata['custom_name'] = custom_name
+            doc.metadata['original_filename'] = original_filename
+
+    # 새 파일과 변경된 파일만 다시 파싱/분할/임베딩
+    to_process = diff['added'] + diff['changed']
+    new_doc_ids = set()
+    dedup = None
+    if to_process and db_info.get('dedup'):
+        dedup = load_deduplicator(vectorstore.snapshot_folder, vectorstore)
+        # 변경/제거된 파일의 기존 청크는 삭제될 예정이므로 중복 비교 대상에서 제외
+        for name in diff['changed'] + diff['removed']:
+            for doc_id in manifest['files'][name]['chunk_ids']:
+                dedup.remove(doc_id)
+    if to_process:
+        print(f"[청크 설정] 크기: {chunk_size}자, 오버랩: {chunk_overlap}자")
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        windows = _iter_uploaded_chunk_windows(to_process, [os.path.join(upload_folder, name) for name in to_process],
+                                               job, text_splitter, apply_metadata, stats, params.get('pdf_loader', 'pdfplumber'),
+                                               dedup, file_hashes)
+        for window in windows:
+            new_doc_ids.update(vectorstore.add_documents(window))
+            stats['chunks_embedded'] += len(window)
+    else:
+        stats.update(document_count=0, chunk_count=0, failed_files=[], file_chunks={}, file_merged={})
+    failed_files = stats['failed_files']
+
+    # 제거된 파일과 다시 처리에 성공한 변경 파일의 기존 청크 삭제 (파싱에 실패한 변경 파일은 기존 청크 유지)
+    stale_files = diff['removed'] + [name for name in diff['changed'] if name in stats['file_chunks']]
+    stale_ids = [doc_id for name in stale_files for doc_id in manifest['files'][name]['chunk_ids']]
+
+    def commit(vectorstore, manifest):
+        removed_ids = vectorstore.remove_documents(stale_ids)
+        added_ids = _live_labels(vectorstore, new_doc_ids)
+        dedup_report = _finish_dedup(vectorstore, dedup)
+
+        for name in diff['removed']:
+            manifest['files'].pop(name, None)
+        for storage_filename, chunk_ids in stats['file_chunks'].items():
+            previous = manifest['files'].get(storage_filename, {})
+            record_file(manifest, storage_filename, file_hashes[storage_filename], chunk_ids,
+                        custom_name=custom_names.get(storage_filename) or previous.get('custom_name'),
+                        pdf_loader=params.get('pdf_loader', 'pdfplumber'),
+                        merged_chunk_ids=stats['file_merged'].get(storage_filename, ()))
+        # 이번에 다시 처리하지 못한 파일 중 삭제된 청크에 합쳐진 파일은 다음 동기화 때 다시 처리
+        forget_merged(manifest, stale_ids + _missing_merge_targets(vectorstore, stats))
+
+        message = (f"동기화 완료! 추가 {len(diff['added'])}개, 변경 {len(diff['changed'])}개, "
+                   f"제거 {len(diff['removed'])}개 파일")
+        if failed_files:
+            message += f' ({len(failed_files)}개 파일 로드 실패)'
+        if dedup_report and dedup_report['duplicate_chunks']:
+            message += f" (중복 청크 {dedup_report['duplicate_chunks']}개 제거)"
+        result = {
+            'message': message,
+            'db_id': db_id,
+            'diff': summary,
+            'document_count': stats['document_count'],
+            'chunk_count': stats['chunk_count'],
+            'removed_chunk_count': len(removed_ids),
+            'dedup': dedup_report,
+            'failed_files': failed_files
+        }
+        job.save_checkpoint(db_id=db_id, result=result,
+                            db_values={'last_updated': datetime.datetime.now().isoformat()})
+        _save_db_changes(db_id, vectorstore, added_ids=added_ids, removed_ids=removed_ids, manifest=manifest,
+                         dedup=dedup, job=job)
+        return _finish_published(db_id, job.checkpoint)
+
+    return _commit_job(db_id, 'sync_documents', job, vectorstore, manifest, new_doc_ids, commit)
+
+
+def run_compact_db(params, job):
+    """벡터 DB 압축 작업 (삭제된 벡터를 제외하고 인덱스를 다시 만듦, 재임베딩 없음)"""
+    db_id = params['db_id']
+    if not os.path.isdir(db_id):
+        raise ValueError('벡터 DB를 찾을 수 없습니다.')
+
+    vectorstore = vectorstore_handles.checkout(db_id)
+    tombstones = tombstone_count(vectorstore)
+    job.update('compacting', tombstones=tombstones, chunk_count=len(vectorstore.index_to_docstore_id))
+    if not tombstones and not params.get('force'):
+        return {'message': '삭제된 벡터가 없어 압축하지 않았습니다.', 'db_id': db_id, 'tombstones': 0}
+
+    job.update('saving', cancellable=False, index_written=False)
+    vectorstore = _save_db_changes(db_id, vectorstore, compact=True)
+    job.update('saving', cancellable=False, index_written=True)
+    return {
+        'message': f'벡터 DB 압축 완료! 삭제된 벡터 {tombstones}개 정리',
+        'db_id': db_id,
+        'tombstones': tombstones,
+        'chunk_count': vectorstore.index.ntotal
+    }
+
+
+def run_convert_docstore(params, job):
+    """pickle docstore(index.pkl)를 열 단위 docstore로 변환하는 작업 (인덱스/BM25 색인은 그대로 사용)"""
+    db_id = params['db_id']
+    if not os.path.isdir(db_id):
+        raise ValueError('벡터 DB를 찾을 수 없습니다.')
+    if not os.path.exists(os.path.join(snapshot_dir(db_id), PICKLE_DOCSTORE_FILE)):
+        return {'message': '이미 열 단위 docstore로 저장된 DB입니다.', 'db_id': db_id, 'chunk_count': 0}
+
+    job.update('converting', cancellable=False)
+    with write_snapshot(db_id) as folder:
+        chunk_count = import_pickle_docstore(folder)
+    bump_db_version(db_id)
+    return {
+        'message': f'docstore 변환 완료! 청크 {chunk_count}개',
+        'db_id': db_id,
+        'chunk_count': chunk_count
+    }
+
+
 def setup_document_manager(app):
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # 백그라운드 수집 작업 등록 (재시작 전에 끝나지 않은 작업은 여기서 재개)
+    job_manager.register('create_vector_db', run_create_vector_db)
+    # 기존 DB를 수정하는 작업은 DB 쓰기 잠금으로 저장을 직렬화 (동시에 추가해도 한쪽 변경이 사라지지 않음)
+    # 문서 추가/동기화는 저장 단계에서만 잠금을 잡으므로 파싱/임베딩 중에도 화면에서 편집할 수 있음
+    job_manager.register('add_documents', run_add_documents)
+    job_manager.register('sync_documents', run_sync_documents)
+    job_manager.register('compact_db', _locked_job('compact_db', run_compact_db))
+    job_manager.register('convert_docstore', _locked_job('convert_docstore', run_convert_docstore))
+    job_manager.start()
+    
     @app.route('/document_manager')
     def document_manager():
         # Get list of uploaded documents
@@ -213,77 +868,158 @@ def setup_document_manager(app):
             if not os.path.exists(db_id) or not os.path.isdir(db_id):
                 return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
             
-            # 메타데이터에서 청크 설정 가져오기
-            metadata = load_db_metadata()
-            db_info = metadata.get(db_id, {})
-            chunk_size = db_info.get('chunk_size', 300)
-            chunk_overlap = db_info.get('chunk_overlap', 50)
-            
-            # 모든 문서를 로드합니다
-            all_documents = []
+            # 파일 존재 여부 확인
+            file_paths = []
             for storage_filename in storage_filenames:
                 file_path = os.path.join(app.config['UPLOAD_FOLDER'], storage_filename)
                 
                 if not os.path.exists(file_path):
                     return jsonify({'status': 'error', 'message': f'파일을 찾을 수 없습니다: {restore_filename(storage_filename)}'}), 404
-                
-                try:
-                    # 파일 형식에 맞는 로더 가져오기
-                    loader = get_loader_for_file(file_path)
-                    documents = loader.load()
-                    
-                    # 사용자 지정 문서명이 있으면 메타데이터에 추가
-                    original_filename = restore_filename(storage_filename)
-                    custom_name = custom_names.get(storage_filename, original_filename)
-                    
-                    for doc in documents:
-                        # 기존 메타데이터 유지하면서 사용자 지정 문서명 추가
-                        doc.metadata['custom_name'] = custom_name
-                        doc.metadata['original_filename'] = original_filename
-                    
-                    all_documents.extend(documents)
-                    print(f"파일 '{storage_filename}' 로드 완료: {len(documents)}개 문서")
-                except Exception as e:
-                    print(f"파일 '{storage_filename}' 로드 오류: {str(e)}")
-                    return jsonify({'status': 'error', 'message': f"파일 '{restore_filename(storage_filename)}' 로드 중 오류: {str(e)}"}), 500
-            
-            if not all_documents:
-                return jsonify({'status': 'error', 'message': '로드된 문서가 없습니다.'}), 400
-            
-            # 문서 분할
-            print(f"[청크 설정] 크기: {chunk_size}자, 오버랩: {chunk_overlap}자")
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-            split_docs = text_splitter.split_documents(all_documents)
-            print(f"[문서 분할 완료] 총 {len(all_documents)}개 문서에서 {len(split_docs)}개 청크 생성됨")
-            
-            # 기존 벡터스토어 로드
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = FAISS.load_local(db_id, embeddings, allow_dangerous_deserialization=True)
-            
-            # 새 문서 추가
-            vectorstore.add_documents(split_docs)
-            
-            # 업데이트된 벡터스토어 저장
-            vectorstore.save_local(db_id)
-            
-            # 메타데이터 업데이트 (마지막 수정 시간)
-            if db_id in metadata:
-                metadata[db_id]['last_updated'] = datetime.datetime.now().isoformat()
-                metadata[db_id]['added_documents'] = metadata[db_id].get('added_documents', 0) + len(storage_filenames)
-            save_db_metadata(metadata)
+                file_paths.append(file_path)
             
-            return jsonify({
-                'status': 'success', 
-                'message': f'벡터 DB에 {len(storage_filenames)}개 문서 추가 완료!',
-                'document_count': len(all_documents),
-                'chunk_count': len(split_docs)
+            # 파싱/임베딩/저장은 백그라운드 작업으로 실행하고 작업 ID를 바로 반환
+            job = job_manager.submit('add_documents', {
+                'db_id': db_id,
+                'storage_filenames': storage_filenames,
+                'file_paths': file_paths,
+                'custom_names': custom_names
             })
+            return jsonify({
+                'status': 'success',
+                'message': f'{len(storage_filenames)}개 문서 추가 작업이 등록되었습니다.',
+                'job_id': job['job_id']
+            }), 202
         except Exception as e:
             print(f"문서 추가 중 오류: {str(e)}")
             import traceback
             traceback.print_exc()
             return jsonify({'status': 'error', 'message': f'문서 추가 중 오류: {str(e)}'}), 500
 
+    @app.route('/sync_db_documents', methods=['POST'])
+    def sync_db_documents():
+        """매니페스트와 업로드 파일을 비교해 새 파일/변경된 파일만 다시 처리하는 동기화 작업 등록"""
+        data = request.json or {}
+        db_id = data.get('db_id')
+        storage_filenames = data.get('storage_filenames')  # 생략하면 매니페스트의 파일 전체를 다시 확인
+        
+        if not db_id:
+            return jsonify({'status': 'error', 'message': 'DB ID가 제공되지 않았습니다.'}), 400
+        
+        try:
+            if not os.path.exists(db_id) or not os.path.isdir(db_id):
+                return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+            
+            for storage_filename in storage_filenames or []:
+                if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], storage_filename)):
+                    return jsonify({'status': 'error', 'message': f'파일을 찾을 수 없습니다: {restore_filename(storage_filename)}'}), 404
+            
+            job = job_manager.submit('sync_documents', {
+                'db_id': db_id,
+                'storage_filenames': storage_filenames,
+                'custom_names': data.get('custom_names', {}),
+                'pdf_loader': data.get('pdf_loader', 'pdfplumber'),
+                # 생략하면 파일 목록을 생략한 경우에만 업로드 폴더에 없는 파일을 제거
+                'remove_missing': None if data.get('remove_missing') is None else bool(data['remove_missing']),
+                'upload_folder': app.config['UPLOAD_FOLDER']
+            })
+            return jsonify({
+                'status': 'success',
+                'message': '문서 동기화 작업이 등록되었습니다.',
+                'job_id': job['job_id']
+            }), 202
+        except Exception as e:
+            print(f"문서 동기화 중 오류: {str(e)}")
+            return jsonify({'status': 'error', 'message': f'문서 동기화 중 오류: {str(e)}'}), 500
+
+    @app.route('/compact_db', methods=['POST'])
+    def compact_db():
+        """삭제된 벡터(tombstone)를 정리하는 인덱스 압축 작업 등록"""
+        data = request.json or {}
+        db_id = data.get('db_id')
+
+        if not db_id:
+            return jsonify({'status': 'error', 'message': 'DB ID가 제공되지 않았습니다.'}), 400
+
+        try:
+            if not os.path.exists(db_id) or not os.path.isdir(db_id):
+                return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+
+            job = job_manager.submit('compact_db', {'db_id': db_id, 'force': bool(data.get('force', False))})
+            return jsonify({
+                'status': 'success',
+                'message': '벡터 DB 압축 작업이 등록되었습니다.',
+                'job_id': job['job_id']
+            }), 202
+        except Exception as e:
+            print(f"벡터 DB 압축 중 오류: {str(e)}")
+            return jsonify({'status': 'error', 'message': f'벡터 DB 압축 중 오류: {str(e)}'}), 500
+
+    @app.route('/convert_docstore', methods=['POST'])
+    def convert_docstore():
+        """기존 DB의 pickle docstore를 열 단위 형식으로 변환하는 작업 등록 (db_id가 없으면 모든 DB)"""
+        data = request.json or {}
+        db_id = data.get('db_id')
+
+        try:
+            if db_id:
+                if not os.path.exists(db_id) or not os.path.isdir(db_id):
+                    return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+                db_ids = [db_id]
+            else:
+                db_ids = list(load_db_metadata())
+
+            job_ids = [job_manager.submit('convert_docstore', {'db_id': target})['job_id']
+                       for target in db_ids if os.path.isdir(target)]
+            return jsonify({
+                'status': 'success',
+                'message': f'docstore 변환 작업 {len(job_ids)}개가 등록되었습니다.',
+                'job_ids': job_ids
+            }), 202
+        except Exception as e:
+            print(f"docstore 변환 중 오류: {str(e)}")
+            return jsonify({'status': 'error', 'message': f'docstore 변환 중 오류: {str(e)}'}), 500
+
+    @app.route('/db_snapshots', methods=['GET'])
+    def get_db_snapshots():
+        """DB의 스냅샷 목록과 현재 스냅샷 (verify=1이면 체크섬까지 확인)"""
+        db_id = request.args.get('db_id')
+        if not db_id or not os.path.isdir(db_id):
+            return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+        info = snapshot_info(db_id, deep=request.args.get('verify') == '1')
+        return jsonify({'status': 'success', **info})
+
+    @app.route('/rollback_db', methods=['POST'])
+    def rollback_db():
+        """DB를 이전 스냅샷(또는 지정한 스냅샷)으로 즉시 되돌림"""
+        data = request.json or {}
+        db_id = data.get('db_id')
+
+        if not db_id:
+            return jsonify({'status': 'error', 'message': 'DB ID가 제공되지 않았습니다.'}), 400
+        if not os.path.isdir(db_id):
+            return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+
+        try:
+            with db_locks.write(db_id, 'rollback', timeout=DB_WRITE_LOCK_TIMEOUT):
+                snapshot = rollback_snapshot(db_id, data.get('snapshot'))
+                # 되돌린 스냅샷 기준으로 tombstone 수 다시 기록
+                vectorstore = vectorstore_handles.get(db_id)
+                db_metadata.update_db(db_id, tombstones=tombstone_count(vectorstore),
+                                      last_updated=datetime.datetime.now().isoformat())
+                bump_db_version(db_id)
+            return jsonify({
+                'status': 'success',
+                'message': f'벡터 DB를 스냅샷 {snapshot}(으)로 되돌렸습니다.',
+                'snapshot': snapshot
+            })
+        except DBBusyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        except Exception as e:
+            print(f"벡터 DB 롤백 중 오류: {str(e)}")
+            return jsonify({'status': 'error', 'message': f'벡터 DB 롤백 중 오류: {str(e)}'}), 500
+
     @app.route('/remove_documents_from_db', methods=['POST'])
     def remove_documents_from_db():
         data = request.json
@@ -298,21 +1034,31 @@ def setup_document_manager(app):
             if not os.path.exists(db_id) or not os.path.isdir(db_id):
                 return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
             
-            # 메타데이터 가져오기
-            metadata = load_db_metadata()
-            db_info = metadata.get(db_id, {})
-            display_name = db_info.get('display_name', db_id.replace(VECTOR_DB_FOLDER, ''))
+            display_name = get_db_display_name(db_id)
             
-            # 여기서는 실제로 문서를 삭제하는 대신, 전체 DB를 다시 생성하는 방식으로 구현합니다.
-            # (FAISS는 문서 삭제를 직접적으로 지원하지 않기 때문)
-            # 실제 구현에서는 DB를 백업하고 새로 생성하는 로직이 필요합니다.
+            def edit(state):
+                # 청크를 docstore/라벨 매핑과 인덱스에서 함께 삭제하고 매니페스트에서도 제거
+                files = _chunk_files(state['vectorstore'], document_ids)
+                removed_ids = state['vectorstore'].remove_documents(document_ids)
+                if removed_ids:
+                    if state['manifest'] is not None:
+                        forget_chunks(state['manifest'], document_ids, files)
+                    state['removed_ids'].extend(removed_ids)
+                    state['changed'] = True
+                return removed_ids, state
+            
+            removed_ids, state = _edit_db(db_id, edit, 'remove_documents')
+            if not removed_ids:
+                return jsonify({'status': 'error', 'message': '지정된 ID의 문서를 찾을 수 없습니다.'}), 404
             
-            # 간단한 메시지 반환 (시연용)
             return jsonify({
                 'status': 'success', 
-                'message': f'벡터 DB "{display_name}"에서 {len(document_ids)}개 문서 삭제 요청 처리됨',
-                'note': '문서 삭제 기능은 현재 개발 중입니다.'
+                'message': f'벡터 DB "{display_name}"에서 {len(removed_ids)}개 문서가 삭제되었습니다.',
+                'removed_count': len(removed_ids),
+                'tombstones': tombstone_count(state['vectorstore'])
             })
+        except DBBusyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
         except Exception as e:
             print(f"문서 삭제 중 오류: {str(e)}")
             return jsonify({'status': 'error', 'message': f'문서 삭제 중 오류: {str(e)}'}), 500
@@ -345,7 +1091,9 @@ def setup_document_manager(app):
                     'chunk_overlap': db_info.get('chunk_overlap', 50),
                     'created_at': db_info.get('created_at', ''),
                     'last_updated': db_info.get('last_updated', db_info.get('created_at', '')),
-                    'document_count': db_info.get('added_documents', 0)
+                    'document_count': db_info.get('added_documents', 0),
+                    'index_type': db_info.get('index_type', 'flat'),
+                    'index_params': db_info.get('index_params', {})
                 }
             })
         except Exception as e:
@@ -432,19 +1180,15 @@ def setup_document_manager(app):
             return jsonify({'status': 'error', 'message': f'카테고리 "{category_name}"이(가) 이미 존재합니다.'}), 400
         
         try:
-            # 메타데이터 로드
-            metadata = load_db_metadata()
-            
-            # 카테고리 정보를 저장할 특별한 키 추가
-            if '_categories' not in metadata:
-                metadata['_categories'] = []
-            
-            # 새 카테고리 추가
-            if category_name not in metadata['_categories']:
-                metadata['_categories'].append(category_name)
-            
-            # 메타데이터 파일 저장
-            save_db_metadata(metadata)
+            # 메타데이터 로드 후 저장
+            with update_db_metadata() as metadata:
+                # 카테고리 정보를 저장할 특별한 키 추가
+                if '_categories' not in metadata:
+                    metadata['_categories'] = []
+                
+                # 새 카테고리 추가
+                if category_name not in metadata['_categories']:
+                    metadata['_categories'].append(category_name)
             
             # 업데이트된 카테고리 목록 반환
             all_categories = get_all_categories()
@@ -491,88 +1235,82 @@ def setup_document_manager(app):
         if chunk_overlap >= chunk_size:
             chunk_overlap = chunk_size // 2
         
+        # FAISS 인덱스 종류와 빌드/검색 파라미터 (flat, hnsw, ivf_flat, ivf_pq)
+        try:
+            index_type, index_params = normalize_index_config(data.get('index_type'), data.get('index_params'))
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({'status': 'error', 'message': f'인덱스 설정 오류: {str(e)}'}), 400
+        
         if not storage_filenames or not db_name:
             return jsonify({'status': 'error', 'message': '파일명 또는 DB명이 제공되지 않았습니다.'}), 400
         
         try:
-            # 모든 문서를 로드합니다
-            all_documents = []
+            # 파일 존재 여부 확인
+            file_paths = []
             for storage_filename in storage_filenames:
                 file_path = os.path.join(app.config['UPLOAD_FOLDER'], storage_filename)
                 
                 if not os.path.exists(file_path):
                     return jsonify({'status': 'error', 'message': f'파일을 찾을 수 없습니다: {restore_filename(storage_filename)}'}), 404
-                
-                try:
-                    # 파일 형식에 맞는 로더 가져오기 (PDF 로더 타입 전달)
-                    loader = get_loader_for_file(file_path, pdf_loader)
-                    documents = loader.load()
-                    
-                    # 문서 이름이 제공된 경우 메타데이터에 추가
-                    if document_name:
-                        for doc in documents:
-                            doc.metadata['custom_name'] = document_name
-                            # 원본 파일명도 보존
-                            doc.metadata['original_filename'] = restore_filename(storage_filename)
-                            
-                    all_documents.extend(documents)
-                    print(f"파일 '{storage_filename}' 로드 완료: {len(documents)}개 문서")
-                except Exception as e:
-                    print(f"파일 '{storage_filename}' 로드 오류: {str(e)}")
-                    return jsonify({'status': 'error', 'message': f"파일 '{restore_filename(storage_filename)}' 로드 중 오류: {str(e)}"}), 500
-            
-            if not all_documents:
-                return jsonify({'status': 'error', 'message': '로드된 문서가 없습니다.'}), 400
-            
-            print(f"총 {len(all_documents)}개 문서 로드 완료")
-            
-            # 문서 분할 - 사용자 지정 청크 크기와 오버랩 사용
-            print(f"[청크 설정] 크기: {chunk_size}자, 오버랩: {chunk_overlap}자")
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-            split_docs = text_splitter.split_documents(all_documents)
-            print(f"[문서 분할 완료] 총 {len(all_documents)}개 문서에서 {len(split_docs)}개 청크 생성됨")
-
-            # 벡터스토어 생성
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = FAISS.from_documents(documents=split_docs, embedding=embeddings)
-            
-            # 벡터 DB ID 생성 (접두어 + DB 이름 인코딩)
-            now = datetime.datetime.now()
-            system_db_id = f"db_{now.strftime('%Y%m%d%H%M%S')}"  # 예: db_20250417123045
-            db_id = f"{VECTOR_DB_FOLDER}{system_db_id}"
-                        
-            # 벡터 DB 저장
-            vectorstore.save_local(db_id)
-            print(f"벡터 DB '{db_name}' 저장 완료")
-            
-            # 메타데이터에 표시 이름과 청크 설정 저장
-            metadata = load_db_metadata()
-            metadata[db_id] = {
-                'display_name': db_name,  # 원본 한글 이름을 표시 이름으로 저장
-                'created_at': datetime.datetime.now().isoformat(),
-                'chunk_size': chunk_size,
-                'chunk_overlap': chunk_overlap,
-                'category': category,  # 카테고리 정보 추가
-                'document_name': document_name  # 문서 이름 저장
-            }
-            save_db_metadata(metadata)
+                file_paths.append(file_path)
             
-            return jsonify({
-                'status': 'success', 
-                'message': f'벡터 DB "{db_name}" 생성 완료!',
+            # 파싱/임베딩/저장은 백그라운드 작업으로 실행하고 작업 ID를 바로 반환
+            job = job_manager.submit('create_vector_db', {
+                'storage_filenames': storage_filenames,
+                'file_paths': file_paths,
                 'db_name': db_name,
-                'db_id': db_id,
-                'document_count': len(all_documents),
-                'chunk_count': len(split_docs),
+                'document_name': document_name,
+                'category': category,
+                'pdf_loader': pdf_loader,
                 'chunk_size': chunk_size,
                 'chunk_overlap': chunk_overlap,
-                'category': category,
-                'document_name': document_name or '원본 파일명'
+                'index_type': index_type,
+                'index_params': index_params,
+                'dedup': bool(data.get('dedup', CHUNK_DEDUP_DEFAULT))
             })
+            return jsonify({
+                'status': 'success',
+                'message': f'벡터 DB "{db_name}" 생성 작업이 등록되었습니다.',
+                'job_id': job['job_id'],
+                'chunk_size': chunk_size,
+                'chunk_overlap': chunk_overlap
+            }), 202
         except Exception as e:
             print(f"벡터 DB 생성 중 오류: {str(e)}")
             return jsonify({'status': 'error', 'message': f'벡터 DB 생성 중 오류: {str(e)}'}), 500
     
+    @app.route('/ingestion_jobs', methods=['GET'])
+    def list_ingestion_jobs():
+        """최근 수집 작업 목록"""
+        try:
+            limit = int(request.args.get('limit', 50))
+            return jsonify({'status': 'success', 'jobs': job_manager.list(limit)})
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': f'작업 목록 조회 중 오류: {str(e)}'}), 500
+    
+    @app.route('/ingestion_jobs/<job_id>', methods=['GET'])
+    def get_ingestion_job(job_id):
+        """수집 작업 상태 조회"""
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': '작업을 찾을 수 없습니다.'}), 404
+        return jsonify({'status': 'success', 'job': job})
+    
+    @app.route('/ingestion_jobs/<job_id>/events', methods=['GET'])
+    def stream_ingestion_job(job_id):
+        """수집 작업 진행 상황을 SSE로 스트리밍"""
+        if job_manager.get(job_id) is None:
+            return jsonify({'status': 'error', 'message': '작업을 찾을 수 없습니다.'}), 404
+        return Response(job_manager.stream(job_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    @app.route('/ingestion_jobs/<job_id>/cancel', methods=['POST'])
+    def cancel_ingestion_job(job_id):
+        """수집 작업 취소 요청"""
+        job = job_manager.cancel(job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': '작업을 찾을 수 없습니다.'}), 404
+        return jsonify({'status': 'success', 'message': '작업 취소를 요청했습니다.', 'job': job})
     
     
     @app.route('/delete_vector_db', methods=['POST'])
@@ -584,22 +1322,27 @@ def setup_document_manager(app):
             return jsonify({'status': 'error', 'message': 'DB ID가 제공되지 않았습니다.'}), 400
         
         try:
-            if os.path.exists(db_id) and os.path.isdir(db_id):
-                # 메타데이터에서 삭제
-                metadata = load_db_metadata()
-                if db_id in metadata:
-                    # 표시 이름 가져오기
-                    display_name = metadata[db_id].get('display_name', db_id.replace(VECTOR_DB_FOLDER, ''))
-                    del metadata[db_id]
-                    save_db_metadata(metadata)
-                else:
-                    display_name = db_id.replace(VECTOR_DB_FOLDER, '')
+            # 진행 중인 쓰기가 끝난 뒤 삭제 (저장 중인 스냅샷과 겹치지 않게)
+            with db_locks.write(db_id, 'delete_db', timeout=DB_WRITE_LOCK_TIMEOUT):
+                if os.path.exists(db_id) and os.path.isdir(db_id):
+                    # 메타데이터에서 삭제
+                    with update_db_metadata() as metadata:
+                        if db_id in metadata:
+                            # 표시 이름 가져오기
+                            display_name = metadata[db_id].get('display_name', db_id.replace(VECTOR_DB_FOLDER, ''))
+                            del metadata[db_id]
+                        else:
+                            display_name = db_id.replace(VECTOR_DB_FOLDER, '')
                 
-                # 벡터 DB 디렉토리 삭제
-                shutil.rmtree(db_id)
-                return jsonify({'status': 'success', 'message': f'벡터 DB "{display_name}" 삭제 완료!'})
-            else:
-                return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+                    # 벡터 DB 디렉토리 삭제
+                    shutil.rmtree(db_id)
+                    vectorstore_handles.discard(db_id)
+                    bump_db_version(db_id)
+                    return jsonify({'status': 'success', 'message': f'벡터 DB "{display_name}" 삭제 완료!'})
+                else:
+                    return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
+        except DBBusyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
         except Exception as e:
             return jsonify({'status': 'error', 'message': f'벡터 DB 삭제 중 오류: {str(e)}'}), 500
     
@@ -613,19 +1356,16 @@ def setup_document_manager(app):
             return jsonify({'status': 'error', 'message': '카테고리 이름이 제공되지 않았습니다.'}), 400
         
         try:
-            metadata = load_db_metadata()
-            
-            # 해당 카테고리를 사용하는 모든 DB를 '기타'로 변경
-            for db_id, db_info in metadata.items():
-                if isinstance(db_info, dict) and db_info.get('category') == category_name:
-                    metadata[db_id]['category'] = '기타'
-            
-            # '_categories' 배열에서 카테고리 제거 - 이 부분이 추가되어야 함
-            if '_categories' in metadata and isinstance(metadata['_categories'], list):
-                if category_name in metadata['_categories']:
-                    metadata['_categories'].remove(category_name)
-            
-            save_db_metadata(metadata)
+            with update_db_metadata() as metadata:
+                # 해당 카테고리를 사용하는 모든 DB를 '기타'로 변경
+                for db_id, db_info in metadata.items():
+                    if isinstance(db_info, dict) and db_info.get('category') == category_name:
+                        metadata[db_id]['category'] = '기타'
+                
+                # '_categories' 배열에서 카테고리 제거 - 이 부분이 추가되어야 함
+                if '_categories' in metadata and isinstance(metadata['_categories'], list):
+                    if category_name in metadata['_categories']:
+                        metadata['_categories'].remove(category_name)
             
             # 남은 카테고리 목록 반환
             categories = get_all_categories()
@@ -651,57 +1391,50 @@ def setup_document_manager(app):
             return jsonify({'status': 'error', 'message': 'DB ID 또는 카테고리가 제공되지 않았습니다.'}), 400
         
         try:
-            metadata = load_db_metadata()
-            
-            # DB ID가 존재하는지 확인
-            if db_id in metadata:
-                # 기존 카테고리 저장
-                old_category = metadata[db_id].get('category', '기타')
-                
-                # 새 카테고리 저장
-                metadata[db_id]['category'] = new_category
-                
-                # 카테고리 목록 업데이트
-                if '_categories' not in metadata:
-                    metadata['_categories'] = []
+            with update_db_metadata() as metadata:
+                # DB ID가 존재하는지 확인
+                if db_id in metadata:
+                    # 기존 카테고리 저장
+                    old_category = metadata[db_id].get('category', '기타')
                 
-                # 새 카테고리가 목록에 없으면 추가
-                if new_category not in metadata['_categories'] and new_category != '기타':
-                    metadata['_categories'].append(new_category)
+                    # 새 카테고리 저장
+                    metadata[db_id]['category'] = new_category
                 
-                # 메타데이터 저장
-                save_db_metadata(metadata)
+                    # 카테고리 목록 업데이트
+                    if '_categories' not in metadata:
+                        metadata['_categories'] = []
                 
-                return jsonify({
-                    'status': 'success', 
-                    'message': f'카테고리가 "{new_category}"로 변경되었습니다.', 
-                    'db_id': db_id, 
-                    'old_category': old_category,
-                    'new_category': new_category
-                })
-            else:
-                # DB ID가 메타데이터에 없으면 새로 추가
-                metadata[db_id] = {
-                    'display_name': db_id.replace(VECTOR_DB_FOLDER, ''),
-                    'category': new_category,
-                    'created_at': datetime.datetime.now().isoformat()
-                }
+                    # 새 카테고리가 목록에 없으면 추가
+                    if new_category not in metadata['_categories'] and new_category != '기타':
+                        metadata['_categories'].append(new_category)
                 
-                # 새 카테고리가 목록에 없으면 추가
-                if '_categories' not in metadata:
-                    metadata['_categories'] = []
-                if new_category not in metadata['_categories'] and new_category != '기타':
-                    metadata['_categories'].append(new_category)
+                    return jsonify({
+                        'status': 'success', 
+                        'message': f'카테고리가 "{new_category}"로 변경되었습니다.', 
+                        'db_id': db_id, 
+                        'old_category': old_category,
+                        'new_category': new_category
+                    })
+                else:
+                    # DB ID가 메타데이터에 없으면 새로 추가
+                    metadata[db_id] = {
+                        'display_name': db_id.replace(VECTOR_DB_FOLDER, ''),
+                        'category': new_category,
+                        'created_at': datetime.datetime.now().isoformat()
+                    }
                 
-                # 메타데이터 저장
-                save_db_metadata(metadata)
+                    # 새 카테고리가 목록에 없으면 추가
+                    if '_categories' not in metadata:
+                        metadata['_categories'] = []
+                    if new_category not in metadata['_categories'] and new_category != '기타':
+                        metadata['_categories'].append(new_category)
                 
-                return jsonify({
-                    'status': 'success', 
-                    'message': f'DB가 추가되고 카테고리가 "{new_category}"로 설정되었습니다.', 
-                    'db_id': db_id, 
-                    'new_category': new_category
-                })
+                    return jsonify({
+                        'status': 'success', 
+                        'message': f'DB가 추가되고 카테고리가 "{new_category}"로 설정되었습니다.', 
+                        'db_id': db_id, 
+                        'new_category': new_category
+                    })
         except Exception as e:
             print(f"카테고리 변경 중 오류: {str(e)}")
             import traceback
@@ -723,20 +1456,17 @@ def setup_document_manager(app):
             return jsonify({'status': 'error', 'message': '기존 카테고리 이름과 새 이름이 모두 필요합니다.'}), 400
         
         try:
-            metadata = load_db_metadata()
-            
-            # 해당 카테고리를 사용하는 모든 DB의 카테고리 이름 변경
-            for db_id, db_info in metadata.items():
-                if isinstance(db_info, dict) and db_info.get('category') == old_name:
-                    metadata[db_id]['category'] = new_name
-            
-            # '_categories' 배열에서 카테고리 이름 변경 - 이 부분이 추가되어야 함
-            if '_categories' in metadata and isinstance(metadata['_categories'], list):
-                if old_name in metadata['_categories']:
-                    index = metadata['_categories'].index(old_name)
-                    metadata['_categories'][index] = new_name
-            
-            save_db_metadata(metadata)
+            with update_db_metadata() as metadata:
+                # 해당 카테고리를 사용하는 모든 DB의 카테고리 이름 변경
+                for db_id, db_info in metadata.items():
+                    if isinstance(db_info, dict) and db_info.get('category') == old_name:
+                        metadata[db_id]['category'] = new_name
+                
+                # '_categories' 배열에서 카테고리 이름 변경 - 이 부분이 추가되어야 함
+                if '_categories' in metadata and isinstance(metadata['_categories'], list):
+                    if old_name in metadata['_categories']:
+                        index = metadata['_categories'].index(old_name)
+                        metadata['_categories'][index] = new_name
             
             # 업데이트된 카테고리 목록 반환
             categories = get_all_categories()
@@ -759,53 +1489,37 @@ def setup_document_manager(app):
         # 실제 존재하는 벡터 DB 디렉토리 확인
         existing_folders = [folder for folder in os.listdir() if folder.startswith(VECTOR_DB_FOLDER) and os.path.isdir(folder)]
         
-        # 메타데이터와 실제 폴더 동기화 - 메타데이터 업데이트 필요 여부
-        metadata_updated = False
+        # 메타데이터에 없는 폴더는 기본 항목을 만들어 저장 (읽은 메타데이터는 공유 사본이라 수정하지 않음)
+        missing = {}
         
         for folder in existing_folders:
             # 메타데이터에서 표시 이름 가져오기
-            db_info = metadata.get(folder, {})
-            
-            # 표시 이름 없으면 폴더명 사용
-            display_name = db_info.get('display_name')
-            if not display_name:
-                display_name = folder[len(VECTOR_DB_FOLDER):]
-                # 메타데이터 업데이트
-                if folder in metadata:
-                    metadata[folder]['display_name'] = display_name
-                    metadata_updated = True
-                else:
-                    metadata[folder] = {'display_name': display_name, 'category': '기타', 'created_at': datetime.datetime.now().isoformat()}
-                    metadata_updated = True
+            db_info = metadata.get(folder)
+            if db_info is None:
+                db_info = missing[folder] = {
+                    'display_name': folder[len(VECTOR_DB_FOLDER):],
+                    'category': '기타',
+                    'created_at': datetime.datetime.now().isoformat()
+                }
             
-            # 카테고리 정보 가져오기 (없으면 기타)
-            category = db_info.get('category', '기타')
-            if not category:
-                category = '기타'
-                # 메타데이터 업데이트
-                if folder in metadata:
-                    metadata[folder]['category'] = category
-                    metadata_updated = True
+            # 표시 이름/카테고리는 메타데이터 로드 시 채워짐 (없으면 폴더명, 기타)
+            display_name = db_info.get('display_name') or folder[len(VECTOR_DB_FOLDER):]
+            category = db_info.get('category') or '기타'
             
             vector_dbs.append({
                 'id': folder,
                 'name': display_name,
-                'category': category
+                'category': category,
+                'tombstones': db_info.get('tombstones', 0)  # 삭제되었지만 인덱스에 남은 벡터 수
             })
         
-        # 메타데이터에 있지만 실제로는 없는 폴더 처리
-        for key in list(metadata.keys()):
-            if key != '_categories' and key.startswith(VECTOR_DB_FOLDER) and key not in existing_folders:
-                # 옵션 1: 메타데이터에서 제거 (정리)
-                # del metadata[key]
-                # metadata_updated = True
-                
-                # 옵션 2: 유지하되 표시하지 않음 (위의 vector_dbs에 포함되지 않음)
-                pass
+        # 메타데이터에 있지만 실제로는 없는 폴더는 유지하되 표시하지 않음 (위의 vector_dbs에 포함되지 않음)
         
         # 메타데이터 변경사항 있으면 저장
-        if metadata_updated:
-            save_db_metadata(metadata)
+        if missing:
+            with update_db_metadata() as updated:
+                for folder, db_info in missing.items():
+                    updated.setdefault(folder, db_info)
         
         # 카테고리별로 그룹화
         categorized_dbs = {}
@@ -819,59 +1533,60 @@ def setup_document_manager(app):
     
     @app.route('/get_db_documents', methods=['POST'])
     def get_db_documents():
+        """
+        DB 청크 목록 한 페이지 (미리 계산된 목록에서 조회)
+
+        요청 값:
+            mode: 'chunks'(기본, 청크별) 또는 'sources'(출처 파일별 한 행, 청크 수 포함)
+            cursor: 이전 응답의 next_cursor (없으면 처음부터)
+            limit: 페이지 크기 (기본 100, 최대 1000)
+            source, custom_name: 일치하는 청크만
+            prefix: 내용이 이 텍스트로 시작하는 청크만 (대소문자/앞 공백 무시)
+        """
         data = request.json
         db_id = data.get('db_id')
+        mode = data.get('mode', 'chunks')
         
         if not db_id:
             return jsonify({'status': 'error', 'message': 'DB ID가 제공되지 않았습니다.'}), 400
+        if mode not in ('chunks', 'sources'):
+            return jsonify({'status': 'error', 'message': f'지원하지 않는 조회 방식입니다: {mode}'}), 400
         
         try:
             # 벡터 DB가 존재하는지 확인
             if not os.path.exists(db_id) or not os.path.isdir(db_id):
                 return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
             
-            # 해당 DB에서 임베딩 불러오기
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = FAISS.load_local(db_id, embeddings, allow_dangerous_deserialization=True)
+            # 현재 스냅샷의 공유 핸들과 핸들에 붙은 목록 사용 (스냅샷이 같으면 다시 만들지 않음)
+            vectorstore = vectorstore_handles.get(db_id)
+            listing = get_listing(vectorstore)
+            filters = {
+                'source': data.get('source'),
+                'custom_name': data.get('custom_name'),
+                'prefix': data.get('prefix') or None,
+            }
+            limit = page_size(data.get('limit'))
             
-            # 문서 목록 가져오기 (FAISS에서는 직접적으로 문서 메타데이터에 접근 가능)
-            documents = []
-            if hasattr(vectorstore, 'docstore') and hasattr(vectorstore.docstore, '_dict'):
-                for doc_id, doc in vectorstore.docstore._dict.items():
-                    # 소스 문서 경로에서 파일명만 추출
-                    source = doc.metadata.get('source', '알 수 없음')
-                    filename = os.path.basename(source) if source else '알 수 없음'
-                    
-                    # URL 디코딩하여 원본 파일명 가져오기
-                    original_filename = urllib.parse.unquote(filename)
-                    
-                    # 사용자 지정 문서명 가져오기
-                    custom_name = doc.metadata.get('custom_name', original_filename)
-                    
-                    # 내용 일부만 표시 (최대 50자)
-                    content_preview = doc.page_content[:50] + '...' if len(doc.page_content) > 50 else doc.page_content
-                    
-                    # 메타데이터에서 필요한 정보 추출
-                    metadata = {}
-                    for key, value in doc.metadata.items():
-                        if key not in ['source'] and value:  # source는 이미 별도로 처리했으므로 제외
-                            metadata[key] = value
-                    
-                    documents.append({
-                        'id': doc_id,
-                        'source': source,  # 전체 경로는 내부적으로 사용
-                        'filename': filename,  # 화면에 표시할 인코딩된 파일명
-                        'original_filename': original_filename,  # 디코딩된 원본 파일명
-                        'custom_name': custom_name,  # 사용자 지정 문서명
-                        'content': content_preview,  # 미리보기용 짧은 내용
-                        'metadata': metadata  # 추가 메타데이터
-                    })
+            if mode == 'sources':
+                rows, count, next_cursor = listing.groups(vectorstore, data.get('cursor'), limit, **filters)
+                return jsonify({
+                    'status': 'success',
+                    'sources': rows,
+                    'count': count,
+                    'total_chunks': len(listing.labels),
+                    'next_cursor': next_cursor
+                })
             
+            rows, count, next_cursor = listing.chunks(vectorstore, data.get('cursor'), limit, **filters)
             return jsonify({
                 'status': 'success',
-                'documents': documents,
-                'count': len(documents)
+                'documents': rows,
+                'count': count,
+                'total_chunks': len(listing.labels),
+                'next_cursor': next_cursor
             })
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': f'잘못된 커서입니다: {str(e)}'}), 400
         except Exception as e:
             print(f"문서 목록 조회 중 오류: {str(e)}")
             return jsonify({'status': 'error', 'message': f'문서 목록 조회 중 오류: {str(e)}'}), 500
@@ -891,51 +1606,36 @@ def setup_document_manager(app):
             if not os.path.exists(db_id) or not os.path.isdir(db_id):
                 return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
             
-            # 해당 DB에서 임베딩 불러오기
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = FAISS.load_local(db_id, embeddings, allow_dangerous_deserialization=True)
+            def edit(state):
+                # 문서 삭제 (docstore/라벨 매핑과 함께 인덱스의 벡터도 제거, 저장은 함께 묶인 편집과 한 번에)
+                vectorstore = state['vectorstore']
+                if doc_id not in vectorstore.docstore._dict:
+                    return None
+                # 문서 메타데이터와 임시 정보 저장
+                deleted_doc = vectorstore.docstore._dict[doc_id]
+                files = _chunk_files(vectorstore, [doc_id])
+                state['removed_ids'].extend(vectorstore.remove_documents([doc_id]))
+                # 매니페스트에서도 청크 제거
+                if state['manifest'] is not None:
+                    forget_chunks(state['manifest'], [doc_id], files)
+                state['removed_chunks'] += 1
+                state['changed'] = True
+                return deleted_doc
             
-            # 문서 삭제 (FAISS는 문서 삭제를 직접 지원하지 않아 우회적인 방법 사용)
-            if hasattr(vectorstore, 'docstore') and hasattr(vectorstore.docstore, '_dict'):
-                if doc_id in vectorstore.docstore._dict:
-                    # 문서 메타데이터와 임시 정보 저장
-                    deleted_doc = vectorstore.docstore._dict[doc_id]
-                    
-                    # 문서 삭제
-                    del vectorstore.docstore._dict[doc_id]
-                    
-                    # 문서 ID를 인덱스 매핑에서도 제거
-                    if hasattr(vectorstore, 'index_to_docstore_id'):
-                        for idx, d_id in list(vectorstore.index_to_docstore_id.items()):
-                            if d_id == doc_id:
-                                del vectorstore.index_to_docstore_id[idx]
-                    
-                    # 벡터스토어 다시 저장
-                    vectorstore.save_local(db_id)
-                    
-                    # 메타데이터 업데이트
-                    metadata = load_db_metadata()
-                    if db_id in metadata:
-                        metadata[db_id]['last_updated'] = datetime.datetime.now().isoformat()
-                        
-                        # 문서 수 업데이트 (있는 경우)
-                        if 'document_count' in metadata[db_id]:
-                            metadata[db_id]['document_count'] = max(0, metadata[db_id].get('document_count', 1) - 1)
-                        
-                        save_db_metadata(metadata)
-                    
-                    return jsonify({
-                        'status': 'success', 
-                        'message': f'문서가 벡터 DB에서 성공적으로 삭제되었습니다.',
-                        'deleted_doc': {
-                            'id': doc_id,
-                            'source': deleted_doc.metadata.get('source', '알 수 없음')
-                        }
-                    })
-                else:
-                    return jsonify({'status': 'error', 'message': '지정된 ID의 문서를 찾을 수 없습니다.'}), 404
-            else:
-                return jsonify({'status': 'error', 'message': '벡터 DB 문서 저장소에 접근할 수 없습니다.'}), 500
+            deleted_doc = _edit_db(db_id, edit, 'remove_document')
+            if deleted_doc is None:
+                return jsonify({'status': 'error', 'message': '지정된 ID의 문서를 찾을 수 없습니다.'}), 404
+            
+            return jsonify({
+                'status': 'success', 
+                'message': f'문서가 벡터 DB에서 성공적으로 삭제되었습니다.',
+                'deleted_doc': {
+                    'id': doc_id,
+                    'source': deleted_doc.metadata.get('source', '알 수 없음')
+                }
+            })
+        except DBBusyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
         except Exception as e:
             print(f"문서 삭제 중 오류: {str(e)}")
             import traceback
@@ -957,52 +1657,29 @@ def setup_document_manager(app):
             if not os.path.exists(db_id) or not os.path.isdir(db_id):
                 return jsonify({'status': 'error', 'message': '벡터 DB를 찾을 수 없습니다.'}), 404
             
-            # 해당 DB에서 임베딩 불러오기
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = FAISS.load_local(db_id, embeddings, allow_dangerous_deserialization=True)
+            def edit(state):
+                # 삭제할 문서 ID 목록 (출처 색인에서 조회, 소스가 일치하는 모든 문서)
+                vectorstore = state['vectorstore']
+                docs_to_remove = vectorstore.metadata_index.find('source', source)
+                if docs_to_remove:
+                    # 문서 삭제 (docstore/라벨 매핑과 함께 인덱스의 벡터도 제거)
+                    state['removed_ids'].extend(vectorstore.remove_documents(docs_to_remove))
+                    # 매니페스트에서도 청크 제거
+                    if state['manifest'] is not None:
+                        forget_chunks(state['manifest'], docs_to_remove, {os.path.basename(source)})
+                    state['changed'] = True
+                return len(docs_to_remove)
             
-            # 문서 삭제 (소스가 일치하는 모든 문서 삭제)
-            removed_count = 0
-            if hasattr(vectorstore, 'docstore') and hasattr(vectorstore.docstore, '_dict'):
-                # 삭제할 문서 ID 목록 수집
-                docs_to_remove = []
-                for doc_id, doc in vectorstore.docstore._dict.items():
-                    if doc.metadata.get('source') == source:
-                        docs_to_remove.append(doc_id)
-                        removed_count += 1
-                
-                # 문서 삭제
-                for doc_id in docs_to_remove:
-                    del vectorstore.docstore._dict[doc_id]
-                
-                # 인덱스 매핑에서도 제거
-                if hasattr(vectorstore, 'index_to_docstore_id'):
-                    # 새로운 매핑 생성
-                    new_index_mapping = {}
-                    for idx, d_id in vectorstore.index_to_docstore_id.items():
-                        if d_id not in docs_to_remove:
-                            new_index_mapping[idx] = d_id
-                    
-                    # 매핑 업데이트
-                    vectorstore.index_to_docstore_id = new_index_mapping
-                
-                # 벡터스토어 다시 저장
-                vectorstore.save_local(db_id)
-                
-                # 메타데이터 업데이트
-                metadata = load_db_metadata()
-                if db_id in metadata:
-                    metadata[db_id]['last_updated'] = datetime.datetime.now().isoformat()
-                    save_db_metadata(metadata)
-                
-                return jsonify({
-                    'status': 'success', 
-                    'message': f'문서 출처 "{source}"에서 {removed_count}개 항목이 삭제되었습니다.',
-                    'removed_count': removed_count,
-                    'source': source
-                })
-            else:
-                return jsonify({'status': 'error', 'message': '벡터 DB 문서 저장소에 접근할 수 없습니다.'}), 500
+            removed_count = _edit_db(db_id, edit, 'remove_source')
+            
+            return jsonify({
+                'status': 'success', 
+                'message': f'문서 출처 "{source}"에서 {removed_count}개 항목이 삭제되었습니다.',
+                'removed_count': removed_count,
+                'source': source
+            })
+        except DBBusyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
         except Exception as e:
             print(f"문서 출처 삭제 중 오류: {str(e)}")
             import traceback
@@ -1022,24 +1699,27 @@ def setup_document_manager(app):
             return jsonify({'status': 'error', 'message': 'DB ID 또는 소스 경로가 누락되었습니다.'}), 400
         
         try:
-            # 벡터 DB 로드
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = FAISS.load_local(db_id, embeddings, allow_dangerous_deserialization=True)
-            
-            # 해당 소스의 문서 업데이트
-            updated = 0
-            for doc_id, doc in vectorstore.docstore._dict.items():
-                if doc.metadata.get('source') == source:
-                    doc.metadata['custom_name'] = custom_name
-                    updated += 1
+            def edit(state):
+                # 해당 소스의 문서 업데이트 (출처 색인에서 청크 조회, 색인도 함께 갱신)
+                vectorstore = state['vectorstore']
+                updated = vectorstore.update_metadata(vectorstore.metadata_index.find('source', source),
+                                                      custom_name=custom_name)
+                if updated > 0:
+                    # 동기화로 다시 처리해도 바뀐 문서명이 유지되도록 매니페스트에도 기록
+                    entry = (state['manifest'] or {}).get('files', {}).get(os.path.basename(source))
+                    if entry is not None:
+                        entry['custom_name'] = custom_name
+                    state['changed'] = True
+                return updated
             
-            # 변경사항 저장
-            if updated > 0:
-                vectorstore.save_local(db_id)
+            # 변경사항 저장 (같은 DB의 다른 편집과 묶어서 저장)
+            if _edit_db(db_id, edit, 'rename_document') > 0:
                 return jsonify({'status': 'success', 'message': f'문서명이 업데이트되었습니다.'})
             else:
                 return jsonify({'status': 'error', 'message': '해당 문서를 찾을 수 없습니다.'}), 404
                 
+        except DBBusyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
         except Exception as e:
             print(f"문서명 업데이트 중 오류: {str(e)}")
             return jsonify({'status': 'error', 'message': f'오류: {str(e)}'}), 500
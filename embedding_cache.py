@@ -0,0 +1,388 @@
+"""
+콘텐츠 주소 기반 임베딩 캐시
+
+청크 임베딩을 (모델, 차원, 청크 텍스트 sha256) 키로 디스크에 저장합니다.
+벡터는 하나의 float32 행렬 파일(메모리 매핑)에, 키는 행 순서대로 별도 파일에 추가됩니다.
+같은 문서를 다른 DB에 넣거나 같은 청크 설정으로 DB를 다시 만들 때 API 호출이 생략됩니다.
+"""
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from embedding_pipeline import EmbeddingPipeline, FakeEmbeddings
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# 'openai' 또는 'fake' (API 호출 없는 결정적 임베딩, 로컬 테스트용)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'openai')
+EMBEDDING_CACHE_DIR = 'embedding_cache'
+QUERY_CACHE_FILE = 'queries.sqlite3'
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def text_hash(text):
+    """청크 텍스트의 sha256 해시"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (모델, 차원) 단위의 임베딩 저장소
+
+    - {namespace}.f32: float32 벡터 행렬 (행 단위로 추가)
+    - {namespace}.keys: 행 순서대로 기록된 sha256 키 (한 줄에 하나)
+    - {namespace}.json: 벡터 차원 정보
+    - {namespace}.lock: 프로세스 간 추가/복구를 직렬화하는 잠금 파일 (fcntl 사용 가능 시)
+
+    여러 프로세스(웹 서버 워커, 수집 작업)가 같은 캐시에 추가하므로, 추가는 잠금 파일을 잡은 상태에서
+    다른 프로세스가 추가한 키를 먼저 읽어 들이고 파일 크기로 시작 행을 다시 계산합니다.
+    """
+
+    def __init__(self, model, dimensions=None, cache_dir=EMBEDDING_CACHE_DIR):
+        self.model = model
+        self.dimensions = dimensions
+        namespace = re.sub(r'[^0-9A-Za-z._-]', '_', f"{model}_{dimensions or 'default'}")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(cache_dir, f'{namespace}.f32')
+        self.keys_path = os.path.join(cache_dir, f'{namespace}.keys')
+        self.meta_path = os.path.join(cache_dir, f'{namespace}.json')
+        self.lock_path = os.path.join(cache_dir, f'{namespace}.lock')
+
+        self._lock = threading.Lock()
+        self._rows = {}
+        # 읽어 들인 키 파일 위치(바이트)와 행 수
+        self._keys_offset = 0
+        self._count = 0
+        self._dim = None
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_dim(self):
+        if self._dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self._dim = json.load(f).get('dim')
+        return self._dim
+
+    def _load(self):
+        # 복구(잘라내기)가 다른 프로세스의 추가 도중에 일어나지 않도록 잠금 파일 안에서 수행
+        with self._lock, self._file_lock():
+            if not self._read_dim() or not os.path.exists(self.keys_path) or not os.path.exists(self.vectors_path):
+                return
+            with open(self.keys_path, 'r', encoding='ascii') as f:
+                keys = [line.strip() for line in f if line.strip()]
+            # 벡터 기록 후 키를 기록하므로, 중간에 중단되었다면 둘 중 짧은 쪽까지만 유효
+            rows = min(len(keys), os.path.getsize(self.vectors_path) // (self._dim * 4))
+            if rows != len(keys) or os.path.getsize(self.vectors_path) != rows * self._dim * 4:
+                with open(self.vectors_path, 'r+b') as f:
+                    f.truncate(rows * self._dim * 4)
+                with open(self.keys_path, 'w', encoding='ascii') as f:
+                    f.write(''.join(f'{key}\n' for key in keys[:rows]))
+            self._read_new_keys()
+
+    def _read_new_keys(self):
+        """다른 프로세스가 추가한 키를 읽어 들입니다 (self._lock 안에서 호출)."""
+        if not self._read_dim():
+            return
+        try:
+            with open(self.keys_path, 'rb') as f:
+                f.seek(self._keys_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 벡터보다 키를 나중에 쓰므로, 완전히 기록된 줄까지의 키는 벡터도 이미 기록되어 있음
+        data = data[:data.rfind(b'\n') + 1]
+        for line in data.decode('ascii').splitlines():
+            key = line.strip()
+            if key:
+                self._rows.setdefault(key, self._count)
+                self._count += 1
+        self._keys_offset += len(data)
+
+    def _get_matrix(self):
+        if self._matrix is None or len(self._matrix) < self._count:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                     shape=(os.path.getsize(self.vectors_path) // (self._dim * 4), self._dim))
+        return self._matrix
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys):
+        """캐시에 있는 키의 벡터를 {키: 벡터} 형태로 반환합니다."""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._read_new_keys()
+            rows = [(key, self._rows[key]) for key in keys if key in self._rows]
+            self.hits += len(rows)
+            self.misses += len(keys) - len(rows)
+            if not rows:
+                return {}
+            matrix = self._get_matrix()
+            vectors = matrix[[row for _, row in rows]]
+            return {key: vectors[i].tolist() for i, (key, _) in enumerate(rows)}
+
+    def put_many(self, keys, vectors):
+        """새 벡터를 행렬 파일 끝에 추가합니다 (다른 프로세스와는 잠금 파일로 직렬화)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        with self._lock, self._file_lock():
+            if self._read_dim() is None:
+                self._dim = int(vectors.shape[1])
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({'model': self.model, 'dimensions': self.dimensions, 'dim': self._dim}, f)
+            # 다른 프로세스가 그 사이 추가한 키를 반영해 같은 키를 중복 기록하지 않음
+            self._read_new_keys()
+            new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._rows]
+            if not new:
+                return
+            # 행 번호는 모든 프로세스가 키 줄 수로 정하므로, 벡터만 쓰고(또는 키 줄을 쓰다가) 중단된
+            # 추가가 남긴 꼬리를 잘라 파일을 읽어 들인 키 줄 수에 맞춘 뒤 이어서 기록
+            start = self._count
+            self._truncate_tail(start)
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.stack([vector for _, vector in new]).tobytes())
+            data = ''.join(f'{key}\n' for key, _ in new).encode('ascii')
+            with open(self.keys_path, 'ab') as f:
+                f.write(data)
+            for i, (key, _) in enumerate(new):
+                self._rows[key] = start + i
+            self._keys_offset += len(data)
+            self._count = start + len(new)
+
+    def _truncate_tail(self, rows):
+        """키 줄 수(rows)를 넘는 벡터와 불완전한 마지막 키 줄을 잘라냅니다 (잠금 파일 안에서 호출)."""
+        for path, size in ((self.vectors_path, rows * self._dim * 4), (self.keys_path, self._keys_offset)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                print(f"[임베딩 캐시] 중단된 추가의 남은 데이터를 정리합니다: {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def stats(self):
+        return {
+            'model': self.model,
+            'dimensions': self.dimensions,
+            'entries': len(self._rows),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def normalize_query_text(text):
+    """쿼리 임베딩 캐시 키용 정규화 (유니코드 정규화, 공백 정리만 수행해 의미는 보존)"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    질문 임베딩 캐시
+
+    프로세스 내 LRU를 먼저 조회하고, persist_path가 주어지면 SQLite 파일을
+    2차 캐시로 사용합니다. 키는 (모델, 정규화된 질문)입니다.
+    """
+
+    def __init__(self, model, max_entries=4096, persist_path=None):
+        self.model = model
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persist_path:
+            os.makedirs(os.path.dirname(persist_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS query_embeddings '
+                '(model TEXT, query TEXT, vector BLOB, PRIMARY KEY (model, query))'
+            )
+            self._db.commit()
+
+    def _remember(self, query, vector):
+        self._entries[query] = vector
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, text):
+        query = normalize_query_text(text)
+        with self._lock:
+            vector = self._entries.get(query)
+            if vector is not None:
+                self._entries.move_to_end(query)
+                self.hits += 1
+                return vector.tolist()
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT vector FROM query_embeddings WHERE model = ? AND query = ?',
+                    (self.model, query),
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(query, vector)
+                    self.disk_hits += 1
+                    return vector.tolist()
+            self.misses += 1
+            return None
+
+    def put(self, text, vector):
+        query = normalize_query_text(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(query, vector)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO query_embeddings (model, query, vector) VALUES (?, ?, ?)',
+                    (self.model, query, vector.tobytes()),
+                )
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'model': self.model,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'persistent': self._db is not None,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    EmbeddingCache를 먼저 조회하고, 없는 청크만 실제 임베딩 모델로 계산하는 래퍼
+    질문 임베딩은 QueryEmbeddingCache로 재사용합니다.
+    pipeline이 주어지면 캐시에 없는 청크를 배치/병렬로 요청하고 완료된 배치부터 캐시에 기록합니다.
+    on_progress를 지정하면 (임베딩이 준비된 청크 수, 전체 청크 수)로 진행 상황을 알립니다.
+    """
+
+    def __init__(self, embeddings, cache, query_cache=None, pipeline=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.query_cache = query_cache
+        self.pipeline = pipeline
+        self.on_progress = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_hash(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # 캐시에 없는 텍스트만 (중복 제거 후) 임베딩
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        # 캐시에 있던 청크(와 그 중복)는 이미 준비된 것으로 집계
+        ready = len(texts) - sum(1 for key in keys if key in missing)
+        if self.on_progress is not None:
+            self.on_progress(ready, len(texts))
+        if missing:
+            print(f"[임베딩 캐시] {len(texts)}개 중 {len(missing)}개 청크 임베딩 요청")
+            if self.pipeline is not None:
+                on_batch = None
+                if self.on_progress is not None:
+                    def on_batch(done, total):
+                        # 중복 청크가 있을 수 있으므로 완료된 고유 청크 비율로 환산
+                        self.on_progress(ready + round(done * (len(texts) - ready) / total), len(texts))
+                # 배치별로 캐시에 기록되므로 중간에 실패해도 완료된 배치는 다시 요청하지 않음
+                vectors = self.pipeline.embed(list(missing.values()), keys=list(missing.keys()), on_batch=on_batch)
+            else:
+                # 캐시에서 읽은 값과 동일하도록 float32로 맞춤
+                vectors = np.asarray(self.embeddings.embed_documents(list(missing.values())), dtype=np.float32)
+                self.cache.put_many(list(missing.keys()), vectors)
+                if self.on_progress is not None:
+                    self.on_progress(len(texts), len(texts))
+            vectors = vectors.tolist()
+            cached.update(zip(missing.keys(), vectors))
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self.embeddings.embed_query(text)
+        vector = self.query_cache.get(text)
+        if vector is None:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            self.query_cache.put(text, vector)
+            vector = vector.tolist()
+        return vector
+
+
+_caches = {}
+_query_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model=EMBEDDING_MODEL, dimensions=None):
+    """(모델, 차원)별로 공유되는 EmbeddingCache를 반환합니다."""
+    with _caches_lock:
+        key = (model, dimensions)
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(model, dimensions)
+        return _caches[key]
+
+
+def get_query_cache(model=EMBEDDING_MODEL, dimensions=None, persist=True):
+    """(모델, 차원)별로 공유되는 QueryEmbeddingCache를 반환합니다."""
+    with _caches_lock:
+        key = (model, dimensions)
+        if key not in _query_caches:
+            persist_path = os.path.join(EMBEDDING_CACHE_DIR, QUERY_CACHE_FILE) if persist else None
+            _query_caches[key] = QueryEmbeddingCache(f"{model}:{dimensions or 'default'}", persist_path=persist_path)
+        return _query_caches[key]
+
+
+def get_embeddings(model=EMBEDDING_MODEL, dimensions=None):
+    """모든 수집/검색 경로에서 사용하는 캐시 적용 임베딩 객체를 반환합니다."""
+    if EMBEDDING_BACKEND == 'fake':
+        # 실제 모델의 캐시와 섞이지 않도록 별도 네임스페이스 사용
+        base = FakeEmbeddings(size=dimensions or 1536)
+        model = f'fake-{model}'
+    else:
+        base = OpenAIEmbeddings(model=model, dimensions=dimensions)
+    cache = get_embedding_cache(model, dimensions)
+    pipeline = EmbeddingPipeline(base, cache)
+    return CachedEmbeddings(base, cache, get_query_cache(model, dimensions), pipeline=pipeline)
+
+
+def embedding_cache_stats():
+    """청크/질문 임베딩 캐시 통계"""
+    return {
+        'documents': [cache.stats() for cache in _caches.values()],
+        'queries': [cache.stats() for cache in _query_caches.values()],
+    }
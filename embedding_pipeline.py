@@ -0,0 +1,255 @@
+"""
+배치 임베딩 파이프라인
+
+청크를 토큰 수 기준으로 배치로 나누고, 동시 요청 수를 제한해 비동기로 임베딩합니다.
+429/5xx 같은 일시적 오류는 지수 백오프로 재시도하고, 완료된 배치는 즉시
+임베딩 캐시에 기록(체크포인트)하므로 빌드가 중간에 실패해도 다시 실행하면 남은 배치만 요청합니다.
+"""
+import os
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# 환경 변수로 조정 가능한 기본값
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '256'))
+EMBED_MAX_CONCURRENCY = int(os.getenv('EMBED_MAX_CONCURRENCY', '4'))
+# OpenAI 임베딩 요청당 토큰 한도(300k)보다 여유 있게 설정
+EMBED_MAX_BATCH_TOKENS = int(os.getenv('EMBED_MAX_BATCH_TOKENS', '100000'))
+EMBED_MAX_RETRIES = int(os.getenv('EMBED_MAX_RETRIES', '6'))
+EMBED_BACKOFF_BASE = float(os.getenv('EMBED_BACKOFF_BASE', '1.0'))
+EMBED_BACKOFF_MAX = float(os.getenv('EMBED_BACKOFF_MAX', '60.0'))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {'RateLimitError', 'APIConnectionError', 'APITimeoutError', 'InternalServerError'}
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """청크의 토큰 수 (tiktoken 인코딩을 쓸 수 없으면 글자 수로 보수적으로 추정)"""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding('cl100k_base')
+                except Exception as e:
+                    print(f"[임베딩] tiktoken 인코딩을 불러올 수 없어 글자 수로 토큰을 추정합니다: {e}")
+                    _encoding = False
+    if _encoding is False:
+        return len(text)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def make_batches(texts, batch_size=EMBED_BATCH_SIZE, max_batch_tokens=EMBED_MAX_BATCH_TOKENS):
+    """텍스트 인덱스를 배치 크기와 배치당 토큰 한도를 모두 지키는 배치로 나눕니다."""
+    batches = []
+    current, current_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_retryable(error):
+    """재시도할 가치가 있는 일시적 오류인지 판별합니다."""
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, (TimeoutError, ConnectionError))
+
+
+def retry_delay(error, attempt, base=EMBED_BACKOFF_BASE, cap=EMBED_BACKOFF_MAX):
+    """Retry-After 헤더가 있으면 따르고, 없으면 지터를 더한 지수 백오프"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        retry_after = float(headers.get('retry-after'))
+        return min(cap, max(retry_after, 0.0))
+    except (TypeError, ValueError):
+        pass
+    return min(cap, base * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+
+class EmbeddingPipeline:
+    """
+    배치 단위 비동기 임베딩 실행기
+
+    Args:
+        embeddings: 실제 임베딩 모델 (aembed_documents 지원)
+        cache: 완료된 배치를 기록할 EmbeddingCache (None이면 체크포인트 없음)
+        batch_size: 배치당 최대 청크 수
+        max_concurrency: 동시에 진행할 최대 요청 수
+        max_batch_tokens: 배치당 최대 토큰 수
+        max_retries: 배치당 최대 재시도 횟수
+    """
+
+    def __init__(self, embeddings, cache=None, batch_size=EMBED_BATCH_SIZE, max_concurrency=EMBED_MAX_CONCURRENCY,
+                 max_batch_tokens=EMBED_MAX_BATCH_TOKENS, max_retries=EMBED_MAX_RETRIES):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+
+    def embed(self, texts, keys=None, on_batch=None):
+        """
+        텍스트 목록을 임베딩해 float32 행렬로 반환합니다.
+        keys가 주어지면 완료된 배치를 cache.put_many(keys, vectors)로 즉시 기록합니다.
+        on_batch가 주어지면 배치가 끝날 때마다 (완료된 청크 수, 전체 청크 수)로 호출합니다.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        coroutine = self._embed_all(texts, keys, on_batch)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # 이미 이벤트 루프가 돌고 있는 스레드에서 호출된 경우 별도 스레드에서 실행
+        result = {}
+
+        def runner():
+            try:
+                result['value'] = asyncio.run(coroutine)
+            except BaseException as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=runner)
+        thread.start()
+        thread.join()
+        if 'error' in result:
+            raise result['error']
+        return result['value']
+
+    async def _embed_all(self, texts, keys, on_batch=None):
+        batches = make_batches(texts, self.batch_size, self.max_batch_tokens)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.time()
+        print(f"[임베딩] 청크 {len(texts)}개를 배치 {len(batches)}개로 요청 (동시 요청 최대 {self.max_concurrency}개)")
+        done = [0]
+
+        def batch_done(count):
+            done[0] += count
+            if on_batch is not None:
+                on_batch(done[0], len(texts))
+
+        tasks = [asyncio.ensure_future(self._embed_batch(batch, texts, keys, semaphore, batch_done))
+                 for batch in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # 한 배치가 최종 실패하면 남은 배치는 취소 (완료된 배치는 이미 캐시에 기록됨)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        vectors = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        for batch, batch_vectors in zip(batches, results):
+            vectors[batch] = batch_vectors
+        print(f"[임베딩] 완료: 배치 {len(batches)}개, 재시도 {self.retries}회, 소요 시간: {time.time() - started:.2f}초")
+        return vectors
+
+    async def _embed_batch(self, batch, texts, keys, semaphore, batch_done):
+        batch_texts = [texts[i] for i in batch]
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    vectors = await self.embeddings.aembed_documents(batch_texts)
+                    break
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        self.failures += 1
+                        print(f"[임베딩] 배치 실패 (청크 {len(batch)}개, 시도 {attempt + 1}회): {e}")
+                        raise
+                    error, delay = e, retry_delay(e, attempt)
+            # 대기하는 동안 다른 배치가 요청할 수 있도록 세마포어 밖에서 대기
+            attempt += 1
+            self.retries += 1
+            print(f"[임베딩] 일시적 오류로 {delay:.1f}초 후 재시도 ({attempt}/{self.max_retries}): {error}")
+            await asyncio.sleep(delay)
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.cache is not None and keys is not None:
+            self.cache.put_many([keys[i] for i in batch], vectors)
+        self.batches += 1
+        batch_done(len(batch))
+        return vectors
+
+    def stats(self):
+        return {
+            'batch_size': self.batch_size,
+            'max_concurrency': self.max_concurrency,
+            'max_batch_tokens': self.max_batch_tokens,
+            'batches': self.batches,
+            'retries': self.retries,
+            'failures': self.failures,
+        }
+
+
+class FakeEmbeddingError(Exception):
+    """FakeEmbeddings가 흉내 내는 일시적 API 오류"""
+
+    def __init__(self, message, status_code=429):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    API 호출 없이 텍스트 해시로 결정적인 벡터를 만드는 임베딩 (EMBEDDING_BACKEND=fake)
+
+    fail_every가 주어지면 n번째 요청마다 429 오류를 발생시켜 재시도 경로를 확인할 수 있습니다.
+    """
+
+    def __init__(self, size=1536, fail_every=0, latency=0.0):
+        self.size = size
+        self.fail_every = fail_every
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.size).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _check_failure(self):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.fail_every and calls % self.fail_every == 0:
+            raise FakeEmbeddingError(f'fake rate limit (요청 {calls})')
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._check_failure()
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._check_failure()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
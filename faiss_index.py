@@ -0,0 +1,498 @@
+"""
+FAISS 인덱스 종류 선택 (Flat, HNSW, IVF-Flat, IVF-PQ)
+
+DB 생성 시 선택한 인덱스 종류와 빌드/검색 파라미터로 인덱스를 만들고,
+로드 시에는 db_metadata.json에 저장된 검색 파라미터(efSearch, nprobe)를 적용합니다.
+학습이 필요한 IVF 계열은 청크 수가 충분할 때만 사용하고, 부족하면 한 단계 단순한 인덱스로 대체합니다.
+
+새 인덱스는 라벨(ID)을 직접 지정하는 형태로 만들어 청크를 지울 때 벡터도 실제로 제거합니다
+(Flat/HNSW는 IndexIDMap2로 감싸고, IVF 계열은 자체 ID와 해시 direct map 사용).
+HNSW처럼 벡터 제거를 지원하지 않는 인덱스는 라벨 매핑에서만 빠진 벡터(tombstone)가 남으며,
+tombstone 비율이 임계값을 넘으면 남은 벡터로 인덱스를 다시 만드는 압축(compaction)을 수행합니다.
+"""
+import os
+import uuid
+import pickle
+
+import numpy as np
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.faiss import FAISS
+from langchain_core.documents import Document
+
+from db_snapshots import snapshot_dir
+from metadata_index import INDEXED_FIELDS, build_metadata_index, load_metadata_index
+from columnar_docstore import (PICKLE_DOCSTORE_FILE, LabelMap, load_columnar, remove_columnar,
+                               write_columnar)
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq')
+DEFAULT_INDEX_PARAMS = {
+    'flat': {},
+    'hnsw': {'M': 32, 'efConstruction': 200, 'efSearch': 64},
+    'ivf_flat': {'nlist': 256, 'nprobe': 16},
+    'ivf_pq': {'nlist': 256, 'nprobe': 16, 'm': 16, 'nbits': 8},
+}
+# 클러스터당 최소 학습 벡터 수 (faiss 권장값)
+MIN_POINTS_PER_CENTROID = 39
+# 학습에 사용하는 클러스터당 벡터 수 (학습 표본 상한, 표본이 모이면 이후 묶음은 바로 인덱스에 추가)
+TRAINING_POINTS_PER_CENTROID = 40
+# 삭제된 벡터(tombstone) 비율이 이 값을 넘으면 저장 시 인덱스를 압축
+COMPACTION_THRESHOLD = float(os.getenv('COMPACTION_THRESHOLD', '0.2'))
+INDEX_FILE = 'index.faiss'
+DOCSTORE_FILE = PICKLE_DOCSTORE_FILE
+# docstore 저장 형식: 'columnar'(열 단위, 메모리 매핑) 또는 'pickle'(index.pkl)
+DOCSTORE_FORMAT = os.getenv('DOCSTORE_FORMAT', 'columnar')
+
+
+def normalize_index_config(index_type=None, index_params=None):
+    """요청된 인덱스 종류/파라미터를 검증하고 기본값을 채웁니다."""
+    index_type = (index_type or 'flat').lower().replace('-', '_')
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원되지 않는 인덱스 종류입니다: {index_type} (지원: {', '.join(INDEX_TYPES)})")
+    params = dict(DEFAULT_INDEX_PARAMS[index_type])
+    for key, value in (index_params or {}).items():
+        if key in params:
+            params[key] = int(value)
+    return index_type, params
+
+
+def build_faiss_index(vectors, index_type='flat', index_params=None):
+    """
+    벡터 행렬로 인덱스를 생성하고 학습합니다 (벡터 추가는 하지 않음).
+
+    Returns:
+        (index, 실제 사용된 인덱스 종류, 실제 파라미터)
+    """
+    index_type, params = normalize_index_config(index_type, index_params)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        # 학습 데이터가 부족하면 nlist를 줄이고, 그래도 부족하면 Flat으로 대체
+        nlist = min(params['nlist'], n // MIN_POINTS_PER_CENTROID)
+        if nlist < 1:
+            print(f"[인덱스] 청크 {n}개로는 {index_type} 학습이 불가능해 flat 인덱스를 사용합니다.")
+            return build_faiss_index(vectors, 'flat')
+        params['nlist'] = nlist
+        params['nprobe'] = min(params['nprobe'], nlist)
+        if index_type == 'ivf_pq' and (dim % params['m'] != 0 or n < MIN_POINTS_PER_CENTROID * (1 << params['nbits'])):
+            print(f"[인덱스] 청크 {n}개/차원 {dim}으로는 PQ 학습이 불가능해 ivf_flat 인덱스를 사용합니다.")
+            return build_faiss_index(vectors, 'ivf_flat', {'nlist': nlist, 'nprobe': params['nprobe']})
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, params['M'])
+        index.hnsw.efConstruction = params['efConstruction']
+    elif index_type == 'ivf_flat':
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, params['nlist'])
+    else:
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, params['nlist'], params['m'], params['nbits'])
+
+    if not index.is_trained:
+        print(f"[인덱스] {index_type} 학습 중 (벡터 {n}개, nlist={params['nlist']})")
+        index.train(vectors)
+    apply_search_params(index, params)
+    return with_ids(index), index_type, params
+
+
+def with_ids(index):
+    """라벨을 직접 지정(add_with_ids)하고 제거(remove_ids)할 수 있는 인덱스로 만듭니다."""
+    if isinstance(index, faiss.IndexIVF):
+        # IVF는 자체적으로 ID를 저장하므로 감싸지 않고, 재구성(reconstruct)용 해시 direct map만 켬
+        if index.direct_map.type != faiss.DirectMap.Hashtable:
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    if isinstance(index, faiss.IndexIDMap):
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def is_id_mapped(index):
+    """라벨이 추가 순서(위치)가 아니라 지정한 ID인 인덱스인지 확인합니다."""
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIVF))
+
+
+def _base_index(index):
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def supports_remove(index):
+    """라벨을 바꾸지 않고 벡터를 실제로 제거할 수 있는지 확인합니다 (HNSW는 제거 불가)."""
+    return is_id_mapped(index) and not isinstance(_base_index(index), faiss.IndexHNSW)
+
+
+def tombstone_count(vectorstore):
+    """인덱스에는 남아 있지만 라벨 매핑에서 삭제된 벡터 수"""
+    return max(0, vectorstore.index.ntotal - len(vectorstore.index_to_docstore_id))
+
+
+def apply_search_params(index, index_params):
+    """로드한 인덱스에 검색 파라미터(efSearch, nprobe)를 적용합니다."""
+    if not index_params:
+        return index
+    hnsw = getattr(_base_index(index), 'hnsw', None)
+    if hnsw is not None and 'efSearch' in index_params:
+        hnsw.efSearch = int(index_params['efSearch'])
+    if 'nprobe' in index_params:
+        try:
+            faiss.extract_index_ivf(index).nprobe = int(index_params['nprobe'])
+        except RuntimeError:
+            pass
+    return index
+
+
+def create_vectorstore(documents, embeddings, index_type='flat', index_params=None):
+    """
+    선택한 인덱스 종류로 FAISS 벡터스토어를 생성합니다.
+
+    Returns:
+        (vectorstore, {'index_type': ..., 'index_params': ...})
+    """
+    return stream_vectorstore([documents], embeddings, index_type, index_params)
+
+
+def _training_size(index_type, params):
+    """IVF 계열 학습 표본의 최대 벡터 수 (이만큼 모이면 인덱스를 만들고 이후 묶음은 바로 추가)"""
+    if index_type not in ('ivf_flat', 'ivf_pq'):
+        return 0
+    size = params['nlist'] * TRAINING_POINTS_PER_CENTROID
+    if index_type == 'ivf_pq':
+        # PQ 코드북(부분 공간마다 2^nbits개 중심)도 같은 표본으로 학습
+        size = max(size, TRAINING_POINTS_PER_CENTROID * (1 << params['nbits']))
+    return size
+
+
+def _training_sample(vectors, size, seed=0):
+    """학습용으로 최대 size개의 벡터를 무작위로 고릅니다 (size가 0이거나 벡터가 적으면 전체)."""
+    if not size or len(vectors) <= size:
+        return vectors
+    rows = np.sort(np.random.default_rng(seed).choice(len(vectors), size, replace=False))
+    return vectors[rows]
+
+
+def _start_vectorstore(pending, embeddings, index_type, params, training_size):
+    # 학습은 표본으로만 하고, 모아 둔 묶음은 학습 후 바로 추가한 뒤 버림
+    vectors = np.concatenate([window_vectors for _, window_vectors, _, _ in pending])
+    index, index_type, params = build_faiss_index(_training_sample(vectors, training_size), index_type, params)
+    del vectors
+    vectorstore = MappedFAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    while pending:
+        texts, window_vectors, metadatas, ids = pending.pop(0)
+        vectorstore.add_embeddings(list(zip(texts, window_vectors)), metadatas=metadatas, ids=ids)
+    return vectorstore, {'index_type': index_type, 'index_params': params}
+
+
+def stream_vectorstore(windows, embeddings, index_type='flat', index_params=None, on_window=None):
+    """
+    청크 묶음(window) 스트림을 묶음 단위로 임베딩해 FAISS 벡터스토어에 추가합니다.
+
+    Flat/HNSW는 첫 묶음부터 바로 인덱스에 추가합니다. IVF 계열은 학습 표본 상한(nlist당
+    TRAINING_POINTS_PER_CENTROID개)만큼 모일 때까지(또는 스트림이 끝날 때까지)만 float32 벡터를 모아
+    표본으로 학습하고, 이후 묶음은 도착하는 대로 추가하므로 메모리에 남는 벡터는 표본 크기 정도입니다.
+    on_window가 주어지면 묶음 임베딩이 끝날 때마다 묶음의 청크 수로 호출합니다.
+
+    Returns:
+        (vectorstore, {'index_type': ..., 'index_params': ...}), 청크가 없으면 (None, None)
+    """
+    index_type, params = normalize_index_config(index_type, index_params)
+    training_size = _training_size(index_type, params)
+    vectorstore = index_config = None
+    pending = []
+    pending_count = 0
+
+    for documents in windows:
+        if not documents:
+            continue
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+        # 청크에 ID가 지정되어 있으면 docstore ID로 사용 (없으면 FAISS가 생성)
+        ids = [doc.id for doc in documents] if all(doc.id for doc in documents) else None
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+        if vectorstore is not None:
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        else:
+            pending.append((texts, vectors, metadatas, ids))
+            pending_count += len(texts)
+            if pending_count >= training_size:
+                vectorstore, index_config = _start_vectorstore(pending, embeddings, index_type, params,
+                                                               training_size)
+        if on_window is not None:
+            on_window(len(texts))
+
+    if vectorstore is None and pending:
+        vectorstore, index_config = _start_vectorstore(pending, embeddings, index_type, params, training_size)
+    return vectorstore, index_config
+
+
+class MappedFAISS(FAISS):
+    """
+    라벨을 직접 관리하는 FAISS 벡터스토어
+
+    LangChain FAISS는 새 라벨을 len(index_to_docstore_id)부터 매기고 delete 시 라벨을 다시 번호 매기므로
+    삭제 후 추가하면 라벨이 어긋납니다. 여기서는 라벨을 단조 증가시키고, 삭제 시 라벨은 그대로 둡니다.
+    청크 추가/삭제/메타데이터 변경 시 메타데이터 보조 색인(metadata_index)도 함께 갱신합니다.
+    """
+
+    def __init__(self, *args, metadata_index=None, metadata_index_loader=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.next_label = self._initial_next_label()
+        self._metadata_index = metadata_index
+        # 검색만 하는 핸들은 색인을 읽지 않도록 처음 사용할 때 로드
+        self._metadata_index_loader = metadata_index_loader
+
+    @property
+    def metadata_index(self):
+        """출처/문서명/파일명별 청크 ID와 청크 ID → 라벨 색인 (저장된 색인이 없으면 처음 사용할 때 생성)"""
+        if self._metadata_index is None and self._metadata_index_loader is not None:
+            self._metadata_index = self._metadata_index_loader()
+            self._metadata_index_loader = None
+        if self._metadata_index is None:
+            self._metadata_index = build_metadata_index(self.docstore, self.index_to_docstore_id)
+        return self._metadata_index
+
+    def _initial_next_label(self):
+        mapping = self.index_to_docstore_id
+        max_label = mapping.max_label() if isinstance(mapping, LabelMap) else max(mapping, default=-1)
+        labels = [max_label + 1]
+        if isinstance(self.index, faiss.IndexIDMap) and self.index.ntotal:
+            labels.append(int(faiss.vector_to_array(self.index.id_map).max()) + 1)
+        if not is_id_mapped(self.index):
+            # 위치가 곧 라벨인 이전 버전 인덱스는 다음 위치부터
+            labels.append(self.index.ntotal)
+        return max(labels)
+
+    def _FAISS__add(self, texts, embeddings, metadatas=None, ids=None):
+        # FAISS.add_embeddings/add_texts가 호출하는 내부 추가 함수 재정의
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Duplicate ids found in the ids list.")
+        vectors = np.array(list(embeddings), dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vectors)
+
+        if is_id_mapped(self.index):
+            labels = np.arange(self.next_label, self.next_label + len(texts), dtype=np.int64)
+            self.index.add_with_ids(vectors, labels)
+        else:
+            labels = np.arange(self.index.ntotal, self.index.ntotal + len(texts), dtype=np.int64)
+            self.index.add(vectors)
+        self.next_label = int(labels[-1]) + 1 if len(labels) else self.next_label
+
+        self.docstore.add({
+            id_: Document(id=id_, page_content=text, metadata=metadata)
+            for id_, text, metadata in zip(ids, texts, metadatas)
+        })
+        self.index_to_docstore_id.update({int(label): id_ for label, id_ in zip(labels, ids)})
+        if self._metadata_index is not None:
+            for label, id_, metadata in zip(labels, ids, metadatas):
+                self._metadata_index.add(id_, label, metadata)
+        return ids
+
+    def remove_documents(self, doc_ids):
+        """
+        청크를 docstore와 라벨 매핑에서 지우고, 가능하면 인덱스에서도 벡터를 제거합니다.
+
+        Returns:
+            제거된 라벨 목록 (벡터를 제거할 수 없는 인덱스에서는 tombstone으로 남음)
+        """
+        # 청크 ID → 라벨은 보조 색인에서 찾음 (삭제할 청크 수에 비례)
+        labels = []
+        for doc_id in set(doc_ids):
+            label = self.metadata_index.remove(doc_id)
+            if label is not None and self.index_to_docstore_id.get(label) == doc_id:
+                del self.index_to_docstore_id[label]
+                labels.append(label)
+            self.docstore._dict.pop(doc_id, None)
+        if labels and supports_remove(self.index):
+            self.index.remove_ids(np.asarray(labels, dtype=np.int64))
+        return labels
+
+    def update_metadata(self, doc_ids, **values):
+        """
+        청크 메타데이터 값을 바꿉니다. 문서 객체는 다른 핸들과 공유될 수 있으므로 수정본으로 교체합니다.
+
+        Returns:
+            변경된 청크 수
+        """
+        updated = 0
+        for doc_id in doc_ids:
+            doc = self.docstore._dict.get(doc_id)
+            if doc is None:
+                continue
+            self.docstore._dict[doc_id] = Document(id=doc.id, page_content=doc.page_content,
+                                                   metadata={**doc.metadata, **values})
+            updated += 1
+        for field, value in values.items():
+            if field in INDEXED_FIELDS:
+                self.metadata_index.set_value(doc_ids, field, value)
+        return updated
+
+    def delete(self, ids=None, **kwargs):
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        missing_ids = set(ids).difference(self.index_to_docstore_id.values())
+        if missing_ids:
+            raise ValueError(f"Some specified ids do not exist in the current store. Ids not found: {missing_ids}")
+        self.remove_documents(ids)
+        return True
+
+
+def _live_vectors(vectorstore, labels, purpose='압축'):
+    """
+    압축(또는 다른 벡터스토어로 옮길 때)에 쓸 청크의 벡터
+    임베딩 캐시에 원본 벡터가 있으면 사용하고(재임베딩 없음), 없으면 인덱스에서 재구성합니다.
+    """
+    index = vectorstore.index
+    vectors = np.empty((len(labels), index.d), dtype=np.float32)
+    cache = getattr(vectorstore.embedding_function, 'cache', None)
+    cached = {}
+    if cache is not None:
+        from embedding_cache import text_hash
+
+        keys = {}
+        for label in labels:
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[label])
+            keys[label] = text_hash(doc.page_content) if isinstance(doc, Document) else None
+        found = cache.get_many([key for key in keys.values() if key])
+        cached = {label: found[key] for label, key in keys.items() if key in found}
+
+    missing = [i for i, label in enumerate(labels) if label not in cached]
+    if missing:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    for i, label in enumerate(labels):
+        vectors[i] = cached[label] if label in cached else index.reconstruct(int(label))
+    if cached and vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+    print(f"[{purpose}] 벡터 {len(labels)}개 (임베딩 캐시 {len(cached)}개, 인덱스 재구성 {len(missing)}개)")
+    return vectors
+
+
+def copy_documents(source, target, doc_ids):
+    """
+    source 벡터스토어의 청크를 같은 청크 ID와 벡터로 target에 추가합니다 (재임베딩 없음).
+    source에 없는 청크 ID는 건너뜁니다.
+
+    Returns:
+        추가된 청크 ID 목록
+    """
+    doc_ids = [doc_id for doc_id in doc_ids if source.metadata_index.label(doc_id) is not None]
+    if not doc_ids:
+        return []
+    vectors = _live_vectors(source, [source.metadata_index.label(doc_id) for doc_id in doc_ids], purpose='청크 복사')
+    documents = [source.docstore.search(doc_id) for doc_id in doc_ids]
+    return target.add_embeddings([(doc.page_content, vector) for doc, vector in zip(documents, vectors)],
+                                 metadatas=[dict(doc.metadata) for doc in documents], ids=doc_ids)
+
+
+def compact_vectorstore(vectorstore, index_type='flat', index_params=None):
+    """
+    남은 청크의 벡터만으로 인덱스를 다시 만들고 라벨을 0부터 다시 매깁니다 (재임베딩 없음).
+    이전 버전(라벨 = 위치) 인덱스도 이 과정에서 ID 지정 인덱스로 바뀝니다.
+
+    Returns:
+        (새 벡터스토어, {'index_type': ..., 'index_params': ...})
+    """
+    labels = sorted(vectorstore.index_to_docstore_id)
+    if not labels:
+        raise ValueError('압축할 청크가 없습니다.')
+    vectors = _live_vectors(vectorstore, labels)
+    index_type, params = normalize_index_config(index_type, index_params)
+    index, index_type, params = build_faiss_index(_training_sample(vectors, _training_size(index_type, params)),
+                                                  index_type, params)
+    index.add_with_ids(vectors, np.arange(len(labels), dtype=np.int64))
+    docstore = InMemoryDocstore({
+        vectorstore.index_to_docstore_id[label]: vectorstore.docstore.search(vectorstore.index_to_docstore_id[label])
+        for label in labels
+    })
+    compacted = MappedFAISS(
+        embedding_function=vectorstore.embedding_function,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id={i: vectorstore.index_to_docstore_id[label] for i, label in enumerate(labels)},
+        normalize_L2=vectorstore._normalize_L2,
+        distance_strategy=vectorstore.distance_strategy,
+    )
+    return compacted, {'index_type': index_type, 'index_params': params}
+
+
+def needs_compaction(vectorstore, threshold=COMPACTION_THRESHOLD):
+    """tombstone 비율이 임계값을 넘었거나, 삭제를 반영할 수 없는 이전 버전 인덱스인지 확인합니다."""
+    tombstones = tombstone_count(vectorstore)
+    if not tombstones or not vectorstore.index_to_docstore_id:
+        return False
+    return tombstones / vectorstore.index.ntotal > threshold or not is_id_mapped(vectorstore.index)
+
+
+def read_index(path, mmap=True):
+    """인덱스 파일을 읽습니다. mmap=True면 메모리 매핑(읽기 전용)을 우선 시도합니다."""
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            print(f"[인덱스] 메모리 매핑 로드 불가, 일반 로드로 대체합니다 ({path}): {e}")
+    return faiss.read_index(path)
+
+
+def load_vectorstore(folder, embeddings, mmap=True):
+    """
+    FAISS.load_local과 같은 형식의 DB 폴더(또는 DB의 현재 스냅샷)를 로드합니다.
+    검색 전용 핸들은 mmap=True로 열어 인덱스를 페이지 캐시에서 공유합니다.
+    """
+    folder = snapshot_dir(folder, verify=True)
+    index = read_index(os.path.join(folder, INDEX_FILE), mmap=mmap)
+    # 열 단위 docstore가 있으면 메모리 매핑으로 열고 Document는 필요할 때 생성
+    columnar = load_columnar(folder)
+    if columnar is not None:
+        docstore, index_to_docstore_id = columnar
+    else:
+        with open(os.path.join(folder, DOCSTORE_FILE), 'rb') as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    return MappedFAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+        metadata_index_loader=lambda: load_metadata_index(folder),
+    )
+
+
+def save_vectorstore(vectorstore, folder):
+    """
+    인덱스를 저장하고, docstore는 DOCSTORE_FORMAT에 따라 열 단위 파일 또는
+    FAISS.save_local과 같은 index.pkl로 저장합니다 (다른 형식의 파일은 삭제).
+    다른 핸들이 메모리 매핑 중인 파일을 덮어쓰지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    """
+    os.makedirs(folder, exist_ok=True)
+    index_path = os.path.join(folder, INDEX_FILE)
+    faiss.write_index(vectorstore.index, index_path + '.tmp')
+    os.replace(index_path + '.tmp', index_path)
+    docstore_path = os.path.join(folder, DOCSTORE_FILE)
+    if DOCSTORE_FORMAT == 'columnar':
+        write_columnar(folder, vectorstore.docstore, vectorstore.index_to_docstore_id)
+        if os.path.exists(docstore_path):
+            os.remove(docstore_path)
+    else:
+        docstore, index_to_docstore_id = vectorstore.docstore, vectorstore.index_to_docstore_id
+        if not isinstance(index_to_docstore_id, dict):
+            # 열 단위 docstore로 열린 벡터스토어는 일반 사전으로 바꿔 pickle
+            docstore = InMemoryDocstore(dict(docstore._dict.items()))
+            index_to_docstore_id = dict(index_to_docstore_id.items())
+        with open(docstore_path + '.tmp', 'wb') as f:
+            pickle.dump((docstore, index_to_docstore_id), f)
+        os.replace(docstore_path + '.tmp', docstore_path)
+        remove_columnar(folder)
+    if isinstance(vectorstore, MappedFAISS):
+        vectorstore.metadata_index.save(folder)
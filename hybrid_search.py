@@ -0,0 +1,141 @@
+"""
+BM25 + FAISS 하이브리드 검색
+
+두 검색을 동시에 실행하고, 결과를 청크 번호(FAISS 라벨) 단위의 numpy 배열로
+융합합니다. 최종 상위 k개만 Document로 변환합니다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Literal
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+RRF_C = 60
+
+# 검색 요청 간에 공유하는 스레드 풀 (BM25 검색과 쿼리 임베딩+FAISS 검색을 동시에 실행)
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hybrid-search')
+
+
+def weighted_rrf(results, weights, c=RRF_C):
+    """
+    가중 Reciprocal Rank Fusion
+
+    Args:
+        results: [(ids, scores), ...] 각 검색기의 순위순 결과
+        weights: 검색기별 가중치
+    Returns:
+        (ids, fused_scores) 융합 점수 내림차순
+    """
+    ids = [np.asarray(r[0], dtype=np.int64) for r in results]
+    contributions = [
+        weight / (c + np.arange(1, len(r_ids) + 1, dtype=np.float64))
+        for r_ids, weight in zip(ids, weights)
+    ]
+    return _accumulate(ids, contributions)
+
+
+def normalized_score_fusion(results, weights):
+    """검색기별 점수를 min-max 정규화한 뒤 가중합으로 융합합니다."""
+    ids = [np.asarray(r[0], dtype=np.int64) for r in results]
+    contributions = []
+    for (_, scores), weight in zip(results, weights):
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(scores) == 0:
+            contributions.append(scores)
+            continue
+        low, high = scores.min(), scores.max()
+        normalized = (scores - low) / (high - low) if high > low else np.ones_like(scores)
+        contributions.append(weight * normalized)
+    return _accumulate(ids, contributions)
+
+
+def _accumulate(ids, contributions):
+    all_ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+    if len(all_ids) == 0:
+        return all_ids, np.zeros(0, dtype=np.float64)
+    unique_ids, inverse = np.unique(all_ids, return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate(contributions), minlength=len(unique_ids))
+    # 같은 점수면 먼저 나온 검색기/순위를 우선하도록 첫 등장 위치로 정렬
+    first_seen = np.full(len(unique_ids), len(all_ids), dtype=np.int64)
+    np.minimum.at(first_seen, inverse, np.arange(len(all_ids)))
+    order = np.lexsort((first_seen, -fused))
+    return unique_ids[order], fused[order]
+
+
+FUSION_METHODS = {
+    'rrf': weighted_rrf,
+    'score': normalized_score_fusion,
+}
+
+
+def dense_search(vectorstore, query, k):
+    """쿼리를 임베딩해 FAISS 인덱스를 직접 검색하고 (라벨, 유사도 점수)를 반환합니다."""
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    vector = np.asarray([vectorstore._embed_query(query)], dtype=np.float32)
+    if getattr(vectorstore, '_normalize_L2', False):
+        vector /= np.linalg.norm(vector, axis=1, keepdims=True) + 1e-12
+    # 삭제되었지만 인덱스에 남은 벡터(tombstone)가 결과를 차지할 수 있으므로 그만큼 더 검색
+    tombstones = max(0, vectorstore.index.ntotal - len(vectorstore.index_to_docstore_id))
+    distances, labels = vectorstore.index.search(vector, k + tombstones if tombstones else k)
+    distances, labels = distances[0], labels[0].astype(np.int64)
+    valid = labels >= 0
+    if tombstones:
+        mapping = vectorstore.index_to_docstore_id
+        valid &= np.fromiter((int(label) in mapping for label in labels), dtype=bool, count=len(labels))
+    distances, labels = distances[valid][:k], labels[valid][:k]
+    if vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+        return labels, distances
+    # L2 거리는 작을수록 유사하므로 부호를 바꿔 점수로 사용
+    return labels, -distances
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 역색인과 FAISS 인덱스를 병렬로 검색해 점수를 융합하는 retriever
+
+    Attributes:
+        bm25_index: bm25_index.BM25Index
+        vectorstore: FAISS 벡터스토어 (docstore와 라벨 매핑 포함)
+        weights: [BM25 가중치, FAISS 가중치]
+        fusion: 'rrf' (가중 RRF) 또는 'score' (정규화 점수 가중합)
+    """
+    bm25_index: Any
+    vectorstore: Any
+    weights: List[float] = [0.7, 0.3]
+    fusion: Literal['rrf', 'score'] = 'rrf'
+    lexical_k: int = 3
+    dense_k: int = 10
+    k: int = 10
+
+    def search_ids(self, query):
+        """융합된 (라벨, 점수) 배열을 반환합니다."""
+        lexical = _search_executor.submit(self.bm25_index.search, query, self.lexical_k)
+        dense = _search_executor.submit(dense_search, self.vectorstore, query, self.dense_k)
+        results = [lexical.result(), dense.result()]
+        return FUSION_METHODS[self.fusion](results, self.weights)
+
+    def materialize(self, ids):
+        """라벨 목록을 Document 목록으로 변환합니다."""
+        documents = []
+        for faiss_id in ids:
+            doc_id = self.vectorstore.index_to_docstore_id.get(int(faiss_id))
+            if doc_id is None:
+                continue
+            doc = self.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                # docstore의 Document는 요청 간에 공유되므로 사본을 반환
+                # (이전 버전으로 저장된 청크는 id가 비어 있으므로 docstore ID로 채움)
+                documents.append(Document(page_content=doc.page_content, metadata=dict(doc.metadata),
+                                          id=doc.id or doc_id))
+            if len(documents) >= self.k:
+                break
+        return documents
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        ids, _ = self.search_ids(query)
+        return self.materialize(ids)
@@ -0,0 +1,234 @@
+"""
+문서 수집(ingestion) 유틸리티
+
+파일 파싱을 워커 프로세스로 분산합니다. PDFPlumber/Unstructured 로더는 CPU를 많이 쓰므로
+파일마다 별도 워커 프로세스에서 실행하고, 파일별 시간 제한과 오류 격리를 적용합니다.
+시간 제한은 워커가 그 파일의 파싱을 시작한 시점부터 계산하며, 시간을 넘긴 워커는 종료하고
+다음 파일은 새 워커에서 파싱하므로 멈춘 파일 하나가 뒤의 파일을 막지 않습니다.
+결과는 항상 입력 파일 순서대로 반환됩니다. 파일 내용 해시가 주어지면 파싱 캐시(parse_cache)에 있는 파일은 파싱하지 않습니다.
+
+파싱 결과는 생성기로 흘려보내고 청크는 고정 크기 묶음(window)으로 임베딩/인덱싱하므로,
+제출한 파일 수와 관계없이 한 번에 메모리에 올라오는 페이지/청크/벡터 수가 제한됩니다.
+"""
+import os
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+
+from langchain_core.documents import Document
+
+from parse_cache import parse_cache
+
+# 파일 하나의 최대 파싱 시간(초)과 동시 워커 수
+PARSE_TIMEOUT = int(os.getenv('PARSE_TIMEOUT', '600'))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(os.cpu_count() or 1)))
+# fork는 웹 서버의 스레드/잠금 상태까지 복제하므로 가능한 환경에서는 forkserver 사용
+# (forkserver 프로세스가 로더 모듈을 한 번 import해 두고 워커는 거기서 복제되어 시작 비용이 작음.
+#  실행 스크립트(__main__)는 미리 import하지 않음: app.py를 다시 실행하면 작업 재개 등 시작 동작이 반복됨)
+PARSE_START_METHOD = os.getenv(
+    'PARSE_START_METHOD', 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+# 한 번에 임베딩해 인덱스에 추가하는 최대 청크 수
+INGEST_WINDOW_CHUNKS = int(os.getenv('INGEST_WINDOW_CHUNKS', '512'))
+
+_context = None
+
+
+def _get_context():
+    global _context
+    if _context is None:
+        _context = multiprocessing.get_context(PARSE_START_METHOD)
+        if PARSE_START_METHOD == 'forkserver':
+            _context.set_forkserver_preload(['document_manager'])
+    return _context
+
+
+def _parse_file(file_path, pdf_loader_type):
+    """워커 프로세스에서 실행되는 파싱 함수 (피클 가능한 튜플 목록 반환)"""
+    from document_manager import get_loader_for_file
+
+    documents = get_loader_for_file(file_path, pdf_loader_type).load()
+    return [(doc.page_content, doc.metadata) for doc in documents]
+
+
+def _parse_worker(conn, file_path, pdf_loader_type):
+    """워커 프로세스 진입점: 파싱 결과 또는 오류 메시지를 파이프로 보냅니다."""
+    try:
+        conn.send((True, _parse_file(file_path, pdf_loader_type)))
+    except Exception as e:
+        conn.send((False, str(e)))
+    finally:
+        conn.close()
+
+
+class ParseResult:
+    """파일 하나의 파싱 결과"""
+
+    def __init__(self, file_path, documents=None, error=None, elapsed=0.0, cached=False):
+        self.file_path = file_path
+        self.documents = documents or []
+        self.error = error
+        self.elapsed = elapsed
+        self.cached = cached
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class _ParseTask:
+    """파일 하나를 파싱하는 워커 프로세스 (시작 시각 기준 마감 시각을 가짐)"""
+
+    def __init__(self, index, file_path, key, pdf_loader_type, timeout):
+        ctx = _get_context()
+        self.index = index
+        self.file_path = file_path
+        self.key = key
+        self.conn, child_conn = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(target=_parse_worker, args=(child_conn, file_path, pdf_loader_type), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.started = time.time()
+        self.deadline = self.started + timeout
+
+    def receive(self):
+        """끝난 워커의 결과를 ParseResult로 받습니다."""
+        name = os.path.basename(self.file_path)
+        try:
+            ok, payload = self.conn.recv()
+        except EOFError:
+            # 결과를 보내지 못하고 종료됨 (메모리 부족으로 강제 종료 등)
+            self.process.join()
+            ok, payload = False, f'워커 프로세스가 비정상 종료되었습니다 (종료 코드 {self.process.exitcode})'
+        self.close()
+        elapsed = time.time() - self.started
+        if not ok:
+            print(f"파일 '{name}' 파싱 오류: {payload}")
+            return ParseResult(self.file_path, error=payload, elapsed=elapsed)
+        if self.key:
+            parse_cache.put(self.key, self.file_path, payload)
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in payload]
+        print(f"파일 '{name}' 파싱 완료: {len(documents)}개 문서")
+        return ParseResult(self.file_path, documents, elapsed=elapsed)
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.close()
+
+    def close(self):
+        self.process.join()
+        self.conn.close()
+
+
+def _cache_key(file_path, file_hash, pdf_loader_type):
+    from document_manager import loader_cache_key
+
+    loader, options = loader_cache_key(file_path, pdf_loader_type)
+    return parse_cache.key(file_hash, loader, options)
+
+
+def iter_parse_files(file_paths, pdf_loader_type='pdfplumber', timeout=PARSE_TIMEOUT, max_workers=PARSE_WORKERS,
+                     on_result=None, max_in_flight=None, file_hashes=None):
+    """
+    여러 파일을 워커 프로세스에서 병렬로 파싱하며 입력 순서대로 ParseResult를 하나씩 내보냅니다.
+
+    동시에 실행하는 워커는 max_workers개, 아직 내보내지 않은 결과를 포함해 진행 중인 파일 수는
+    max_in_flight(기본: 워커 수의 2배)로 제한하므로 메모리에 올라오는 파싱 결과는 일정 수준을 넘지 않습니다.
+    한 파일의 오류나 시간 초과(파싱 시작 후 timeout초)는 해당 파일의 ParseResult.error로만 기록되고,
+    시간을 넘긴 워커는 종료되어 다른 파일의 처리에 영향을 주지 않습니다.
+    on_result가 주어지면 파일 하나의 결과가 나올 때마다 ParseResult와 함께 호출합니다.
+    file_hashes(파일별 내용 sha256, 입력 순서)가 주어지면 파싱 캐시를 먼저 확인하고,
+    캐시에 없는 파일만 파싱한 뒤 결과를 캐시에 저장합니다.
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        return
+    file_hashes = list(file_hashes) if file_hashes is not None else [None] * len(file_paths)
+
+    workers = max(1, min(max_workers, len(file_paths)))
+    max_in_flight = max(workers, max_in_flight or workers * 2)
+    running = {}
+    results = {}
+    submitted = 0
+    next_index = 0
+    started_workers = 0
+    try:
+        started = time.time()
+        while next_index < len(file_paths):
+            # 워커 자리와 진행 중 파일 수 한도 안에서 다음 파일 시작 (캐시에 있으면 바로 결과로 사용)
+            while (submitted < len(file_paths) and len(running) < workers
+                   and submitted - next_index < max_in_flight):
+                path, file_hash = file_paths[submitted], file_hashes[submitted]
+                key = _cache_key(path, file_hash, pdf_loader_type) if file_hash else None
+                cached = parse_cache.get(key, path) if key else None
+                if cached is not None:
+                    documents = [Document(page_content=text, metadata=metadata) for text, metadata in cached]
+                    results[submitted] = ParseResult(path, documents, cached=True)
+                    print(f"파일 '{os.path.basename(path)}' 파싱 캐시 사용: {len(documents)}개 문서")
+                else:
+                    task = _ParseTask(submitted, path, key, pdf_loader_type, timeout)
+                    running[task.conn] = task
+                    started_workers += 1
+                submitted += 1
+
+            if next_index in results:
+                result = results.pop(next_index)
+                next_index += 1
+                if on_result is not None:
+                    on_result(result)
+                yield result
+                continue
+
+            # 결과를 보낸 워커가 있거나 가장 이른 마감 시각이 될 때까지 대기
+            nearest = min(task.deadline for task in running.values())
+            for conn in wait(list(running), timeout=max(0.0, nearest - time.time())):
+                task = running.pop(conn)
+                results[task.index] = task.receive()
+            now = time.time()
+            for conn, task in list(running.items()):
+                if task.deadline <= now:
+                    del running[conn]
+                    task.kill()
+                    results[task.index] = ParseResult(task.file_path, error=f'파싱 시간 초과 ({timeout}초)',
+                                                      elapsed=now - task.started)
+                    print(f"파일 '{os.path.basename(task.file_path)}' 파싱 시간 초과, 워커 종료")
+        print(f"[파싱 완료] {len(file_paths)}개 파일, 워커 {started_workers}개 실행, "
+              f"소요 시간: {time.time() - started:.2f}초")
+    finally:
+        # (콜백 예외, 소비 중단 등으로) 결과를 받지 않은 워커는 아직 실행 중일 수 있으므로 강제 종료
+        for task in running.values():
+            task.kill()
+
+
+def parse_files(file_paths, pdf_loader_type='pdfplumber', timeout=PARSE_TIMEOUT, max_workers=PARSE_WORKERS,
+                on_result=None, file_hashes=None):
+    """
+    여러 파일을 워커 프로세스에서 병렬로 파싱합니다.
+
+    Returns:
+        입력 순서와 같은 ParseResult 리스트
+    """
+    return list(iter_parse_files(file_paths, pdf_loader_type, timeout, max_workers, on_result,
+                                 file_hashes=file_hashes))
+
+
+def iter_chunk_windows(documents_iter, text_splitter, window_size=INGEST_WINDOW_CHUNKS, on_split=None):
+    """
+    파일별 문서 목록 스트림을 분할해 최대 window_size개 청크 묶음으로 내보냅니다.
+    문서 단위로 분할하므로 전체를 한 번에 split_documents 하는 것과 같은 청크가 같은 순서로 나옵니다.
+    on_split이 주어지면 파일 하나의 청크 목록이 만들어질 때마다 호출하며,
+    목록을 반환하면 그 청크들로 교체합니다 (예: 중복 청크 제거).
+    """
+    window = []
+    for documents in documents_iter:
+        chunks = text_splitter.split_documents(documents)
+        if on_split is not None:
+            replaced = on_split(chunks)
+            if replaced is not None:
+                chunks = replaced
+        window.extend(chunks)
+        while len(window) >= window_size:
+            yield window[:window_size]
+            window = window[window_size:]
+    if window:
+        yield window
@@ -0,0 +1,358 @@
+"""
+백그라운드 문서 수집 작업 관리
+
+벡터 DB 생성/문서 추가 요청을 작업(job)으로 등록하고 즉시 작업 ID를 반환합니다.
+작업은 백그라운드 워커에서 실행되며 단계별 진행 상황(파일 파싱, 청크 임베딩, 인덱스 저장)을
+상태 조회와 SSE로 전달합니다. 작업 상태는 SQLite에 저장되어 서버 재시작 후에도 유지되고,
+재시작 시 끝나지 않은 작업은 다시 대기열에 들어갑니다.
+결과를 게시한 뒤의 체크포인트(DB ID, 스냅샷, 결과)는 작업 행에 저장되어, 게시 후 중단된 작업은
+처음부터 다시 실행하지 않고 마무리 단계만 수행합니다.
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+INGESTION_JOB_DB = os.getenv('INGESTION_JOB_DB', 'ingestion_jobs.sqlite3')
+# 같은 DB에 대한 동시 쓰기를 피하기 위해 기본값은 워커 1개 (파싱/임베딩은 각 단계에서 병렬화됨)
+INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', '1'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """작업이 사용자 요청으로 취소됨"""
+
+
+class JobStore:
+    """작업 상태를 저장하는 SQLite 저장소"""
+
+    def __init__(self, path=INGESTION_JOB_DB):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS ingestion_jobs ('
+            'job_id TEXT PRIMARY KEY, kind TEXT, params TEXT, status TEXT, stage TEXT, '
+            'progress TEXT, result TEXT, error TEXT, created_at REAL, updated_at REAL, checkpoint TEXT)'
+        )
+        # 체크포인트 열이 없는 이전 버전 저장소
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(ingestion_jobs)')}
+        if 'checkpoint' not in columns:
+            self._db.execute('ALTER TABLE ingestion_jobs ADD COLUMN checkpoint TEXT')
+        self._db.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        job_id, kind, params, status, stage, progress, result, error, created_at, updated_at, checkpoint = row
+        return {
+            'job_id': job_id,
+            'kind': kind,
+            'params': json.loads(params),
+            'status': status,
+            'stage': stage,
+            'progress': json.loads(progress),
+            'result': json.loads(result) if result else None,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'checkpoint': json.loads(checkpoint) if checkpoint else {},
+        }
+
+    def insert(self, job):
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO ingestion_jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job['job_id'], job['kind'], json.dumps(job['params'], ensure_ascii=False), job['status'],
+                 job['stage'], json.dumps(job['progress'], ensure_ascii=False), None, None,
+                 job['created_at'], job['updated_at'], None),
+            )
+            self._db.commit()
+
+    def update(self, job):
+        with self._lock:
+            self._db.execute(
+                'UPDATE ingestion_jobs SET status = ?, stage = ?, progress = ?, result = ?, error = ?, updated_at = ? '
+                'WHERE job_id = ?',
+                (job['status'], job['stage'], json.dumps(job['progress'], ensure_ascii=False),
+                 json.dumps(job['result'], ensure_ascii=False) if job['result'] is not None else None,
+                 job['error'], job['updated_at'], job['job_id']),
+            )
+            self._db.commit()
+
+    def save_checkpoint(self, job_id, checkpoint):
+        with self._lock:
+            self._db.execute('UPDATE ingestion_jobs SET checkpoint = ? WHERE job_id = ?',
+                             (json.dumps(checkpoint, ensure_ascii=False), job_id))
+            self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute('SELECT * FROM ingestion_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit=50):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def unfinished(self):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT * FROM ingestion_jobs WHERE status IN (?, ?) ORDER BY created_at', (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+
+class JobContext:
+    """실행 중인 작업에 전달되는 진행 상황 보고/취소 확인 핸들"""
+
+    def __init__(self, manager, job_id):
+        self._manager = manager
+        self.job_id = job_id
+
+    def check_cancelled(self):
+        if self._manager.is_cancel_requested(self.job_id):
+            raise JobCancelled()
+
+    def update(self, stage=None, cancellable=True, **progress):
+        """
+        단계와 진행 값(files_parsed, chunks_embedded 등)을 갱신하고 취소 여부를 확인합니다.
+        결과를 디스크에 쓰기 시작한 뒤에는 cancellable=False로 호출해 중간에 중단되지 않게 합니다.
+        """
+        self._manager.update_progress(self.job_id, stage, progress)
+        if cancellable:
+            self.check_cancelled()
+
+    @property
+    def checkpoint(self):
+        """저장된 체크포인트 (재개된 작업이면 이전 실행에서 저장한 값, 없으면 빈 dict)"""
+        return self._manager.get_checkpoint(self.job_id)
+
+    def save_checkpoint(self, **values):
+        """체크포인트 값을 추가/갱신하고 즉시 저장합니다 (결과 게시 직전/직후에 호출)."""
+        self._manager.save_checkpoint(self.job_id, values)
+
+
+class JobManager:
+    """
+    작업 대기열과 백그라운드 워커
+
+    작업 종류별 실행 함수는 register(kind, runner)로 등록합니다.
+    runner(params, context)는 결과 dict를 반환하거나 예외를 발생시킵니다.
+    """
+
+    def __init__(self, store=None, max_workers=INGESTION_WORKERS):
+        self._store = store
+        self._max_workers = max_workers
+        self._executor = None
+        self._runners = {}
+        self._jobs = {}
+        self._cancel_requested = set()
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def store(self):
+        # 저장소 파일은 처음 사용할 때 생성
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def register(self, kind, runner):
+        self._runners[kind] = runner
+
+    def start(self):
+        """워커를 시작하고, 재시작 전에 끝나지 않은 작업을 다시 대기열에 넣습니다."""
+        if multiprocessing.parent_process() is not None:
+            # 파싱 워커 같은 자식 프로세스에서는 실행 중인 작업을 다시 실행하지 않음
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='ingestion-job')
+        for job in self.store.unfinished():
+            print(f"[작업] 재시작 전 완료되지 않은 작업 재개: {job['job_id']} ({job['kind']})")
+            job['progress']['resumed'] = job['progress'].get('resumed', 0) + 1
+            self._enqueue(job)
+
+    def submit(self, kind, params):
+        """작업을 등록하고 작업 정보를 반환합니다."""
+        if kind not in self._runners:
+            raise ValueError(f'알 수 없는 작업 종류입니다: {kind}')
+        now = time.time()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'kind': kind,
+            'params': params,
+            'status': QUEUED,
+            'stage': 'queued',
+            'progress': {},
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'checkpoint': {},
+        }
+        # 재시작 전 작업을 먼저 다시 등록 (새 작업이 재개 대상으로 한 번 더 실행되지 않도록 저장 전에 시작)
+        self.start()
+        self.store.insert(job)
+        self._enqueue(job)
+        return dict(job)
+
+    def _enqueue(self, job):
+        job['status'] = QUEUED
+        job['stage'] = 'queued'
+        with self._lock:
+            self._jobs[job['job_id']] = job
+        self._save(job)
+        self._executor.submit(self._run, job['job_id'])
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id]
+        if job_id in self._cancel_requested:
+            self._finish(job, CANCELLED, error='작업이 취소되었습니다.')
+            return
+        job['status'] = RUNNING
+        job['stage'] = 'started'
+        self._save(job)
+        started = time.time()
+        try:
+            result = self._runners[job['kind']](job['params'], JobContext(self, job_id))
+            job['progress']['elapsed'] = round(time.time() - started, 2)
+            self._finish(job, SUCCEEDED, result=result)
+            print(f"[작업] {job_id} 완료, 소요 시간: {job['progress']['elapsed']}초")
+        except JobCancelled:
+            self._finish(job, CANCELLED, error='작업이 취소되었습니다.')
+            print(f"[작업] {job_id} 취소됨")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self._finish(job, FAILED, error=str(e))
+            print(f"[작업] {job_id} 실패: {str(e)}")
+
+    def _finish(self, job, status, result=None, error=None):
+        job['status'] = status
+        job['stage'] = status
+        job['result'] = result
+        job['error'] = error
+        self._save(job)
+        with self._lock:
+            self._cancel_requested.discard(job['job_id'])
+            self._jobs.pop(job['job_id'], None)
+
+    def _save(self, job):
+        job['updated_at'] = time.time()
+        self.store.update(job)
+        self._publish(job)
+
+    def update_progress(self, job_id, stage, progress):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if stage:
+            job['stage'] = stage
+        job['progress'].update(progress)
+        self._save(job)
+
+    def get_checkpoint(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job['checkpoint'])
+        job = self.store.get(job_id)
+        return dict(job['checkpoint']) if job else {}
+
+    def save_checkpoint(self, job_id, values):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['checkpoint'].update(values)
+            checkpoint = dict(job['checkpoint'])
+        self.store.save_checkpoint(job_id, checkpoint)
+
+    def is_cancel_requested(self, job_id):
+        return job_id in self._cancel_requested
+
+    def cancel(self, job_id):
+        """작업 취소를 요청합니다. 실행 중인 작업은 다음 진행 보고 시점에 중단됩니다."""
+        job = self.get(job_id)
+        if job is None or job['status'] in FINISHED_STATES:
+            return job
+        with self._lock:
+            self._cancel_requested.add(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        return self.store.get(job_id)
+
+    def list(self, limit=50):
+        return self.store.list(limit)
+
+    def subscribe(self, job_id):
+        """작업 상태가 바뀔 때마다 스냅샷을 받는 큐를 반환합니다."""
+        q = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(q)
+        return q
+
+    def unsubscribe(self, job_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if q in subscribers:
+                subscribers.remove(q)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def _publish(self, job):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job['job_id'], []))
+        if subscribers:
+            snapshot = json.loads(json.dumps(job))
+            for q in subscribers:
+                q.put(snapshot)
+
+    def stream(self, job_id, heartbeat=15.0):
+        """SSE 응답 본문 생성기 (작업이 끝나면 종료)"""
+        q = self.subscribe(job_id)
+        try:
+            job = self.get(job_id)
+            if job is None:
+                yield f"data: {json.dumps({'error': '작업을 찾을 수 없습니다.'}, ensure_ascii=False)}\n\n"
+                return
+            yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+            while job['status'] not in FINISHED_STATES:
+                try:
+                    job = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    # 연결 유지를 위한 주석 이벤트
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+        finally:
+            self.unsubscribe(job_id, q)
+
+
+# 문서 관리 라우트가 공유하는 작업 관리자
+job_manager = JobManager()
@@ -0,0 +1,129 @@
+"""
+청크 메타데이터 보조 색인
+
+출처(source), 사용자 지정 문서명(custom_name), 원본 파일명(original_filename)별 청크 ID 목록과
+청크 ID → FAISS 라벨을 DB 스냅샷의 metadata_index.json에 저장합니다.
+문서 단위 삭제/이름 변경/목록 조회가 DB 전체 docstore를 훑지 않고 해당 청크만 다루도록 합니다.
+
+색인은 MappedFAISS가 청크 추가/삭제/메타데이터 변경 시 함께 갱신하고 벡터스토어와 같이 저장합니다.
+파일이 없는 이전 DB는 처음 사용할 때 docstore에서 한 번 만듭니다.
+"""
+import os
+import json
+
+METADATA_INDEX_FILE = 'metadata_index.json'
+METADATA_INDEX_VERSION = 1
+# 색인하는 메타데이터 필드 (청크 레코드의 라벨 다음 순서)
+INDEXED_FIELDS = ('source', 'custom_name', 'original_filename')
+
+
+class MetadataIndex:
+    """
+    청크 ID -> [라벨, source, custom_name, original_filename] 레코드와 필드별 역색인
+
+    역색인은 값 -> {청크 ID: None} (추가 순서를 유지하는 집합)이며 로드 시 레코드에서 만듭니다.
+    """
+
+    def __init__(self, chunks=None):
+        self.chunks = {}
+        self._postings = {field: {} for field in INDEXED_FIELDS}
+        for chunk_id, record in (chunks or {}).items():
+            self._insert(chunk_id, list(record))
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self.chunks
+
+    def _insert(self, chunk_id, record):
+        self.chunks[chunk_id] = record
+        for field, value in zip(INDEXED_FIELDS, record[1:]):
+            if value is not None:
+                self._postings[field].setdefault(value, {})[chunk_id] = None
+
+    def _discard_postings(self, chunk_id, record):
+        for field, value in zip(INDEXED_FIELDS, record[1:]):
+            postings = self._postings[field].get(value)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[field][value]
+
+    def add(self, chunk_id, label, metadata):
+        """청크 추가 (같은 ID가 있으면 교체)"""
+        if chunk_id in self.chunks:
+            self.remove(chunk_id)
+        self._insert(chunk_id, [int(label)] + [metadata.get(field) for field in INDEXED_FIELDS])
+
+    def remove(self, chunk_id):
+        """청크를 색인에서 지우고 라벨을 반환합니다 (없으면 None)."""
+        record = self.chunks.pop(chunk_id, None)
+        if record is None:
+            return None
+        self._discard_postings(chunk_id, record)
+        return record[0]
+
+    def label(self, chunk_id):
+        record = self.chunks.get(chunk_id)
+        return None if record is None else record[0]
+
+    def get(self, chunk_id, field):
+        record = self.chunks.get(chunk_id)
+        return None if record is None else record[1 + INDEXED_FIELDS.index(field)]
+
+    def find(self, field, value):
+        """필드 값이 일치하는 청크 ID 목록"""
+        return list(self._postings[field].get(value, ()))
+
+    def first(self, field, value):
+        """필드 값이 일치하는 첫 청크 ID (없으면 None)"""
+        return next(iter(self._postings[field].get(value, ())), None)
+
+    def set_value(self, chunk_ids, field, value):
+        """청크들의 필드 값을 바꿉니다 (예: 문서명 변경)."""
+        position = 1 + INDEXED_FIELDS.index(field)
+        for chunk_id in chunk_ids:
+            record = self.chunks.get(chunk_id)
+            if record is None:
+                continue
+            self._discard_postings(chunk_id, record)
+            record[position] = value
+            self._insert(chunk_id, record)
+
+    def values(self, field):
+        """필드 값별 청크 수 {값: 청크 수}"""
+        return {value: len(postings) for value, postings in self._postings[field].items()}
+
+    def copy(self):
+        return MetadataIndex({chunk_id: list(record) for chunk_id, record in self.chunks.items()})
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, METADATA_INDEX_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': METADATA_INDEX_VERSION, 'fields': list(INDEXED_FIELDS), 'chunks': self.chunks},
+                      f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+
+def build_metadata_index(docstore, index_to_docstore_id):
+    """docstore와 라벨 매핑으로 색인을 만듭니다."""
+    index = MetadataIndex()
+    for label, chunk_id in index_to_docstore_id.items():
+        doc = docstore._dict.get(chunk_id)
+        if doc is not None:
+            index.add(chunk_id, label, doc.metadata)
+    return index
+
+
+def load_metadata_index(folder):
+    """스냅샷 디렉터리의 색인을 읽습니다. 없거나 형식이 다르면 None"""
+    path = os.path.join(folder, METADATA_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != METADATA_INDEX_VERSION or tuple(data.get('fields', ())) != INDEXED_FIELDS:
+        return None
+    return MetadataIndex(data['chunks'])
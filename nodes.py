@@ -1,6 +1,9 @@
 from langchain_core.documents import Document
 from langchain_teddynote.tools.tavily import TavilySearch
 from states import GraphState
+from retrieval_cache import retrieval_cache
+from db_versions import get_db_version
+from semantic_cache import semantic_cache as shared_semantic_cache
 from abc import ABC, abstractmethod
 
 class BaseNode(ABC):
@@ -18,34 +21,63 @@ class BaseNode(ABC):
 
 class RetrieveNode(BaseNode):
     """문서 검색 노드"""
-    def __init__(self, retriever, **kwargs):
+    def __init__(self, retriever, db_id=None, cache=None, **kwargs):
         super().__init__(**kwargs)
         self.name = "RetrieveNode"
         self.retriever = retriever
-        # 캐시 추가
-        self.cache = {}
+        self.db_id = db_id
+        # DB 버전이 태깅된 공유 캐시 (LRU/TTL/메모리 예산)
+        self.cache = cache if cache is not None else retrieval_cache
 
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
+        version = get_db_version(self.db_id)
         
         # 이미 캐시에 있는지 확인
-        if question in self.cache:
-            documents = self.cache[question]
+        documents = self.cache.get(self.db_id, question, version)
+        if documents is not None:
             print(f"[{self.name}] 캐시에서 문서 {len(documents)}개 로드됨")
         else:
             documents = self.retriever.invoke(question)
             # 결과를 캐시에 저장
-            self.cache[question] = documents
+            self.cache.put(self.db_id, question, version, documents)
             print(f"[{self.name}] 문서 {len(documents)}개 검색됨")
             
         return GraphState(question=question, documents=documents)
 
+class SemanticCacheNode(BaseNode):
+    """의미 기반 답변 캐시 조회 노드 (대화 첫 질문에만 적용)"""
+    def __init__(self, embeddings, db_id=None, cache=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "SemanticCacheNode"
+        self.embeddings = embeddings
+        self.db_id = db_id
+        self.cache = cache if cache is not None else shared_semantic_cache
+
+    def execute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        if state.get("chat_history"):
+            return GraphState(question=question, generation="")
+        
+        # 질문 임베딩은 쿼리 임베딩 캐시를 거치므로 이후 검색에서 다시 요청하지 않음
+        question_vector = self.embeddings.embed_query(question)
+        hit = self.cache.lookup(self.db_id, question_vector, get_db_version(self.db_id))
+        if hit is None:
+            return GraphState(question=question, generation="")
+        
+        print(f"[{self.name}] 캐시된 답변 사용 (유사도 {hit['similarity']:.3f}): {hit['question']}")
+        return GraphState(question=question, generation=hit["generation"])
+
 class RagAnswerNode(BaseNode):
     """RAG 답변 생성 노드"""
-    def __init__(self, rag_chain, **kwargs):
+    def __init__(self, rag_chain, embeddings=None, db_id=None, cache=None, **kwargs):
         super().__init__(**kwargs)
         self.name = "RagAnswerNode"
         self.rag_chain = rag_chain
+        # 의미 기반 답변 캐시 (embeddings가 없으면 저장하지 않음)
+        self.embeddings = embeddings
+        self.db_id = db_id
+        self.cache = cache if cache is not None else shared_semantic_cache
 
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
@@ -63,6 +95,14 @@ class RagAnswerNode(BaseNode):
             "chat_history": chat_history
         })
         
+        # 첫 질문이고 DB에서 검색한 청크로 답변한 경우에만 캐시에 저장 (웹 검색 결과는 ID가 없음)
+        chunk_ids = [doc.id for doc in documents if getattr(doc, "id", None)]
+        if self.embeddings is not None and not chat_history and chunk_ids:
+            self.cache.put(
+                self.db_id, question, self.embeddings.embed_query(question),
+                chunk_ids, answer, get_db_version(self.db_id)
+            )
+        
         return GraphState(
             question=question, 
             documents=documents, 
@@ -92,4 +132,8 @@ class WebSearchNode(BaseNode):
 def check_documents(state: GraphState) -> str:
     """문서 존재 여부 확인 함수"""
     documents = state.get("documents", [])
-    return "has_documents" if documents else "no_documents"
\ No newline at end of file
+    return "has_documents" if documents else "no_documents"
+
+def check_cache_hit(state: GraphState) -> str:
+    """의미 기반 캐시 적중 여부 확인 함수"""
+    return "cache_hit" if state.get("generation") else "cache_miss"
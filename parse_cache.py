@@ -0,0 +1,143 @@
+"""
+파싱 결과 캐시
+
+로더 출력(페이지 본문 + 메타데이터)을 (파일 내용 sha256, 로더 종류, 로더 옵션) 키로 디스크에 저장합니다.
+같은 파일을 다른 DB에 넣거나 청크 크기/오버랩만 바꿔 DB를 다시 만들 때는 파싱(PDFPlumber, Unstructured OCR,
+유료 LlamaParse 호출)을 건너뛰고 분할과 임베딩만 수행합니다.
+
+항목은 키마다 gzip으로 압축한 JSON 파일 하나이며, 임시 파일에 쓴 뒤 교체합니다.
+전체 크기가 PARSE_CACHE_MAX_MB를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+"""
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import threading
+
+PARSE_CACHE_DIR = os.getenv('PARSE_CACHE_DIR', 'parse_cache')
+# 캐시 전체 최대 크기 (0이면 무제한)
+PARSE_CACHE_MAX_MB = int(os.getenv('PARSE_CACHE_MAX_MB', '1024'))
+# 로더 출력 형식이 바뀌면 올려서 이전 항목을 무효화
+PARSE_CACHE_VERSION = 1
+_ENTRY_SUFFIX = '.json.gz'
+
+
+class ParseCache:
+    """파일 내용 해시 + 로더 기준 파싱 결과 저장소"""
+
+    def __init__(self, cache_dir=PARSE_CACHE_DIR, max_mb=PARSE_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def key(file_hash, loader, options=None):
+        """(파일 해시, 로더 종류, 로더 옵션)의 캐시 키"""
+        options = json.dumps(options or {}, sort_keys=True, ensure_ascii=False)
+        raw = f'{PARSE_CACHE_VERSION}\0{file_hash}\0{loader}\0{options}'
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + _ENTRY_SUFFIX)
+
+    def get(self, key, file_path):
+        """
+        캐시된 파싱 결과 [(본문, 메타데이터), ...]를 반환합니다 (없으면 None).
+        메타데이터의 파일 경로 값(source 등)은 이번 파일 경로로 바꿉니다.
+        """
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            # 손상된 항목은 지우고 다시 파싱
+            print(f"[파싱 캐시] 항목을 읽을 수 없어 삭제합니다: {e}")
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        # 최근 사용 시각 갱신 (용량 초과 시 오래된 항목부터 삭제)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        cached_path = entry['file_path']
+        return [(text, {name: file_path if value == cached_path else value for name, value in metadata.items()})
+                for text, metadata in entry['documents']]
+
+    def put(self, key, file_path, documents):
+        """파싱 결과 [(본문, 메타데이터), ...]를 저장합니다."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({'file_path': file_path, 'documents': [[text, metadata] for text, metadata in documents]},
+                          f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[파싱 캐시] 저장 중 오류: {e}")
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            self.writes += 1
+            if self._size is not None:
+                self._size += os.path.getsize(path)
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(_ENTRY_SUFFIX):
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filename))
+        return entries
+
+    def _evict(self):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            if self._size <= self.max_bytes:
+                return
+            entries = sorted(self._entries())
+            self._size = sum(size for _, size, _ in entries)
+            removed = 0
+            # 한 번 정리할 때 90%까지 줄여 매번 정리하지 않도록 함
+            for _, size, filename in entries:
+                if self._size <= self.max_bytes * 0.9:
+                    break
+                self._remove(os.path.join(self.cache_dir, filename))
+                self._size -= size
+                removed += 1
+        if removed:
+            print(f"[파싱 캐시] 용량 초과로 오래된 항목 {removed}개 삭제")
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes}
+
+
+# 모든 수집 경로가 공유하는 파싱 캐시
+parse_cache = ParseCache()
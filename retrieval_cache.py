@@ -0,0 +1,135 @@
+"""
+RetrieveNode용 검색 결과 캐시
+
+- 키: (DB ID, 정규화된 질문) - 공백, 문장부호, 조사를 정리해 같은 질문을 묶습니다.
+- 항목마다 DB 콘텐츠 버전을 기록하고, 버전이 바뀌면 무효화합니다.
+- LRU + TTL + 메모리 예산으로 크기를 제한합니다.
+"""
+import re
+import sys
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# 길이가 긴 조사부터 비교합니다
+KOREAN_PARTICLES = sorted([
+    '은', '는', '이', '가', '을', '를', '의', '에', '에서', '에게', '께서', '으로', '로',
+    '와', '과', '도', '만', '까지', '부터', '이나', '나', '이랑', '랑', '요', '이요',
+    '인가요', '인가', '입니까', '이에요', '예요', '은요', '는요',
+], key=len, reverse=True)
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _strip_particle(word):
+    for particle in KOREAN_PARTICLES:
+        # 조사를 떼고도 두 글자 이상 남는 경우에만 제거 (예: '나이' 보존)
+        if word.endswith(particle) and len(word) - len(particle) >= 2:
+            return word[:-len(particle)]
+    return word
+
+
+def normalize_question(question):
+    """캐시 키로 사용할 수 있도록 질문을 정규화합니다."""
+    text = unicodedata.normalize('NFKC', question).lower()
+    text = _PUNCTUATION_RE.sub(' ', text)
+    words = _WHITESPACE_RE.sub(' ', text).strip().split(' ')
+    return ' '.join(_strip_particle(word) for word in words if word)
+
+
+def estimate_documents_size(documents):
+    """문서 리스트의 대략적인 메모리 사용량(바이트)"""
+    size = sys.getsizeof(documents)
+    for doc in documents:
+        size += sys.getsizeof(getattr(doc, 'page_content', ''))
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in getattr(doc, 'metadata', {}).items())
+    return size
+
+
+class RetrievalCache:
+    """DB 버전이 태깅된 LRU/TTL 검색 결과 캐시"""
+
+    def __init__(self, max_entries=1024, ttl=3600, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+
+    def get(self, db_id, question, version):
+        """캐시된 문서를 반환합니다. 없거나 만료/무효화되었으면 None."""
+        key = (db_id, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['version'] != version:
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if self.ttl and time.time() > entry['expires_at']:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['documents']
+
+    def put(self, db_id, question, version, documents):
+        key = (db_id, normalize_question(question))
+        size = estimate_documents_size(documents)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                'version': version,
+                'documents': documents,
+                'expires_at': time.time() + self.ttl if self.ttl else None,
+                'size': size,
+            }
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_db(self, db_id):
+        """해당 DB의 모든 항목을 제거합니다."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == db_id]:
+                self._drop(key)
+                self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+# 모든 RetrieveNode가 공유하는 캐시
+retrieval_cache = RetrievalCache()
@@ -1,34 +1,59 @@
 import streamlit as st
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain_community.document_compressors import JinaRerank
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores.faiss import FAISS
-from langchain.retrievers import  EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+from bm25_index import load_bm25_index, build_bm25_index
+from hybrid_search import HybridRetriever
+from embedding_cache import get_embeddings
+from faiss_index import apply_search_params, load_vectorstore
+from db_snapshots import snapshot_dir
+from vectorstore_handles import vectorstore_handles
+from document_manager import load_db_metadata
 
-def init_retriever(db_index="db_index", fetch_k=10, top_n=3):
-       
-    # bm25 retriever와 faiss retriever를 초기화합니다.
-    bm25_retriever = BM25Retriever.from_texts(
-        db_index,
-    )
-    bm25_retriever.k = 3  # BM25Retriever의 검색 결과 개수를 3로 설정합니다.
 
-    # Embeddings 설정
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    # 저장된 DB 로드
-    langgraph_db = FAISS.load_local(
-        db_index, embeddings, allow_dangerous_deserialization=True
-    )
-    # retriever 생성
-    code_retriever = langgraph_db.as_retriever(search_kwargs={"k": fetch_k})
+def load_or_build_bm25_index(db_index, vectorstore):
+    """
+    스냅샷 폴더의 BM25 색인을 로드합니다.
+    색인이 없거나 다른 토크나이저로 만든 색인이면 docstore로 다시 만들어 이 핸들에만 보관합니다.
+    게시된 스냅샷(체크섬 기록, 다른 요청/프로세스가 읽는 중)에는 쓰지 않으며,
+    다음 문서 추가/동기화가 새 스냅샷을 작성할 때 색인도 함께 저장됩니다.
+    """
+    bm25_index = getattr(vectorstore, 'rebuilt_bm25_index', None)
+    if bm25_index is not None:
+        return bm25_index
+    bm25_index = load_bm25_index(db_index)
+    if bm25_index is None:
+        print(f"사용할 수 있는 BM25 색인이 없어 메모리에서 새로 생성합니다: {db_index}")
+        bm25_index = build_bm25_index(vectorstore)
+        # 같은 핸들로 retriever를 다시 만들 때 재사용
+        vectorstore.rebuilt_bm25_index = bm25_index
+    return bm25_index
+
 
-    # 앙상블 retriever를 초기화합니다.
-    ensemble_retriever = EnsembleRetriever(
-        retrievers=[bm25_retriever, code_retriever],
+def init_retriever(db_index="db_index", fetch_k=10, top_n=3, fusion="rrf", mmap=True):
+
+    # 저장된 DB의 현재 스냅샷 핸들 (문서 관리 화면과 공유, 인덱스는 메모리 매핑)
+    # 인덱스와 BM25 색인은 같은 스냅샷에서 읽음
+    if mmap:
+        langgraph_db = vectorstore_handles.get(db_index)
+        folder = langgraph_db.snapshot_folder
+    else:
+        folder = snapshot_dir(db_index)
+        langgraph_db = load_vectorstore(folder, get_embeddings(), mmap=False)
+    # DB 생성 시 저장된 검색 파라미터 적용 (HNSW efSearch, IVF nprobe)
+    apply_search_params(langgraph_db.index, load_db_metadata().get(db_index, {}).get('index_params'))
+
+    # BM25 역색인(메모리 매핑)과 FAISS 인덱스를 병렬로 검색하고
+    # 청크 번호 단위로 점수를 융합하는 하이브리드 retriever를 생성합니다.
+    hybrid_retriever = HybridRetriever(
+        bm25_index=load_or_build_bm25_index(folder, langgraph_db),
+        vectorstore=langgraph_db,
         weights=[0.7, 0.3],
+        fusion=fusion,
+        lexical_k=3,  # BM25 검색 결과 개수
+        dense_k=fetch_k,  # FAISS 검색 결과 개수
+        k=fetch_k,
     )
-    
+
     # JinaRerank 및 ContextualCompressionRetriever 부분 제거하고
-    # ensemble_retriever를 직접 반환합니다
-    return ensemble_retriever
\ No newline at end of file
+    # hybrid_retriever를 직접 반환합니다
+    return hybrid_retriever
@@ -0,0 +1,133 @@
+"""
+DB별 의미 기반 답변 캐시
+
+첫 질문(대화 이력이 없는 질문)의 임베딩, 검색된 청크 ID, 생성된 답변을 저장하고,
+새 질문이 저장된 질문과 코사인 유사도 임계값 이상이면 저장된 답변을 반환합니다.
+조회는 DB별 질문 임베딩 행렬에 대한 numpy 행렬-벡터 곱으로 수행합니다.
+"""
+import os
+import time
+import threading
+
+import numpy as np
+
+# 캐시 적중으로 인정할 최소 코사인 유사도와 DB별 최대 항목 수
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '512'))
+
+
+class _DBAnswers:
+    """한 DB의 캐시 항목 (질문 임베딩 행렬 + 항목 정보)"""
+
+    def __init__(self, dim, capacity):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SemanticAnswerCache:
+    """
+    DB 버전이 태깅된 의미 기반 답변 캐시
+
+    Attributes:
+        threshold: 캐시 적중으로 인정할 최소 코사인 유사도
+        max_entries: DB별 최대 항목 수 (초과 시 가장 오래 사용되지 않은 항목 제거)
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._dbs = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def lookup(self, db_id, question_vector, version):
+        """가장 유사한 캐시 항목을 찾아 {'question', 'chunk_ids', 'generation', 'similarity'}를 반환합니다."""
+        query = self._normalize(question_vector)
+        with self._lock:
+            answers = self._dbs.get(db_id)
+            if answers is None or not len(answers) or answers.vectors.shape[1] != len(query):
+                self.misses += 1
+                return None
+            # DB 버전이 바뀌었으면 해당 DB의 항목을 모두 버림
+            if answers.entries[0]['version'] != version:
+                self.invalidations += len(answers)
+                del self._dbs[db_id]
+                self.misses += 1
+                return None
+            similarities = answers.vectors[:len(answers)] @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry = answers.entries[best]
+            entry['last_used'] = time.monotonic()
+            self.hits += 1
+            return {
+                'question': entry['question'],
+                'chunk_ids': entry['chunk_ids'],
+                'generation': entry['generation'],
+                'similarity': float(similarities[best]),
+            }
+
+    def put(self, db_id, question, question_vector, chunk_ids, generation, version):
+        vector = self._normalize(question_vector)
+        with self._lock:
+            answers = self._dbs.get(db_id)
+            if answers is None or answers.vectors.shape[1] != len(vector) or \
+                    (len(answers) and answers.entries[0]['version'] != version):
+                answers = self._dbs[db_id] = _DBAnswers(len(vector), min(16, self.max_entries))
+
+            if len(answers) >= self.max_entries:
+                # 가장 오래 사용되지 않은 항목 자리에 덮어씀
+                slot = min(range(len(answers)), key=lambda i: answers.entries[i]['last_used'])
+                self.evictions += 1
+            else:
+                slot = len(answers)
+                if slot >= len(answers.vectors):
+                    grown = np.zeros((min(len(answers.vectors) * 2, self.max_entries), len(vector)), dtype=np.float32)
+                    grown[:slot] = answers.vectors[:slot]
+                    answers.vectors = grown
+                answers.entries.append(None)
+
+            answers.vectors[slot] = vector
+            answers.entries[slot] = {
+                'question': question,
+                'chunk_ids': list(chunk_ids),
+                'generation': generation,
+                'version': version,
+                'last_used': time.monotonic(),
+            }
+
+    def invalidate_db(self, db_id):
+        with self._lock:
+            answers = self._dbs.pop(db_id, None)
+            if answers is not None:
+                self.invalidations += len(answers)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'threshold': self.threshold,
+            'max_entries_per_db': self.max_entries,
+            'entries': {db_id: len(answers) for db_id, answers in self._dbs.items()},
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+# 모든 그래프가 공유하는 답변 캐시
+semantic_cache = SemanticAnswerCache()
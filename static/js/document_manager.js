@@ -113,6 +113,7 @@ document.addEventListener('DOMContentLoaded', () => {
         
         // 벡터 DB에 문서 추가 버튼 클릭 (이벤트 위임)
         document.addEventListener('click', handleAddDocsToDb);
+        document.addEventListener('click', handleSyncDb);
         
         // 문서 추가 모달 취소 버튼
         const cancelAddToDbBtn = document.getElementById('cancel-add-to-db');
@@ -381,6 +382,82 @@ document.addEventListener('DOMContentLoaded', () => {
         createBatchDbModal.classList.remove('hidden');
     }
     
+    // 수집 작업 단계 표시 이름
+    const JOB_STAGE_LABELS = {
+        queued: '대기 중',
+        waiting_lock: '같은 DB의 다른 작업 완료 대기 중',
+        hashing: '파일 변경 여부 확인 중',
+        started: '시작하는 중',
+        parsing: '파일 파싱 중',
+        embedding: '청크 임베딩 중',
+        compacting: '인덱스 압축 중',
+        converting: 'docstore 변환 중',
+        saving: '인덱스 저장 중'
+    };
+    
+    // 수집 작업 진행 상황 텍스트 생성 함수
+    function formatJobProgress(job) {
+        const progress = job.progress || {};
+        let text = JOB_STAGE_LABELS[job.stage] || job.stage;
+        if (job.stage === 'parsing' && progress.files_total) {
+            text += ` (${progress.files_parsed || 0}/${progress.files_total}개 파일`;
+            // 파싱 캐시에서 가져온 파일 수
+            if (progress.files_cached) {
+                text += `, 캐시 ${progress.files_cached}개`;
+            }
+            text += ')';
+        } else if (job.stage === 'embedding' && progress.chunks_total) {
+            // 파싱과 임베딩이 함께 진행되므로 전체 청크 수는 진행 중에 늘어남
+            text += ` (${progress.chunks_embedded || 0}/${progress.chunks_total}개 청크, ${progress.files_parsed || 0}/${progress.files_total}개 파일)`;
+        }
+        return text;
+    }
+    
+    // 백그라운드 수집 작업이 끝날 때까지 SSE로 진행 상황을 표시하는 함수
+    function waitForIngestionJob(jobId) {
+        const jobProgress = document.getElementById('job-progress');
+        const jobProgressText = document.getElementById('job-progress-text');
+        const cancelJobBtn = document.getElementById('cancel-job-btn');
+        
+        jobProgressText.textContent = JOB_STAGE_LABELS.queued;
+        jobProgress.classList.remove('hidden');
+        cancelJobBtn.disabled = false;
+        cancelJobBtn.onclick = async () => {
+            cancelJobBtn.disabled = true;
+            jobProgressText.textContent = '작업을 취소하는 중...';
+            await fetch(`/ingestion_jobs/${jobId}/cancel`, { method: 'POST' });
+        };
+        
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(`/ingestion_jobs/${jobId}/events`);
+            const finish = () => {
+                source.close();
+                jobProgress.classList.add('hidden');
+            };
+            source.onmessage = (event) => {
+                const job = JSON.parse(event.data);
+                if (job.error && !job.status) {
+                    finish();
+                    reject(new Error(job.error));
+                    return;
+                }
+                if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+                    finish();
+                    resolve(job);
+                    return;
+                }
+                jobProgressText.textContent = formatJobProgress(job);
+            };
+            source.onerror = () => {
+                // 일시적인 끊김은 EventSource가 자동으로 재연결하므로 완전히 닫힌 경우만 실패로 처리
+                if (source.readyState === EventSource.CLOSED) {
+                    finish();
+                    reject(new Error('작업 진행 상황 연결이 끊어졌습니다.'));
+                }
+            };
+        });
+    }
+    
     // 다중 파일로 벡터 DB 생성 처리 함수
     async function handleCreateBatchDb() {
         const dbName = batchDbNameInput.value.trim();
@@ -439,6 +516,14 @@ document.addEventListener('DOMContentLoaded', () => {
             const pdfLoaderSelect = document.getElementById('pdf-loader-select');
             const selectedPdfLoader = pdfLoaderSelect ? pdfLoaderSelect.value : 'pdfplumber';
             
+            // 선택된 인덱스 종류 가져오기
+            const indexTypeSelect = document.getElementById('index-type');
+            const selectedIndexType = indexTypeSelect ? indexTypeSelect.value : 'flat';
+            
+            // 유사 중복 청크 제거 여부
+            const dedupCheckbox = document.getElementById('chunk-dedup');
+            const dedupEnabled = dedupCheckbox ? dedupCheckbox.checked : false;
+            
             const response = await fetch('/create_vector_db_from_multiple', {
                 method: 'POST',
                 headers: {
@@ -451,18 +536,27 @@ document.addEventListener('DOMContentLoaded', () => {
                     chunk_size: chunkSize,
                     chunk_overlap: chunkOverlap,
                     category: selectedCategory,
-                    pdf_loader: selectedPdfLoader
+                    pdf_loader: selectedPdfLoader,
+                    index_type: selectedIndexType,
+                    dedup: dedupEnabled
                 })
             });
             
             const data = await response.json();
             
-            if (data.status === 'success') {
-                showAlert(`${data.message} (청크 크기: ${data.chunk_size}, 오버랩: ${data.chunk_overlap})`, 'success');
+            if (data.status !== 'success') {
+                showAlert(data.message, 'danger');
+                return;
+            }
+            
+            // 백그라운드 작업이 끝날 때까지 진행 상황 표시
+            const job = await waitForIngestionJob(data.job_id);
+            if (job.status === 'succeeded') {
+                showAlert(`${job.result.message} (청크 크기: ${job.result.chunk_size}, 오버랩: ${job.result.chunk_overlap})`, 'success');
                 // 페이지 새로고침하여 DB 목록 업데이트
                 location.reload();
             } else {
-                showAlert(data.message, 'danger');
+                showAlert(job.error || '벡터 DB 생성 작업이 완료되지 않았습니다.', 'danger');
             }
         } catch (error) {
             console.error('Error:', error);
@@ -635,6 +729,50 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    // 벡터 DB 동기화 버튼 클릭 처리 함수 (변경된 업로드 파일만 다시 처리)
+    async function handleSyncDb(e) {
+        const btn = e.target.closest('.sync-db-btn');
+        if (!btn) return;
+        
+        const dbId = btn.dataset.dbId;
+        const dbName = btn.dataset.dbName;
+        if (!confirm(`"${dbName}" 벡터 DB를 업로드 폴더의 파일과 동기화하시겠습니까?\n변경된 파일은 다시 처리되고, 삭제된 파일의 청크는 제거됩니다.`)) {
+            return;
+        }
+        
+        showLoading();
+        
+        try {
+            const response = await fetch('/sync_db_documents', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ db_id: dbId })
+            });
+            
+            const data = await response.json();
+            
+            if (data.status !== 'success') {
+                showAlert(data.message, 'danger');
+                return;
+            }
+            
+            // 백그라운드 작업이 끝날 때까지 진행 상황 표시
+            const job = await waitForIngestionJob(data.job_id);
+            if (job.status === 'succeeded') {
+                showAlert(job.result.message, 'success');
+            } else {
+                showAlert(job.error || '동기화 작업이 완료되지 않았습니다.', 'danger');
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            showAlert('동기화 중 오류가 발생했습니다: ' + error.message, 'danger');
+        } finally {
+            hideLoading();
+        }
+    }
+    
     // 벡터 DB에 문서 추가 버튼 클릭 처리 함수
     function handleAddDocsToDb(e) {
         if (e.target.closest('.add-docs-btn')) {
@@ -763,13 +901,20 @@ document.addEventListener('DOMContentLoaded', () => {
             
             const data = await response.json();
             
-            if (data.status === 'success') {
-                showAlert(data.message, 'success');
+            if (data.status !== 'success') {
+                showAlert(data.message || '알 수 없는 오류가 발생했습니다.', 'danger');
+                return;
+            }
+            
+            // 백그라운드 작업이 끝날 때까지 진행 상황 표시
+            const job = await waitForIngestionJob(data.job_id);
+            if (job.status === 'succeeded') {
+                showAlert(job.result.message, 'success');
                 
                 // 성공 후 모달 닫기
                 document.getElementById('add-to-db-modal').classList.add('hidden');
             } else {
-                showAlert(data.message || '알 수 없는 오류가 발생했습니다.', 'danger');
+                showAlert(job.error || '문서 추가 작업이 완료되지 않았습니다.', 'danger');
             }
         } catch (error) {
             console.error('요청 오류:', error);
@@ -794,7 +939,9 @@ document.addEventListener('DOMContentLoaded', () => {
             document.getElementById('manage-db-id').value = dbId;
             document.getElementById('manage-db-name').textContent = dbName;
             
-            // 문서 목록 로드
+            // 문서 목록 로드 (검색어 초기화)
+            const filterInput = document.getElementById('db-documents-filter');
+            if (filterInput) filterInput.value = '';
             loadDbDocuments(dbId);
             
             // 모달 표시
@@ -802,13 +949,76 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
     
-    // 벡터 DB 문서 목록 로드 함수
-    async function loadDbDocuments(dbId) {
-        // 로딩 메시지 표시
+    // 문서 관리 목록에서 한 번에 가져올 출처(파일) 수
+    const DB_DOCUMENTS_PAGE_SIZE = 100;
+    let dbDocumentsFilterTimer = null;
+    
+    // 내용 검색어 입력 시 목록 다시 조회 (입력이 멈춘 뒤 조회)
+    const dbDocumentsFilter = document.getElementById('db-documents-filter');
+    if (dbDocumentsFilter) {
+        dbDocumentsFilter.addEventListener('input', () => {
+            clearTimeout(dbDocumentsFilterTimer);
+            dbDocumentsFilterTimer = setTimeout(() => {
+                loadDbDocuments(document.getElementById('manage-db-id').value);
+            }, 300);
+        });
+    }
+    
+    // 출처(원본 파일) 항목 생성 함수
+    function createSourceItem(dbId, sourceInfo) {
+        const source = sourceInfo.source || '알 수 없는 출처';
+        const displayFileName = sourceInfo.original_filename || sourceInfo.filename || source.split('/').pop() || '알 수 없는 파일';
+        
+        // 메타데이터 정보 가져오기
+        const metadata = sourceInfo.metadata || {};
+        const metadataKeys = Object.keys(metadata);
+        let metadataHtml = '';
+
+        if (metadataKeys.length > 0) {
+            metadataHtml = '<div class="metadata-info">';
+            metadataKeys.forEach(key => {
+                if (key !== 'source' && key !== 'original_filename') {
+                    metadataHtml += `<span class="metadata-item"><strong>${key}:</strong> ${metadata[key]}</span>`;
+                }
+            });
+            metadataHtml += '</div>';
+        }
+
+        // 소스 아이템 생성
+        const sourceItem = document.createElement('div');
+        sourceItem.className = 'source-item';
+        sourceItem.innerHTML = `
+            <div class="source-name" title="${source}">
+                <i class="fas fa-file-alt"></i> ${displayFileName}
+            </div>
+            <div class="custom-name-container">
+                <span class="custom-name-label">문서명:</span>
+                <span class="custom-name-display">${metadata.custom_name || displayFileName}</span>
+                <button class="btn btn-small edit-custom-name-btn" data-source="${source}" data-db-id="${dbId}">
+                    <i class="fas fa-edit"></i>
+                </button>
+            </div>
+            <div class="source-info">${sourceInfo.chunk_count}개 조각</div>
+            <div class="source-actions">
+                <button class="btn btn-small delete-source-btn" data-source="${source}">
+                    <i class="fas fa-trash"></i> 문서 삭제
+                </button>
+            </div>
+        `;
+        return sourceItem;
+    }
+    
+    // 벡터 DB 문서 목록 로드 함수 (서버에서 출처별로 묶은 목록을 페이지 단위로 조회)
+    async function loadDbDocuments(dbId, cursor = null) {
         const dbDocumentsContainer = document.getElementById('db-documents-container');
         if (!dbDocumentsContainer) return;
         
-        dbDocumentsContainer.innerHTML = '<div class="loading-message">문서 정보를 불러오는 중...</div>';
+        const prefix = dbDocumentsFilter ? dbDocumentsFilter.value.trim() : '';
+        
+        // 첫 페이지면 로딩 메시지 표시
+        if (!cursor) {
+            dbDocumentsContainer.innerHTML = '<div class="loading-message">문서 정보를 불러오는 중...</div>';
+        }
         
         try {
             const response = await fetch('/get_db_documents', {
@@ -816,95 +1026,73 @@ document.addEventListener('DOMContentLoaded', () => {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({ db_id: dbId })
+                body: JSON.stringify({
+                    db_id: dbId,
+                    mode: 'sources',
+                    cursor: cursor,
+                    limit: DB_DOCUMENTS_PAGE_SIZE,
+                    prefix: prefix || null
+                })
             });
             
             const data = await response.json();
             
             if (data.status === 'success') {
-                // 문서 카운트 업데이트
-                document.getElementById('document-count').textContent = data.count;
-                
-                // 문서 정보 표시
-                dbDocumentsContainer.innerHTML = '<div class="document-info-section">이 벡터 DB에는 총 ' + data.count + '개의 문서 조각이 있습니다. 아래는 소스별 문서 목록입니다.</div>';
-                
-                // 원본 문서 소스별로 그룹화하여 표시
-                const documentsBySource = {};
-                
-                // 그룹화
-                data.documents.forEach(doc => {
-                    const source = doc.source || '알 수 없는 출처';
-                    if (!documentsBySource[source]) {
-                        documentsBySource[source] = {
-                            docs: [],
-                            filename: doc.original_filename || doc.filename || source.split('/').pop() || '알 수 없는 파일'
-                        };
-                    }
-                    documentsBySource[source].docs.push(doc);
-                });
-                
-                // 소스 목록 생성
-                const sourceList = document.createElement('div');
-                sourceList.className = 'source-list-section';
+                let sourceList = dbDocumentsContainer.querySelector('.source-list-section');
                 
-                Object.keys(documentsBySource).sort().forEach(source => {
-                    const sourceInfo = documentsBySource[source];
-                    const docsCount = sourceInfo.docs.length;
-                    const displayFileName = sourceInfo.filename;
+                if (!cursor) {
+                    // 문서 카운트 업데이트
+                    document.getElementById('document-count').textContent = data.total_chunks;
                     
-                    // 소스 아이템 생성
-                    // 메타데이터 정보 가져오기
-                    const firstDoc = sourceInfo.docs[0];
-                    const customName = firstDoc.custom_name || displayFileName;
-                    const metadataKeys = firstDoc.metadata ? Object.keys(firstDoc.metadata) : [];
-                    let metadataHtml = '';
-
-                    if (metadataKeys.length > 0) {
-                        metadataHtml = '<div class="metadata-info">';
-                        metadataKeys.forEach(key => {
-                            if (key !== 'source' && key !== 'original_filename') {
-                                metadataHtml += `<span class="metadata-item"><strong>${key}:</strong> ${firstDoc.metadata[key]}</span>`;
-                            }
-                        });
-                        metadataHtml += '</div>';
+                    if (data.count === 0) {
+                        dbDocumentsContainer.innerHTML = prefix
+                            ? '<div class="empty-message">검색어로 시작하는 문서 조각이 없습니다.</div>'
+                            : '<div class="empty-message">문서가 없습니다.</div>';
+                        return;
                     }
-
-                    // 소스 아이템 생성
-                    const sourceItem = document.createElement('div');
-                    sourceItem.className = 'source-item';
-                    sourceItem.innerHTML = `
-                        <div class="source-name" title="${source}">
-                            <i class="fas fa-file-alt"></i> ${displayFileName}
-                        </div>
-                        <div class="custom-name-container">
-                            <span class="custom-name-label">문서명:</span>
-                            <span class="custom-name-display">${sourceInfo.docs[0].metadata?.custom_name || displayFileName}</span>
-                            <button class="btn btn-small edit-custom-name-btn" data-source="${source}" data-db-id="${dbId}">
-                                <i class="fas fa-edit"></i>
-                            </button>
-                        </div>
-                        <div class="source-info">${docsCount}개 조각</div>
-                        <div class="source-actions">
-                            <button class="btn btn-small delete-source-btn" data-source="${source}">
-                                <i class="fas fa-trash"></i> 문서 삭제
-                            </button>
-                        </div>
-                    `;
                     
-                    sourceList.appendChild(sourceItem);
-                });
+                    // 문서 정보 표시
+                    const info = prefix
+                        ? `"${prefix}"(으)로 시작하는 조각이 있는 문서 ${data.count}개입니다.`
+                        : '이 벡터 DB에는 총 ' + data.total_chunks + '개의 문서 조각이 있습니다. 아래는 소스별 문서 목록입니다.';
+                    dbDocumentsContainer.innerHTML = `<div class="document-info-section">${info}</div>`;
+                    
+                    // 소스 목록 생성
+                    sourceList = document.createElement('div');
+                    sourceList.className = 'source-list-section';
+                    dbDocumentsContainer.appendChild(sourceList);
+                }
                 
-                dbDocumentsContainer.appendChild(sourceList);
+                const previousLoadMore = sourceList.querySelector('.load-more-btn');
+                if (previousLoadMore) previousLoadMore.remove();
                 
-                if (Object.keys(documentsBySource).length === 0) {
-                    dbDocumentsContainer.innerHTML = '<div class="empty-message">문서가 없습니다.</div>';
+                data.sources.forEach(sourceInfo => {
+                    sourceList.appendChild(createSourceItem(dbId, sourceInfo));
+                });
+                
+                // 다음 페이지가 있으면 더 보기 버튼 추가
+                if (data.next_cursor) {
+                    const loadMoreBtn = document.createElement('button');
+                    loadMoreBtn.className = 'btn btn-small load-more-btn';
+                    loadMoreBtn.textContent = `더 보기 (${sourceList.querySelectorAll('.source-item').length}/${data.count})`;
+                    loadMoreBtn.addEventListener('click', () => {
+                        loadMoreBtn.disabled = true;
+                        loadDbDocuments(dbId, data.next_cursor);
+                    });
+                    sourceList.appendChild(loadMoreBtn);
                 }
+            } else if (cursor) {
+                showAlert(`문서 정보 로드 실패: ${data.message}`, 'danger');
             } else {
                 dbDocumentsContainer.innerHTML = `<div class="error-message">문서 정보 로드 실패: ${data.message}</div>`;
             }
         } catch (error) {
             console.error('문서 정보 로드 중 오류:', error);
-            dbDocumentsContainer.innerHTML = `<div class="error-message">문서 정보 로드 중 오류: ${error.message}</div>`;
+            if (cursor) {
+                showAlert(`문서 정보 로드 중 오류: ${error.message}`, 'danger');
+            } else {
+                dbDocumentsContainer.innerHTML = `<div class="error-message">문서 정보 로드 중 오류: ${error.message}</div>`;
+            }
         }
     }
     
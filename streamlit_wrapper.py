@@ -5,68 +5,167 @@ import os
 import time
 import pickle
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from retrievers import init_retriever
+from embedding_cache import get_embeddings
 from states import GraphState
 from rag import create_rag_chain
 from nodes import *
 from document_manager import VECTOR_DB_FOLDER, load_db_metadata
+from db_residency import DBResidencyManager, estimate_db_memory
+from db_versions import add_version_listener
 
-# 글로벌 DB 캐시 저장소
-db_cache = {}
 # 그래프 로드 완료 플래그
 GRAPHS_LOADED = False
+# 사전 로드에 사용할 스레드 수 (인덱스 I/O와 역직렬화를 병렬로 수행)
+PRELOAD_WORKERS = int(os.getenv('DB_PRELOAD_WORKERS', '4'))
+# 사전 로드 진행 상태 (준비 상태 보고용)
+preload_status = {
+    'state': 'idle',  # idle -> warming -> ready
+    'total': 0,
+    'loaded': 0,
+    'failed': 0,
+    'deferred': 0,
+    'timings': {},
+    'errors': {},
+    'started_at': None,
+    'finished_at': None
+}
+_preload_lock = threading.Lock()
+_warmup_thread = None
 
-def preload_vector_dbs():
-    """모든 벡터 DB를 미리 메모리에 로드하는 함수"""
-    global db_cache
+def list_vector_dbs():
+    """디스크에 존재하는 벡터 DB 폴더 목록"""
+    return sorted(folder for folder in os.listdir() if folder.startswith(VECTOR_DB_FOLDER) and os.path.isdir(folder))
+
+def get_display_name(db_id):
+    """메타데이터의 표시 이름 (없으면 폴더명에서 접두어 제거)"""
+    return load_db_metadata().get(db_id, {}).get('display_name', db_id[len(VECTOR_DB_FOLDER):])
+
+def load_db_entry(db_id, previous=None):
+    """
+    DB 하나의 retriever와 그래프를 로드하는 함수 (상주 관리자가 호출)
+    DB 변경으로 다시 만드는 경우(previous) 이전 그래프의 대화 체크포인트를 이어서 사용
+    """
+    print(f"벡터 DB '{db_id}' 로드 중...")
+    start_time = time.time()
+    retriever = init_retriever(db_index=db_id)
+    load_time = time.time() - start_time
     
-    # 실제 존재하는 벡터 DB 디렉토리 확인
-    existing_folders = [folder for folder in os.listdir() if folder.startswith(VECTOR_DB_FOLDER) and os.path.isdir(folder)]
-    metadata = load_db_metadata()
+    start_time = time.time()
+    previous_graph = (previous or {}).get('graph')
+    graph = create_graph_internal(db_id, retriever, checkpointer=getattr(previous_graph, 'checkpointer', None))
+    graph_time = time.time() - start_time
     
-    print(f"벡터 DB 사전 로드 시작: {len(existing_folders)}개 DB 대상")
+    print(f"벡터 DB '{db_id}' 로드 완료 - 로드: {load_time:.2f}초, 그래프: {graph_time:.2f}초")
+    return {
+        'retriever': retriever,
+        'graph': graph,
+        'load_time': load_time,
+        'graph_time': graph_time
+    }
+
+# 글로벌 DB 캐시 - 첫 사용 시 로드하고 메모리 예산 초과 시 LRU DB를 해제하는 상주 관리자
+db_cache = DBResidencyManager(load_db_entry, list_vector_dbs, get_display_name)
+# DB 생성/문서 추가/삭제로 버전이 바뀌면 상주 중인 retriever와 그래프를 백그라운드에서 교체
+add_version_listener(db_cache.schedule_refresh)
+
+def _preload_one(folder):
+    """사전 로드 작업 하나 - 로드 결과와 소요 시간을 상태에 기록"""
+    start_time = time.time()
+    try:
+        entry = db_cache.acquire(folder)
+        with _preload_lock:
+            preload_status['loaded'] += 1
+            preload_status['timings'][folder] = {
+                'load_time': entry.get('load_time'),
+                'graph_time': entry.get('graph_time'),
+                'total_time': time.time() - start_time
+            }
+    except Exception as e:
+        print(f"벡터 DB '{folder}' 로드 중 오류: {str(e)}")
+        with _preload_lock:
+            preload_status['failed'] += 1
+            preload_status['errors'][folder] = str(e)
+
+def preload_vector_dbs(max_workers=PRELOAD_WORKERS):
+    """메모리 예산 안에서 벡터 DB를 스레드 풀로 병렬 사전 로드하는 함수 (나머지는 첫 사용 시 로드)"""
+    existing_folders = list_vector_dbs()
+    print(f"벡터 DB 사전 로드 시작: {len(existing_folders)}개 DB 대상 (동시 {max_workers}개)")
     
+    # 병렬로 올리기 전에 예산 안에 드는 DB를 미리 정함
+    planned = []
+    planned_bytes = db_cache.memory_bytes()
     for folder in existing_folders:
-        try:
-            # 각 벡터 DB에 대한 retriever 생성 및 캐싱
-            print(f"벡터 DB '{folder}' 로드 중...")
-            start_time = time.time()
-            retriever = init_retriever(db_index=folder)
-            load_time = time.time() - start_time
-            
-            # 표시 이름 가져오기
-            display_name = metadata.get(folder, {}).get('display_name', folder[len(VECTOR_DB_FOLDER):])
-            
-            # 캐시에 저장
-            db_cache[folder] = {
-                'retriever': retriever,
-                'display_name': display_name,
-                'graph': None,  # 그래프는 별도 함수에서 생성
-                'load_time': load_time
-            }
-            print(f"벡터 DB '{display_name}' 로드 완료 - 소요 시간: {load_time:.2f}초")
-        except Exception as e:
-            print(f"벡터 DB '{folder}' 로드 중 오류: {str(e)}")
+        if folder in db_cache:
+            continue
+        estimate = estimate_db_memory(folder)
+        if db_cache.memory_budget and planned_bytes + estimate > db_cache.memory_budget:
+            print(f"메모리 예산 초과 - 벡터 DB '{folder}'는 첫 사용 시 로드됩니다.")
+            continue
+        planned.append(folder)
+        planned_bytes += estimate
+    
+    with _preload_lock:
+        preload_status.update({
+            'state': 'warming',
+            'total': len(planned),
+            'deferred': len(existing_folders) - len(planned) - len(db_cache),
+            'started_at': time.time(),
+            'finished_at': None
+        })
     
-    print(f"벡터 DB 사전 로드 완료: {len(db_cache)}개 DB 로드됨")
+    total_start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='db-preload') as executor:
+        for future in as_completed([executor.submit(_preload_one, folder) for folder in planned]):
+            future.result()
+    
+    with _preload_lock:
+        preload_status['state'] = 'ready'
+        preload_status['finished_at'] = time.time()
+    print(f"벡터 DB 사전 로드 완료: {len(db_cache)}개 DB 로드됨 - 총 소요 시간: {time.time() - total_start:.2f}초")
     return db_cache
 
-def create_graph_internal(db_index, retriever):
-    """내부적으로 그래프를 생성하는 함수"""
+def get_readiness():
+    """사전 로드 진행 상태와 현재 사용 가능한 DB 목록을 반환합니다."""
+    with _preload_lock:
+        status = dict(preload_status)
+        status['timings'] = dict(preload_status['timings'])
+        status['errors'] = dict(preload_status['errors'])
+    status['ready'] = status['state'] == 'ready'
+    status['available_dbs'] = db_cache.keys()
+    return status
+
+def create_graph_internal(db_index, retriever, checkpointer=None):
+    """내부적으로 그래프를 생성하는 함수 (checkpointer를 주면 기존 대화 상태를 공유)"""
     # RAG 체인 생성
     rag_chain = create_rag_chain()
     
     # 그래프 상태 초기화
     workflow = StateGraph(GraphState)
     
+    # 질문 임베딩 (쿼리 임베딩 캐시 공유)
+    embeddings = get_embeddings()
+    
     # 노드 정의 - 간결하게 필수 노드만 추가
-    workflow.add_node("retrieve", RetrieveNode(retriever))
+    workflow.add_node("semantic_cache", SemanticCacheNode(embeddings, db_id=db_index))
+    workflow.add_node("retrieve", RetrieveNode(retriever, db_id=db_index))
     workflow.add_node("web_search", WebSearchNode())
-    workflow.add_node("generate_answer", RagAnswerNode(rag_chain))
+    workflow.add_node("generate_answer", RagAnswerNode(rag_chain, embeddings=embeddings, db_id=db_index))
     
     # 엣지 추가 - 단순화된 흐름
-    # 시작 -> 검색 -> 결과에 따라 분기 -> 답변 생성 -> 종료
-    workflow.add_edge(START, "retrieve")
+    # 시작 -> 답변 캐시 확인 -> 검색 -> 결과에 따라 분기 -> 답변 생성 -> 종료
+    workflow.add_edge(START, "semantic_cache")
+    
+    workflow.add_conditional_edges(
+        "semantic_cache",
+        check_cache_hit,
+        {
+            "cache_hit": END,          # 유사한 질문의 답변이 있으면 바로 종료
+            "cache_miss": "retrieve",  # 없으면 문서 검색
+        },
+    )
     
     workflow.add_conditional_edges(
         "retrieve",
@@ -81,12 +180,12 @@ def create_graph_internal(db_index, retriever):
     workflow.add_edge("generate_answer", END)
     
     # 그래프 컴파일
-    app = workflow.compile(checkpointer=MemorySaver())
+    app = workflow.compile(checkpointer=checkpointer or MemorySaver())
     
     return app
 
 def preload_graphs():
-    """모든 DB에 대한 그래프를 미리 생성하는 함수"""
+    """상주 중인 DB 중 그래프가 없는 DB의 그래프를 생성하는 함수"""
     global db_cache, GRAPHS_LOADED
     
     # 이미 그래프가 로드되었으면 건너뜀
@@ -97,26 +196,18 @@ def preload_graphs():
     print(f"그래프 사전 생성 시작: {len(db_cache)}개 DB 대상")
     total_start = time.time()
     
-    for db_id in list(db_cache.keys()):
+    for db_id in db_cache.keys():
+        entry = db_cache.get(db_id)
         try:
             # 이미 그래프가 생성되어 있으면 스킵
-            if db_cache[db_id].get('graph') is not None:
-                print(f"DB '{db_id}'의 그래프 이미 생성됨 - 스킵")
+            if entry is None or entry.get('graph') is not None:
                 continue
-                
+            
             print(f"DB '{db_id}'의 그래프 생성 중...")
             start_time = time.time()
-            
-            # 그래프 생성
-            graph = create_graph_internal(db_id, db_cache[db_id]['retriever'])
-            
-            # 생성된 그래프를 캐시에 저장
-            db_cache[db_id]['graph'] = graph
-            
-            graph_time = time.time() - start_time
-            db_cache[db_id]['graph_time'] = graph_time
-            
-            print(f"DB '{db_id}'의 그래프 생성 완료 - 소요 시간: {graph_time:.2f}초")
+            entry['graph'] = create_graph_internal(db_id, entry['retriever'])
+            entry['graph_time'] = time.time() - start_time
+            print(f"DB '{db_id}'의 그래프 생성 완료 - 소요 시간: {entry['graph_time']:.2f}초")
         except Exception as e:
             print(f"DB '{db_id}'의 그래프 생성 중 오류: {str(e)}")
     
@@ -127,47 +218,14 @@ def preload_graphs():
     GRAPHS_LOADED = True
 
 def create_graph(db_index=None):
-    """그래프 생성 함수 - 캐시된 그래프 활용"""
-    global db_cache, GRAPHS_LOADED
-    
+    """그래프 생성 함수 - 상주 중이면 캐시된 그래프, 아니면 로드 후 반환"""
     # db_index가 None인 경우 처리
     if not db_index:
         return None
     
-    # 서버가 이미 로드되었고, 캐시에 DB가 있는 경우
-    if GRAPHS_LOADED and db_index in db_cache:
-        # 이미 그래프가 생성되어 있으면 즉시 반환
-        if db_cache[db_index].get('graph') is not None:
-            print(f"캐시된 그래프 즉시 반환 - DB: {db_index}")
-            return db_cache[db_index]['graph']
-    
-    # 서버 최초 시작 시나 캐시에 없는 경우
     try:
-        # 캐시에 해당 DB가 있는지 확인
-        if db_index in db_cache:
-            # 그래프 생성 및 캐시
-            print(f"캐시된 retriever로 그래프 생성 - DB: {db_index}")
-            retriever = db_cache[db_index]['retriever']
-            graph = create_graph_internal(db_index, retriever)
-            db_cache[db_index]['graph'] = graph
-            return graph
-        else:
-            # 캐시에 없는 경우 새로 로드 (예외 상황)
-            print(f"DB '{db_index}'가 캐시에 없음 - 새로 로드")
-            retriever = init_retriever(db_index=db_index)
-            
-            # 새로 로드한 DB도 캐시에 추가
-            db_cache[db_index] = {
-                'retriever': retriever,
-                'display_name': db_index[len(VECTOR_DB_FOLDER):],
-                'graph': None,
-                'load_time': 0
-            }
-            
-            # 그래프 생성
-            graph = create_graph_internal(db_index, retriever)
-            db_cache[db_index]['graph'] = graph
-            return graph
+        # 메모리에서 해제된 DB는 여기서 다시 로드됨
+        return db_cache.acquire(db_index)['graph']
     except Exception as e:
         print(f"그래프 생성 중 오류: {str(e)}")
         return None
@@ -188,22 +246,34 @@ def stream_graph(app, query, streamlit_container, thread_id):
         streamlit_container.markdown("답변을 생성하지 못했습니다.")
         return "답변을 생성하지 못했습니다."
 
-def init_app():
-    """Flask 앱 시작 시 호출되는 초기화 함수"""
+def _warm_up():
+    """벡터 DB 로드 및 그래프 생성 (백그라운드 스레드에서 실행)"""
     global GRAPHS_LOADED
+    preload_vector_dbs()
+    preload_graphs()
+    GRAPHS_LOADED = True
+    print("앱 초기화 완료")
+
+def init_app(background=True):
+    """
+    Flask 앱 시작 시 호출되는 초기화 함수
+    background=True면 사전 로드를 백그라운드에서 진행하고 즉시 반환하므로,
+    앱은 바로 요청을 받고 로드가 끝난 DB부터 사용할 수 있습니다.
+    """
+    global _warmup_thread
     
-    if GRAPHS_LOADED:
+    if GRAPHS_LOADED or _warmup_thread is not None:
         print("앱이 이미 초기화되어 있습니다.")
-        return
+        return db_cache
     
     print("앱 초기화 시작...")
     
-    # 벡터 DB 로드 및 그래프 생성
-    preload_vector_dbs()
-    preload_graphs()
-    
-    GRAPHS_LOADED = True
-    print("앱 초기화 완료")
+    if background:
+        _warmup_thread = threading.Thread(target=_warm_up, name='db-warmup', daemon=True)
+        _warmup_thread.start()
+    else:
+        _warmup_thread = threading.current_thread()
+        _warm_up()
     return db_cache
 
 # 시스템 상태 관리 함수들
@@ -0,0 +1,99 @@
+"""/ask 라우트를 거친 의미 기반 답변 캐시 동작"""
+import zlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip('langgraph')
+pytest.importorskip('langchain_teddynote')
+pytest.importorskip('flask_session')
+
+from langchain_core.documents import Document
+from langgraph.graph import StateGraph, START, END
+
+import app as app_module
+from nodes import SemanticCacheNode, RagAnswerNode
+from semantic_cache import SemanticAnswerCache
+from states import GraphState
+
+DB_ID = 'vectordb/test_semantic_cache'
+
+
+class FakeEmbeddings:
+    """질문 문자열마다 고정된 임베딩"""
+
+    def embed_query(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode('utf-8'))).normal(size=16).tolist()
+
+
+class FakeChain:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+def _build_graph(chain, cache):
+    embeddings = FakeEmbeddings()
+    workflow = StateGraph(GraphState)
+    workflow.add_node("semantic_cache", SemanticCacheNode(embeddings, db_id=DB_ID, cache=cache))
+    workflow.add_node("retrieve", lambda state: GraphState(
+        question=state["question"], documents=[Document(page_content="본문", id="chunk-1")]))
+    workflow.add_node("generate_answer", RagAnswerNode(chain, embeddings=embeddings, db_id=DB_ID, cache=cache))
+    workflow.add_edge(START, "semantic_cache")
+    workflow.add_conditional_edges(
+        "semantic_cache",
+        lambda state: "cache_hit" if state.get("generation") else "cache_miss",
+        {"cache_hit": END, "cache_miss": "retrieve"},
+    )
+    workflow.add_edge("retrieve", "generate_answer")
+    workflow.add_edge("generate_answer", END)
+    return workflow.compile()
+
+
+def _client():
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['db_index'] = DB_ID
+    return client
+
+
+def _ask(client, question):
+    response = client.post('/ask', json={'question': question, 'thread_id': 'test'})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['answer']
+
+
+def test_first_question_is_cached_across_sessions(monkeypatch):
+    chain = FakeChain()
+    cache = SemanticAnswerCache()
+    graph = _build_graph(chain, cache)
+    monkeypatch.setattr(app_module, 'create_graph', lambda db_index: graph)
+
+    # 첫 질문은 답변을 생성해 캐시에 저장
+    first = _ask(_client(), "복무 기간은?")
+    assert first == "answer 1"
+    assert chain.calls == 1
+    assert cache.stats()['entries'] == {DB_ID: 1}
+
+    # 다른 세션의 같은 첫 질문은 캐시된 답변을 사용
+    assert _ask(_client(), "복무 기간은?") == "answer 1"
+    assert chain.calls == 1
+
+
+def test_follow_up_question_skips_cache(monkeypatch):
+    chain = FakeChain()
+    cache = SemanticAnswerCache()
+    graph = _build_graph(chain, cache)
+    monkeypatch.setattr(app_module, 'create_graph', lambda db_index: graph)
+
+    client = _client()
+    _ask(client, "지원 자격은?")
+    calls = chain.calls
+
+    # 대화 이력이 있는 질문은 캐시를 조회하지도, 저장하지도 않음
+    _ask(client, "지원 자격은?")
+    assert chain.calls > calls
+    assert cache.stats()['entries'] == {DB_ID: 1}
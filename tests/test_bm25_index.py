@@ -0,0 +1,67 @@
+"""CSR 형식 BM25 색인의 검색, 증분 갱신, 저장/로드"""
+import json
+
+import numpy as np
+
+from bm25_index import BM25_META_FILE, BM25Index, load_bm25_index, tokenizer_name
+
+TEXTS = {
+    3: '해병대 모집 일정과 지원 자격 안내',
+    5: '육군 부사관 모집 공고',
+    8: '공군 급여와 복무 기간',
+}
+
+
+def _index(texts=TEXTS):
+    return BM25Index.from_texts(list(texts), list(texts.values()))
+
+
+def _assert_same(a, b, query):
+    assert np.allclose(a.get_scores(query), b.get_scores(query), atol=1e-5)
+
+
+def test_search_ranks_matching_documents():
+    index = _index()
+    ids, scores = index.search('해병대 모집', k=3)
+    assert ids.tolist()[0] == 3
+    assert set(ids.tolist()) == {3, 5}
+    assert np.all(np.diff(scores) <= 0)
+    # 문서 번호는 라벨 그대로 사용
+    assert len(index.doc_len) == 9
+    assert index.search('없는단어', k=3)[0].tolist() == []
+
+
+def test_incremental_updates_match_full_rebuild():
+    index = _index({3: TEXTS[3], 5: TEXTS[5]})
+    index = index.add_documents([8, 9], [TEXTS[8], '해병대 급여 안내'])
+    index = index.remove_ids([5])
+
+    expected = _index({3: TEXTS[3], 8: TEXTS[8], 9: '해병대 급여 안내'})
+    assert index.num_docs == 3
+    for query in ('해병대 모집', '급여', '부사관'):
+        _assert_same(index, expected, query)
+    assert 5 not in index.search('부사관 모집', k=3)[0].tolist()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index()
+    index.save(str(tmp_path))
+    loaded = load_bm25_index(str(tmp_path))
+
+    assert isinstance(loaded.post_docs, np.memmap)
+    assert loaded.vocab == index.vocab
+    for query in ('해병대 모집', '공군 복무'):
+        _assert_same(loaded, index, query)
+
+    assert load_bm25_index(str(tmp_path / 'missing')) is None
+
+
+def test_index_built_with_other_tokenizer_is_not_loaded(tmp_path):
+    _index().save(str(tmp_path))
+    meta_path = tmp_path / BM25_META_FILE
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    assert meta['tokenizer'] == tokenizer_name()
+
+    meta['tokenizer'] = 'bigram' if tokenizer_name() == 'kiwi' else 'kiwi'
+    meta_path.write_text(json.dumps(meta), encoding='utf-8')
+    assert load_bm25_index(str(tmp_path)) is None
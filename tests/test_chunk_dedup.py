@@ -0,0 +1,66 @@
+"""유사 중복 청크 제거와 매니페스트의 합쳐진 청크 기록"""
+from langchain_core.documents import Document
+
+from chunk_dedup import ChunkDeduplicator, minhash, similarity
+from db_manifest import diff_manifest, files_merged_into, forget_chunks, new_manifest, record_file
+
+SHARED = '공통 모집 공고 문단입니다. 지원 자격은 고등학교 졸업 이상이며 신체 검사 기준을 충족해야 합니다.'
+
+
+def _chunk(chunk_id, text, source):
+    return Document(page_content=text, metadata={'source': source}, id=chunk_id)
+
+
+def test_minhash_similarity():
+    assert similarity(minhash(SHARED), minhash(SHARED + '.')) >= 0.85
+    assert similarity(minhash(SHARED), minhash('전혀 다른 내용의 청크입니다. 복무 기간과 급여 안내.')) < 0.3
+
+
+def test_filter_merges_near_duplicates():
+    dedup = ChunkDeduplicator()
+    merged = []
+    kept = dedup.filter([_chunk('a1', SHARED, 'data/a.txt')])
+    kept += dedup.filter([_chunk('b1', SHARED.rstrip('.'), 'data/b.txt'),
+                          _chunk('b2', '비 파일 고유 내용입니다.', 'data/b.txt')], merged)
+    assert [chunk.id for chunk in kept] == ['a1', 'b2']
+    assert merged == ['a1']
+    assert dedup.merged == {'a1': ['data/b.txt']}
+    assert dedup.report()['duplicate_chunks'] == 1
+
+    # 삭제한 청크는 더 이상 중복 비교 대상이 아님
+    dedup.remove('a1')
+    assert dedup.find(minhash(SHARED)) is None
+
+
+def _manifest_with_merge():
+    dedup = ChunkDeduplicator()
+    manifest = new_manifest(300, 50)
+    kept_a = dedup.filter([_chunk('a1', SHARED, 'data/a.txt')])
+    merged_b = []
+    kept_b = dedup.filter([_chunk('b1', SHARED, 'data/b.txt'), _chunk('b2', '비 파일 고유 내용입니다.', 'data/b.txt')],
+                          merged_b)
+    record_file(manifest, 'a.txt', 'hash-a', [c.id for c in kept_a])
+    record_file(manifest, 'b.txt', 'hash-b', [c.id for c in kept_b], merged_chunk_ids=merged_b)
+    return manifest
+
+
+def test_removed_kept_chunk_marks_merged_file_for_resync():
+    manifest = _manifest_with_merge()
+    assert manifest['files']['b.txt']['merged_chunk_ids'] == ['a1']
+    assert files_merged_into(manifest, ['a1']) == ['b.txt']
+
+    # a.txt의 청크를 삭제하면 b.txt는 합쳐진 문단을 잃으므로 다음 동기화에서 변경된 파일로 분류
+    forget_chunks(manifest, ['a1'], {'a.txt'})
+    assert 'a.txt' not in manifest['files']
+    assert manifest['files']['b.txt']['sha256'] is None
+    diff = diff_manifest(manifest, {'b.txt': 'hash-b'})
+    assert diff['changed'] == ['b.txt']
+
+
+def test_file_with_only_duplicates_keeps_manifest_entry():
+    manifest = new_manifest(300, 50)
+    record_file(manifest, 'a.txt', 'hash-a', ['a1'])
+    record_file(manifest, 'c.txt', 'hash-c', [], merged_chunk_ids=['a1'])
+    forget_chunks(manifest, ['x'])
+    assert 'c.txt' in manifest['files']
+    assert diff_manifest(manifest, {'a.txt': 'hash-a', 'c.txt': 'hash-c'})['unchanged'] == ['a.txt', 'c.txt']
@@ -0,0 +1,68 @@
+"""DB 쓰기 잠금과 묶음 편집(group commit)"""
+from concurrent.futures import Future
+
+import pytest
+
+from db_locks import DBBusyError, DBLockManager
+
+
+def _run_batch(edits):
+    """편집 목록을 한 묶음으로 실행하고 (저장된 상태 목록, future 목록)을 반환"""
+    locks = DBLockManager()
+    store = {'items': ['a', 'b', 'c']}
+    loads = []
+    commits = []
+
+    def load():
+        loads.append(1)
+        return {'items': list(store['items'])}
+
+    def commit(state):
+        commits.append(list(state['items']))
+
+    batch = [(edit, Future()) for edit in edits]
+    locks._run_batch('db', batch, load, commit)
+    return commits, [future for _, future in batch], len(loads)
+
+
+def test_failed_edit_changes_are_rolled_back():
+    def remove_a(state):
+        state['items'].remove('a')
+        return 'a'
+
+    def partial_then_fail(state):
+        state['items'].remove('b')
+        raise ValueError('편집 실패')
+
+    def remove_c(state):
+        state['items'].remove('c')
+        return 'c'
+
+    commits, futures, loads = _run_batch([remove_a, partial_then_fail, remove_c])
+    # 실패한 편집이 지운 'b'는 저장되지 않고, 성공한 편집만 반영됨
+    assert commits == [['b']]
+    assert futures[0].result() == 'a'
+    with pytest.raises(ValueError):
+        futures[1].result()
+    assert futures[2].result() == 'c'
+    assert loads == 2
+
+
+def test_all_edits_failing_skips_commit():
+    def fail(state):
+        state['items'].clear()
+        raise RuntimeError('실패')
+
+    commits, futures, _ = _run_batch([fail])
+    assert commits == []
+    assert isinstance(futures[0].exception(), RuntimeError)
+
+
+def test_write_timeout_raises_busy_error():
+    locks = DBLockManager()
+    with locks.write('db', 'add_documents'):
+        with pytest.raises(DBBusyError) as excinfo:
+            with locks.write('db', 'remove', timeout=0.05):
+                pass
+    assert excinfo.value.holder == 'add_documents'
+    assert locks.stats()['db']['timeouts'] == 1
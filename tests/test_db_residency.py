@@ -0,0 +1,37 @@
+"""상주 DB를 내릴 때 공유 벡터스토어 핸들도 해제"""
+import gc
+import weakref
+
+import db_residency
+from db_residency import DBResidencyManager
+from vectorstore_handles import VectorstoreRegistry
+
+
+class _Handle:
+    def __init__(self, folder):
+        self.snapshot_folder = folder
+
+
+def test_evict_releases_recent_handle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    registry = VectorstoreRegistry(keep=2)
+    monkeypatch.setattr(db_residency, 'vectorstore_handles', registry)
+
+    def loader(db_id, previous):
+        # retriever가 핸들을 잡고 있는 상주 항목
+        handle = _Handle(db_id)
+        with registry._lock:
+            registry._remember(db_id, handle)
+        return {'retriever': handle, 'graph': None}
+
+    for db_id in ('db_a', 'db_b'):
+        (tmp_path / db_id).mkdir()
+    manager = DBResidencyManager(loader, lambda: ['db_a', 'db_b'], str, memory_budget_mb=0)
+    handle = weakref.ref(manager.acquire('db_a')['retriever'])
+    manager.acquire('db_b')
+
+    assert manager.evict('db_a')
+    gc.collect()
+    assert handle() is None
+    assert registry._lookup('db_a', 'db_a') is None
+    assert registry._lookup('db_b', 'db_b') is not None
@@ -0,0 +1,127 @@
+"""스냅샷 게시, 보관 개수 정리, 손상 시 이전 스냅샷 사용, 롤백"""
+import os
+
+import pytest
+
+import db_snapshots
+from db_snapshots import (SNAPSHOT_RETENTION, current_snapshot, list_snapshots, rollback_snapshot, snapshot_dir,
+                          verify_snapshot, write_snapshot)
+
+
+def _publish(db_id, **files):
+    # 저장 함수들처럼 임시 파일에 쓴 뒤 교체 (물려받은 하드 링크를 직접 고치면 이전 스냅샷도 바뀜)
+    with write_snapshot(db_id) as staging:
+        for name, text in files.items():
+            path = os.path.join(staging, name)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(path + '.tmp', path)
+
+
+def _read(db_id, name):
+    with open(os.path.join(snapshot_dir(db_id), name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def db_id(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('db_test')
+    return 'db_test'
+
+
+def test_publish_inherits_unchanged_files(db_id):
+    _publish(db_id, **{'index.faiss': 'v1', 'manifest.json': '{}'})
+    _publish(db_id, **{'index.faiss': 'v2'})
+
+    assert current_snapshot(db_id) == 'v000002'
+    assert _read(db_id, 'index.faiss') == 'v2'
+    assert _read(db_id, 'manifest.json') == '{}'
+    # 바뀌지 않은 파일은 하드 링크로 물려받음
+    old, new = (os.path.join(db_id, 'snapshots', name, 'manifest.json') for name in ('v000001', 'v000002'))
+    assert os.path.samefile(old, new)
+    assert verify_snapshot(db_id, 'v000002', deep=True)
+
+
+def test_failed_write_keeps_current_snapshot(db_id):
+    _publish(db_id, **{'index.faiss': 'v1'})
+    with pytest.raises(RuntimeError):
+        with write_snapshot(db_id) as staging:
+            with open(os.path.join(staging, 'index.faiss.tmp'), 'w') as f:
+                f.write('partial')
+            raise RuntimeError('저장 실패')
+
+    assert current_snapshot(db_id) == 'v000001'
+    assert _read(db_id, 'index.faiss') == 'v1'
+    assert os.listdir(os.path.join(db_id, 'snapshots')) == ['v000001']
+
+
+def test_old_snapshots_are_removed(db_id):
+    for version in range(SNAPSHOT_RETENTION + 2):
+        _publish(db_id, **{'index.faiss': f'v{version}'})
+    assert list_snapshots(db_id) == [f'v{number:06d}' for number in range(3, SNAPSHOT_RETENTION + 3)]
+
+
+def test_corrupt_current_falls_back_to_previous(db_id):
+    _publish(db_id, **{'index.faiss': 'first'})
+    _publish(db_id, **{'index.faiss': 'second'})
+    with open(os.path.join(db_id, 'snapshots', 'v000002', 'index.faiss'), 'w') as f:
+        f.write('truncated and changed size')
+
+    assert snapshot_dir(db_id).endswith(os.path.join('snapshots', 'v000001'))
+    assert _read(db_id, 'index.faiss') == 'first'
+
+
+def test_rollback_checks_target_snapshot(db_id):
+    _publish(db_id, **{'index.faiss': 'first'})
+    _publish(db_id, **{'index.faiss': 'second'})
+
+    assert rollback_snapshot(db_id) == 'v000001'
+    assert _read(db_id, 'index.faiss') == 'first'
+
+    # 크기는 같지만 내용이 바뀐 스냅샷으로는 롤백하지 않음
+    with open(os.path.join(db_id, 'snapshots', 'v000002', 'index.faiss'), 'w') as f:
+        f.write('SECOND')
+    with pytest.raises(ValueError):
+        rollback_snapshot(db_id, 'v000002')
+    assert current_snapshot(db_id) == 'v000001'
+
+
+def test_legacy_folder_is_read_directly(db_id):
+    with open(os.path.join(db_id, 'index.faiss'), 'w') as f:
+        f.write('legacy')
+    assert snapshot_dir(db_id) == db_id
+
+    # 첫 스냅샷은 이전 버전 폴더의 데이터 파일을 물려받음
+    _publish(db_id, **{'manifest.json': '{}'})
+    assert _read(db_id, 'index.faiss') == 'legacy'
+
+
+def test_snapshot_dir_is_cached_until_current_changes(db_id, monkeypatch):
+    _publish(db_id, **{'index.faiss': 'first'})
+    first = snapshot_dir(db_id)
+
+    calls = []
+    verify = db_snapshots.verify_snapshot
+
+    def counting_verify(*args, **kwargs):
+        calls.append(args)
+        return verify(*args, **kwargs)
+
+    monkeypatch.setattr(db_snapshots, 'verify_snapshot', counting_verify)
+    for _ in range(3):
+        assert snapshot_dir(db_id) == first
+    assert calls == []
+
+    # 새 스냅샷이 게시되면 다시 확인
+    _publish(db_id, **{'index.faiss': 'second'})
+    assert snapshot_dir(db_id).endswith('v000002')
+    calls.clear()
+    assert snapshot_dir(db_id).endswith('v000002')
+    assert calls == []
+
+    # 로드할 때(verify=True)는 손상을 확인해 이전 스냅샷을 사용
+    with open(os.path.join(db_id, 'snapshots', 'v000002', 'index.faiss'), 'w') as f:
+        f.write('corrupted')
+    assert snapshot_dir(db_id, verify=True) == first
+    assert snapshot_dir(db_id) == first
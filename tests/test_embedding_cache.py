@@ -0,0 +1,66 @@
+"""여러 프로세스가 같은 임베딩 캐시에 추가할 때의 행 번호 일관성"""
+import multiprocessing
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def _vector(key):
+    return np.full(4, int(key.split('-')[1]), dtype=np.float32)
+
+
+def _writer(cache_dir, worker, count):
+    cache = EmbeddingCache('test-model', cache_dir=cache_dir)
+    for i in range(count):
+        # 두 프로세스가 함께 추가하는 공통 키도 섞음
+        keys = [f'w{worker}-{i}', f'shared-{i}']
+        cache.put_many(keys, [_vector(key) for key in keys])
+
+
+def test_concurrent_processes_append_consistently(tmp_path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_writer, args=(str(tmp_path), worker, 200)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(30)
+        assert process.exitcode == 0
+
+    cache = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+    keys = [f'w{worker}-{i}' for worker in range(3) for i in range(200)] + [f'shared-{i}' for i in range(200)]
+    found = cache.get_many(keys)
+    assert len(found) == len(keys)
+    for key in keys:
+        assert found[key] == _vector(key).tolist()
+    # 공통 키는 한 번만 기록됨
+    assert len(cache) == len(keys)
+    with open(cache.keys_path) as f:
+        assert len(f.read().split()) == len(keys)
+
+
+def test_sees_keys_added_by_another_instance(tmp_path):
+    reader = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+    writer = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+    writer.put_many(['k-1', 'k-2'], [_vector('k-1'), _vector('k-2')])
+
+    assert reader.get_many(['k-2']) == {'k-2': _vector('k-2').tolist()}
+    reader.put_many(['k-3', 'k-1'], [_vector('k-3'), _vector('k-1')])
+    assert writer.get_many(['k-1', 'k-3']) == {'k-1': _vector('k-1').tolist(), 'k-3': _vector('k-3').tolist()}
+    assert len(reader) == 3
+
+
+def test_torn_append_does_not_shift_rows(tmp_path):
+    first = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+    first.put_many(['k-1'], [_vector('k-1')])
+    # 다른 프로세스가 벡터를 쓰고 키 줄 일부만 쓴 상태에서 중단됨
+    with open(first.vectors_path, 'ab') as f:
+        f.write(_vector('k-9').tobytes())
+    with open(first.keys_path, 'ab') as f:
+        f.write(b'k-')
+
+    first.put_many(['k-2'], [_vector('k-2')])
+    other = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+    for cache in (first, other):
+        assert cache.get_many(['k-1', 'k-2']) == {'k-1': _vector('k-1').tolist(), 'k-2': _vector('k-2').tolist()}
+    assert len(other) == 2
@@ -0,0 +1,120 @@
+"""배치 임베딩 파이프라인: 토큰 기준 배치, 재시도, 배치별 체크포인트, 동시 요청 제한"""
+import asyncio
+
+import numpy as np
+import pytest
+
+import embedding_pipeline
+from embedding_cache import CachedEmbeddings, EmbeddingCache, text_hash
+from embedding_pipeline import (EmbeddingPipeline, FakeEmbeddingError, FakeEmbeddings, is_retryable,
+                                make_batches, retry_delay)
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f'HTTP {status_code}')
+        self.response = _Response(status_code, headers)
+
+
+class _RecordingEmbeddings(FakeEmbeddings):
+    """동시에 진행 중인 요청 수를 기록하고, 지정한 텍스트가 든 배치를 실패시키는 임베딩"""
+
+    def __init__(self, fail_texts=(), errors=None):
+        super().__init__(size=8, latency=0.01)
+        self.fail_texts = set(fail_texts)
+        self.errors = list(errors or [])
+        self.active = 0
+        self.max_active = 0
+        self.requested = []
+
+    async def aembed_documents(self, texts):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.errors:
+                raise self.errors.pop(0)
+            if self.fail_texts & set(texts):
+                raise ValueError('영구 오류')
+            self.requested.extend(texts)
+            return [self._vector(text) for text in texts]
+        finally:
+            self.active -= 1
+
+
+def test_make_batches_respects_size_and_token_limit(monkeypatch):
+    monkeypatch.setattr(embedding_pipeline, 'count_tokens', len)
+    texts = ['a' * 4, 'b' * 4, 'c' * 4, 'd' * 9, 'e', 'f', 'g', 'h']
+    assert make_batches(texts, batch_size=3, max_batch_tokens=10) == [[0, 1], [2], [3, 4], [5, 6, 7]]
+    # 한도보다 긴 청크도 단독 배치로 요청
+    assert make_batches(['x' * 20, 'y'], batch_size=8, max_batch_tokens=10) == [[0], [1]]
+    assert make_batches([], batch_size=8, max_batch_tokens=10) == []
+
+
+def test_retryable_errors_and_retry_after():
+    assert is_retryable(FakeEmbeddingError('rate limit'))
+    assert is_retryable(_APIError(503))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(_APIError(400))
+    assert not is_retryable(ValueError())
+
+    assert retry_delay(_APIError(429, {'retry-after': '7'}), attempt=0) == 7.0
+    assert retry_delay(_APIError(429, {'retry-after': '120'}), attempt=0, cap=30.0) == 30.0
+    # 헤더가 없으면 지터를 더한 지수 백오프 (base * 2^attempt의 50~100%)
+    for attempt in range(4):
+        delay = retry_delay(_APIError(429), attempt, base=1.0, cap=60.0)
+        assert 0.5 * 2 ** attempt <= delay <= 2 ** attempt
+
+
+def test_retries_transient_errors_and_caps_concurrency():
+    embeddings = _RecordingEmbeddings(errors=[_APIError(429, {'retry-after': '0'})])
+    pipeline = EmbeddingPipeline(embeddings, batch_size=2, max_concurrency=2)
+    texts = [f'청크 {i}' for i in range(12)]
+    progress = []
+
+    vectors = pipeline.embed(texts, on_batch=lambda done, total: progress.append((done, total)))
+
+    assert vectors.shape == (12, 8)
+    assert np.allclose(vectors[5], embeddings._vector(texts[5]))
+    assert embeddings.max_active == 2
+    assert pipeline.stats()['retries'] == 1
+    assert pipeline.stats()['batches'] == 6
+    assert progress[-1] == (12, 12)
+
+
+def test_non_retryable_error_is_raised():
+    embeddings = _RecordingEmbeddings(errors=[_APIError(400)])
+    pipeline = EmbeddingPipeline(embeddings, batch_size=2, max_concurrency=1)
+    with pytest.raises(_APIError):
+        pipeline.embed(['a', 'b', 'c'])
+    assert pipeline.stats()['failures'] == 1
+    assert pipeline.stats()['retries'] == 0
+
+
+def test_completed_batches_are_checkpointed_and_resumed(tmp_path):
+    texts = [f'청크 {i}' for i in range(8)]
+    cache = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+
+    # 마지막 배치가 영구 오류로 실패해도 앞선 배치는 캐시에 기록됨
+    failing = _RecordingEmbeddings(fail_texts={texts[-1]})
+    embedder = CachedEmbeddings(failing, cache, pipeline=EmbeddingPipeline(failing, cache, batch_size=2,
+                                                                           max_concurrency=1))
+    with pytest.raises(ValueError):
+        embedder.embed_documents(texts)
+    assert len(cache) == 6
+
+    # 다시 실행하면 남은 배치만 요청 (새 프로세스를 흉내 내 캐시를 디스크에서 다시 읽음)
+    cache = EmbeddingCache('test-model', cache_dir=str(tmp_path))
+    embeddings = _RecordingEmbeddings()
+    embedder = CachedEmbeddings(embeddings, cache, pipeline=EmbeddingPipeline(embeddings, cache, batch_size=2))
+    vectors = embedder.embed_documents(texts)
+
+    assert embeddings.requested == texts[6:]
+    assert np.allclose(vectors, [embeddings._vector(text) for text in texts], atol=1e-6)
+    assert set(cache.get_many([text_hash(text) for text in texts])) == {text_hash(text) for text in texts}
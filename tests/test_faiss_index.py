@@ -0,0 +1,44 @@
+"""묶음 단위 벡터스토어 생성: IVF 학습 표본 상한과 학습 후 바로 추가"""
+import faiss
+from langchain_core.documents import Document
+
+import faiss_index
+from embedding_pipeline import FakeEmbeddings
+from faiss_index import TRAINING_POINTS_PER_CENTROID, stream_vectorstore
+
+
+def _windows(count, size):
+    for w in range(count):
+        yield [Document(page_content=f'묶음 {w} 청크 {i}', metadata={'source': f'{w}.txt'}, id=f'{w}-{i}')
+               for i in range(size)]
+
+
+def test_ivf_trains_on_capped_sample_and_adds_windows_as_they_arrive(monkeypatch):
+    trained = []
+    build = faiss_index.build_faiss_index
+
+    def record_build(vectors, *args, **kwargs):
+        trained.append(len(vectors))
+        return build(vectors, *args, **kwargs)
+
+    monkeypatch.setattr(faiss_index, 'build_faiss_index', record_build)
+    nlist = 4
+    cap = nlist * TRAINING_POINTS_PER_CENTROID
+    added = []
+
+    vectorstore, config = stream_vectorstore(_windows(10, 70), FakeEmbeddings(size=16), 'ivf_flat',
+                                             {'nlist': nlist, 'nprobe': 2}, on_window=added.append)
+
+    assert trained == [cap]
+    assert config == {'index_type': 'ivf_flat', 'index_params': {'nlist': nlist, 'nprobe': 2}}
+    assert isinstance(vectorstore.index, faiss.IndexIVFFlat)
+    assert vectorstore.index.ntotal == 700
+    assert len(vectorstore.index_to_docstore_id) == 700
+    assert added == [70] * 10
+    assert vectorstore.similarity_search('묶음 9 청크 3', k=1)[0].id == '9-3'
+
+
+def test_short_stream_falls_back_to_flat():
+    vectorstore, config = stream_vectorstore(_windows(2, 10), FakeEmbeddings(size=16), 'ivf_flat')
+    assert config['index_type'] == 'flat'
+    assert vectorstore.index.ntotal == 20
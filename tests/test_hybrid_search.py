@@ -0,0 +1,55 @@
+"""검색 결과 융합 (가중 RRF, 정규화 점수 가중합)과 Document 변환"""
+from types import SimpleNamespace
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from hybrid_search import RRF_C, HybridRetriever, normalized_score_fusion, weighted_rrf
+
+
+def test_weighted_rrf_scores_and_order():
+    lexical = ([7, 2, 9], [3.0, 2.0, 1.0])
+    dense = ([2, 4], [0.9, 0.8])
+    ids, scores = weighted_rrf([lexical, dense], [0.7, 0.3])
+
+    expected = {
+        7: 0.7 / (RRF_C + 1),
+        2: 0.7 / (RRF_C + 2) + 0.3 / (RRF_C + 1),
+        9: 0.7 / (RRF_C + 3),
+        4: 0.3 / (RRF_C + 2),
+    }
+    assert ids.tolist() == sorted(expected, key=lambda i: -expected[i])
+    assert np.allclose(scores, [expected[i] for i in ids.tolist()])
+
+
+def test_ties_keep_first_seen_order():
+    ids, _ = weighted_rrf([([5], [1.0]), ([6], [1.0])], [0.5, 0.5])
+    assert ids.tolist() == [5, 6]
+
+
+def test_empty_results():
+    ids, scores = weighted_rrf([([], []), ([], [])], [0.7, 0.3])
+    assert len(ids) == 0 and len(scores) == 0
+
+
+def test_normalized_score_fusion():
+    ids, scores = normalized_score_fusion([([1, 2], [10.0, 0.0]), ([2, 3], [0.5, 0.5])], [0.5, 0.5])
+    # 2: 0.5 * 0 + 0.5 * 1, 1: 0.5 * 1, 3: 0.5 * 1 (같은 점수는 먼저 나온 순서)
+    assert ids.tolist() == [1, 2, 3]
+    assert np.allclose(scores, [0.5, 0.5, 0.5])
+
+
+def test_materialize_returns_copies():
+    # 이전 버전으로 저장되어 id가 없는 청크
+    stored = Document(page_content='본문', metadata={'source': 'a.txt'})
+    vectorstore = SimpleNamespace(docstore=InMemoryDocstore({'doc-1': stored}), index_to_docstore_id={0: 'doc-1'})
+    retriever = HybridRetriever(bm25_index=None, vectorstore=vectorstore, k=3)
+
+    documents = retriever.materialize([0, 5])
+    assert [doc.id for doc in documents] == ['doc-1']
+    documents[0].metadata['score'] = 1.0
+
+    # docstore의 공유 Document는 바뀌지 않음
+    assert stored.id is None
+    assert stored.metadata == {'source': 'a.txt'}
@@ -0,0 +1,49 @@
+"""워커 프로세스 파싱의 순서 보장과 파일별 시간 제한"""
+import time
+import multiprocessing
+
+import pytest
+
+import ingestion
+from ingestion import iter_parse_files
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                                reason='테스트용 파싱 함수를 워커에 넘기려면 fork가 필요함')
+
+
+def _fake_parse(file_path, pdf_loader_type):
+    delay = float(file_path.split(':')[1])
+    if delay < 0:
+        raise ValueError('손상된 파일')
+    time.sleep(delay)
+    return [(file_path, {'source': file_path})]
+
+
+@pytest.fixture(autouse=True)
+def fake_parser(monkeypatch):
+    monkeypatch.setattr(ingestion, '_parse_file', _fake_parse)
+    monkeypatch.setattr(ingestion, '_context', multiprocessing.get_context('fork'))
+
+
+def test_results_follow_input_order_and_isolate_errors():
+    paths = ['a:0.3', 'b:0', 'c:-1', 'd:0.1']
+    results = list(iter_parse_files(paths, max_workers=2, timeout=10))
+    assert [result.file_path for result in results] == paths
+    assert [result.ok for result in results] == [True, True, False, True]
+    assert results[2].error == '손상된 파일'
+    assert results[0].documents[0].page_content == 'a:0.3'
+
+
+def test_hung_worker_is_killed_without_blocking_later_files():
+    started = time.time()
+    results = list(iter_parse_files(['hang:60', 'a:0', 'b:0', 'c:0'], max_workers=1, timeout=1))
+    assert time.time() - started < 10
+    assert not results[0].ok and '시간 초과' in results[0].error
+    assert all(result.ok for result in results[1:])
+
+
+def test_timeout_counts_from_parse_start():
+    # 워커 하나로 차례로 파싱하므로 대기 시간을 포함하면 뒤 파일이 시간 초과됨
+    results = list(iter_parse_files(['a:0.6', 'b:0.6', 'c:0.6'], max_workers=1, timeout=1.5))
+    assert all(result.ok for result in results)
+    assert all(result.elapsed < 1.5 for result in results)
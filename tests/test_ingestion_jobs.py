@@ -0,0 +1,61 @@
+"""작업 체크포인트 저장과 재개"""
+import time
+
+from db_snapshots import find_snapshot, write_snapshot
+from ingestion_jobs import RUNNING, SUCCEEDED, JobManager, JobStore
+
+
+def _wait(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['status'] == SUCCEEDED:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(manager.get(job_id))
+
+
+def test_checkpoint_is_persisted_and_job_runs_once(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    manager = JobManager(store=store)
+    runs = []
+
+    def runner(params, job):
+        runs.append(dict(job.checkpoint))
+        job.save_checkpoint(db_id='db', snapshot='v000001')
+        return {'ok': True}
+
+    manager.register('create', runner)
+    job = _wait(manager, manager.submit('create', {})['job_id'])
+    assert runs == [{}]
+    assert job['result'] == {'ok': True}
+    assert store.get(job['job_id'])['checkpoint'] == {'db_id': 'db', 'snapshot': 'v000001'}
+
+
+def test_resumed_job_sees_previous_checkpoint(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    # 이전 프로세스에서 체크포인트를 남기고 실행 중에 중단된 작업
+    store = JobStore(path)
+    now = time.time()
+    store.insert({'job_id': 'job-1', 'kind': 'add', 'params': {}, 'status': RUNNING, 'stage': 'saving',
+                  'progress': {}, 'created_at': now, 'updated_at': now})
+    store.save_checkpoint('job-1', {'db_id': 'db'})
+
+    # 같은 저장소로 다시 시작하면 끝나지 않은 작업이 이전 체크포인트와 함께 재개됨
+    seen = []
+    manager = JobManager(store=JobStore(path))
+    manager.register('add', lambda params, job: seen.append(job.checkpoint) or {})
+    manager.start()
+    job = _wait(manager, 'job-1')
+    assert seen == [{'db_id': 'db'}]
+    assert job['progress']['resumed'] == 1
+
+
+def test_find_snapshot_by_tag(tmp_path):
+    db_id = str(tmp_path / 'db')
+    with write_snapshot(db_id, tag='job-1') as folder:
+        open(f'{folder}/a.txt', 'w').write('a')
+    with write_snapshot(db_id) as folder:
+        open(f'{folder}/b.txt', 'w').write('b')
+    assert find_snapshot(db_id, 'job-1') == 'v000001'
+    assert find_snapshot(db_id, 'job-2') is None
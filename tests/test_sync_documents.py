@@ -0,0 +1,103 @@
+"""매니페스트 기반 동기화: 일부 파일만 지정한 동기화는 나머지 파일의 청크를 유지"""
+import os
+import uuid
+import multiprocessing
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('LlamaParseLoader')
+
+import document_manager
+import embedding_cache
+import ingestion
+from db_manifest import load_manifest
+from vectorstore_handles import vectorstore_handles
+
+
+class _Job:
+    def __init__(self):
+        self.job_id = uuid.uuid4().hex
+        self.checkpoint = {}
+
+    def update(self, stage=None, **values):
+        pass
+
+    def check_cancelled(self):
+        pass
+
+    def save_checkpoint(self, **values):
+        self.checkpoint.update(values)
+
+
+def _write(name, label):
+    with open(os.path.join('data', name), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(f'{label} 문서의 {i}번째 문장입니다' for i in range(20)))
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # API 호출 없는 임베딩, 테스트 폴더의 캐시 사용
+    monkeypatch.setattr(embedding_cache, 'EMBEDDING_BACKEND', 'fake')
+    monkeypatch.setattr(embedding_cache, '_caches', {})
+    monkeypatch.setattr(embedding_cache, '_query_caches', {})
+    # 파싱 워커는 이미 import된 모듈을 물려받도록 fork로 시작 (forkserver 시작 비용 생략)
+    monkeypatch.setattr(ingestion, '_context', multiprocessing.get_context(
+        'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'))
+    monkeypatch.setattr(vectorstore_handles, '_embeddings', None)
+    monkeypatch.setattr(document_manager.db_metadata, 'stat_interval', 0)
+    os.makedirs('data')
+    for name in ('a.txt', 'b.txt', 'c.txt'):
+        _write(name, name[0])
+    result = document_manager.run_create_vector_db({
+        'storage_filenames': ['a.txt', 'b.txt', 'c.txt'],
+        'file_paths': [os.path.join('data', name) for name in ('a.txt', 'b.txt', 'c.txt')],
+        'db_name': 'sync', 'document_name': '', 'category': '기타',
+        'chunk_size': 60, 'chunk_overlap': 0, 'pdf_loader': 'pdfplumber',
+        'index_type': 'flat', 'index_params': {},
+    }, _Job())
+    return result['db_id']
+
+
+def _live_chunk_ids(db_id):
+    return set(vectorstore_handles.get(db_id).index_to_docstore_id.values())
+
+
+def test_subset_sync_keeps_other_files(workspace):
+    db_id = workspace
+    before = load_manifest(db_id)['files']
+    _write('b.txt', 'b2')
+
+    result = document_manager.run_sync_documents({
+        'db_id': db_id, 'storage_filenames': ['b.txt'], 'upload_folder': 'data', 'custom_names': {},
+    }, _Job())
+
+    assert result['diff']['changed'] == ['b.txt']
+    assert result['diff']['removed'] == []
+    files = load_manifest(db_id)['files']
+    assert set(files) == {'a.txt', 'b.txt', 'c.txt'}
+    live = _live_chunk_ids(db_id)
+    for name in ('a.txt', 'c.txt'):
+        assert files[name]['chunk_ids'] == before[name]['chunk_ids']
+        assert set(files[name]['chunk_ids']) <= live
+    assert not set(before['b.txt']['chunk_ids']) & live
+
+
+def test_full_sync_removes_deleted_uploads(workspace):
+    db_id = workspace
+    os.remove(os.path.join('data', 'c.txt'))
+    removed_ids = set(load_manifest(db_id)['files']['c.txt']['chunk_ids'])
+
+    result = document_manager.run_sync_documents({'db_id': db_id, 'upload_folder': 'data'}, _Job())
+
+    assert result['diff']['removed'] == ['c.txt']
+    assert set(load_manifest(db_id)['files']) == {'a.txt', 'b.txt'}
+    assert not removed_ids & _live_chunk_ids(db_id)
+
+
+def test_commit_skips_chunks_removed_by_concurrent_edit():
+    # 다시 적용하는 동안 다른 편집이 지운 청크는 label()이 None
+    labels = {'n1': 7, 'n3': 2}
+    vectorstore = SimpleNamespace(metadata_index=SimpleNamespace(label=labels.get))
+    assert document_manager._live_labels(vectorstore, ['n1', 'n2', 'n3']) == [2, 7]
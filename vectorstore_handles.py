@@ -0,0 +1,145 @@
+"""
+공유 벡터스토어 핸들 레지스트리
+
+채팅 retriever와 문서 관리 라우트가 같은 DB의 벡터스토어를 한 번만 열어 함께 사용합니다.
+핸들은 DB의 현재 스냅샷 디렉터리 기준으로 유지되며, 스냅샷이 바뀌면(쓰기, 롤백) 다음 요청에서 다시 엽니다.
+핸들은 읽기 전용으로 다루고, 수정이 필요하면 checkout()으로 받은 복사본을 사용합니다.
+
+사용 중인(상주 retriever가 잡고 있는) 핸들은 약한 참조로, 최근 사용한 몇 개는 강한 참조로 유지해
+문서 목록 조회처럼 retriever 없이 반복되는 요청도 매번 역직렬화하지 않게 합니다.
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from db_snapshots import snapshot_dir
+from embedding_cache import get_embeddings
+from faiss_index import INDEX_FILE, MappedFAISS, load_vectorstore, read_index
+from columnar_docstore import ColumnarDocstore
+
+# retriever가 없어도 메모리에 유지할 최근 핸들 수
+VECTORSTORE_HANDLE_CACHE = int(os.getenv('VECTORSTORE_HANDLE_CACHE', '2'))
+
+
+class VectorstoreRegistry:
+    """DB ID -> 현재 스냅샷의 공유 벡터스토어 핸들"""
+
+    def __init__(self, keep=VECTORSTORE_HANDLE_CACHE):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._handles = weakref.WeakValueDictionary()
+        self._recent = OrderedDict()
+        self._embeddings = None
+        self.hits = 0
+        self.loads = 0
+        self.adopted = 0
+
+    def _get_embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    def _load_lock(self, db_id):
+        with self._lock:
+            return self._load_locks.setdefault(db_id, threading.Lock())
+
+    def _lookup(self, db_id, folder):
+        with self._lock:
+            handle = self._handles.get(db_id)
+            if handle is None or handle.snapshot_folder != folder:
+                return None
+            self.hits += 1
+            self._remember(db_id, handle)
+            return handle
+
+    def _remember(self, db_id, handle):
+        # self._lock 안에서 호출
+        self._handles[db_id] = handle
+        self._recent[db_id] = handle
+        self._recent.move_to_end(db_id)
+        while len(self._recent) > self.keep:
+            self._recent.popitem(last=False)
+
+    def get(self, db_id):
+        """
+        DB의 현재 스냅샷 핸들을 반환합니다 (인덱스는 메모리 매핑).
+        반환된 핸들의 snapshot_folder는 핸들을 읽은 스냅샷 디렉터리입니다.
+        """
+        folder = snapshot_dir(db_id)
+        handle = self._lookup(db_id, folder)
+        if handle is not None:
+            return handle
+        # 같은 DB를 동시에 두 번 열지 않도록 DB별 잠금
+        with self._load_lock(db_id):
+            # 새로 여는 스냅샷은 파일 크기까지 확인 (손상되었으면 이전 스냅샷을 사용)
+            folder = snapshot_dir(db_id, verify=True)
+            handle = self._lookup(db_id, folder)
+            if handle is None:
+                handle = load_vectorstore(folder, self._get_embeddings(), mmap=True)
+                handle.snapshot_folder = folder
+                with self._lock:
+                    self.loads += 1
+                    self._remember(db_id, handle)
+        return handle
+
+    def checkout(self, db_id, embeddings=None):
+        """
+        수정용 벡터스토어를 반환합니다.
+        현재 스냅샷의 핸들이 열려 있으면 docstore/라벨 매핑/메타데이터 색인을 복사하고 인덱스 파일만 다시 읽어
+        docstore 역직렬화를 건너뜁니다. 열 단위 docstore는 메모리 매핑된 표를 공유하고 변경 층만 복사합니다.
+        핸들은 변경되지 않습니다.
+        """
+        embeddings = embeddings or self._get_embeddings()
+        folder = snapshot_dir(db_id, verify=True)
+        handle = self._lookup(db_id, folder)
+        if handle is None:
+            vectorstore = load_vectorstore(folder, embeddings, mmap=False)
+        else:
+            if isinstance(handle.docstore, ColumnarDocstore):
+                docstore = handle.docstore.copy()
+            else:
+                docstore = InMemoryDocstore(dict(handle.docstore._dict))
+            vectorstore = MappedFAISS(
+                embedding_function=embeddings,
+                index=read_index(os.path.join(folder, INDEX_FILE), mmap=False),
+                docstore=docstore,
+                index_to_docstore_id=handle.index_to_docstore_id.copy(),
+                metadata_index=handle.metadata_index.copy(),
+            )
+        vectorstore.snapshot_folder = folder
+        return vectorstore
+
+    def adopt(self, db_id, vectorstore):
+        """
+        방금 저장한 벡터스토어를 새 현재 스냅샷의 핸들로 등록합니다 (저장 직후 다시 읽지 않도록).
+        등록한 뒤에는 호출한 쪽에서도 읽기 전용으로 다뤄야 합니다.
+        """
+        vectorstore.embedding_function = self._get_embeddings()
+        vectorstore.snapshot_folder = snapshot_dir(db_id)
+        with self._lock:
+            self.adopted += 1
+            self._remember(db_id, vectorstore)
+
+    def discard(self, db_id):
+        """삭제된 DB의 핸들을 내립니다."""
+        with self._lock:
+            self._handles.pop(db_id, None)
+            self._recent.pop(db_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open_handles': len(self._handles),
+                'recent_handles': list(self._recent),
+                'hits': self.hits,
+                'loads': self.loads,
+                'adopted': self.adopted,
+            }
+
+
+# 채팅 retriever와 문서 관리 라우트가 공유하는 레지스트리
+vectorstore_handles = VectorstoreRegistry()